@@ -1,157 +1,305 @@
 # app.py
-from flask import Flask, request, jsonify, send_from_directory
-import google.generativeai as genai
-from flask_supabase import Supabase
+from flask import Blueprint, Flask, Response, abort, g, request, jsonify, url_for
 from flask_cors import CORS
-import jwt
+import json
+import logging
 import os
+import threading
 from dotenv import load_dotenv
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from datetime import datetime
-
-from services.database import DatabaseService
-from services.ai_service import AIService
-from utils import clean_text, map_form_data
+import hmac
+import math
+import time
+from contextlib import closing
+from functools import wraps
+
+from config import MILESTONES_CACHE_CONTROL, SOURCES_CACHE_CONTROL
+from config import EXPLORE_FIRST_PAGE_CACHE_CONTROL, EXPLORE_PAGE_CACHE_CONTROL
+from config import JWT_CACHE_MAX_ENTRIES, JWT_CACHE_MAX_TTL, SUPABASE_JWKS_URL
+from config import RATELIMIT_STORAGE_URI, SIMILARITY_REUSE, METRICS_TOKEN, AI_COMBINED_GENERATION, STATIC_ROOT
+from config import WARM_UP
+from services import metrics
+from services.auth import create_token_verifier
+from services.rate_limit import rate_limit_key
+from services.registry import ServiceRegistry
+from services.static_files import StaticFiles
+from services.steps import run
+from services.submission import SubmissionPipeline, STAGES
+from utils import map_form_data
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__, static_folder='frontend/dist', static_url_path='')
+logger = logging.getLogger(__name__)
+
+# Every route lives on this blueprint, registered by create_app
+api = Blueprint("api", __name__)
 
-@app.route('/')
-def serve_index():
-    return send_from_directory(app.static_folder, 'index.html')
+# The built frontend, served by catch_all rather than Flask's static route; scanned on first use
+static_files = StaticFiles(os.path.join(os.path.dirname(os.path.abspath(__file__)), STATIC_ROOT))
 
-# Configure Limiter
+# Configure Limiter. Counters live in RATELIMIT_STORAGE_URI so every worker shares them; the app is
+# bound after authenticate_request is registered, so limits can be keyed on the verified user.
 limiter = Limiter(
-    get_remote_address,
-    app=app,
+    rate_limit_key,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",
+    storage_uri=RATELIMIT_STORAGE_URI,
 )
 
-# Enable CORS for specified origins
-CORS(app, resources={r"/*": {"origins": ["http://localhost:5173", "https://pathweiz.onrender.com"]}}, supports_credentials=True)
-
-# Configure Supabase
-app.config['SUPABASE_URL'] = os.getenv("VITE_SUPABASE_URL")
-app.config['SUPABASE_KEY'] = os.getenv("VITE_SUPABASE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
-supabase_extension = Supabase(app)
+token_verifier = create_token_verifier(
+    SUPABASE_JWT_SECRET, jwks_url=SUPABASE_JWKS_URL, max_entries=JWT_CACHE_MAX_ENTRIES, max_ttl=JWT_CACHE_MAX_TTL
+)
+
+# Services are created on first use; the Gemini and Supabase SDKs are only imported then
+registry = ServiceRegistry()
+
+# Browser origins allowed to call the API
+ALLOWED_ORIGINS = ["http://localhost:5173", "https://pathweiz.onrender.com"]
 
-# Configure Google Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
+def cors_headers(origin):
+    """Return the CORS headers added to every response, for a request from the given Origin."""
+    headers = {}
+    if origin in ALLOWED_ORIGINS:
+        headers["Access-Control-Allow-Origin"] = origin
+    headers["Access-Control-Allow-Credentials"] = "true"
+    headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+    headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return headers
 
-@app.after_request
+@api.after_app_request
 def add_cors_headers(response):
     """Add necessary CORS headers to all responses."""
-    allowed_origins = ["http://localhost:5173", "https://pathweiz.onrender.com"]
-    origin = request.headers.get("Origin")
-    if origin in allowed_origins:
-        response.headers["Access-Control-Allow-Origin"] = origin
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    response.headers.update(cors_headers(request.headers.get("Origin")))
     return response
 
 def get_user_id_from_token(auth_header):
-    """Decode the JWT from the Authorization header and extract the user ID."""
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise ValueError("Invalid Authorization header format. Expected 'Bearer <token>'.")
+    """Verify the JWT from the Authorization header and extract the user ID."""
+    return token_verifier.user_id_from_header(auth_header)
+
+HTTP_REQUEST_SECONDS = metrics.METRICS.histogram(
+    "http_request_seconds", "Latency of HTTP requests, until the response is returned.", ["endpoint", "method", "status"]
+)
+
+@api.before_app_request
+def start_request_trace():
+    """Start timing the request and collecting its spans."""
+    g.trace_token = metrics.start_trace()
 
+@api.before_app_request
+def authenticate_request():
+    """Verify the bearer token once per request and keep the result on flask.g."""
+    g.user_id = None
+    g.auth_error = None
     try:
-        token = auth_header.split(" ")[1]
-        decoded_token = jwt.decode(
-            token,
-            SUPABASE_JWT_SECRET,
-            algorithms=["HS256"],
-            audience="authenticated"
+        with metrics.span("auth.verify"):
+            g.user_id = get_user_id_from_token(request.headers.get("Authorization"))
+    except ValueError as e:
+        g.auth_error = e
+
+@api.after_app_request
+def record_request_timing(response):
+    """Record the request's latency and log its spans as one structured line."""
+    trace = metrics.current_trace()
+    if trace is not None and "trace_token" in g:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            trace.elapsed_ms() / 1000, endpoint=endpoint, method=request.method, status=response.status_code
         )
-        return decoded_token.get("sub")
-    except jwt.ExpiredSignatureError:
-        raise ValueError("Token has expired.")
-    except jwt.InvalidAudienceError:
-        raise ValueError("Invalid audience.")
-    except jwt.InvalidTokenError as e:
-        raise ValueError(f"Invalid token: {e}")
-    except Exception as e:
-        raise ValueError(f"Error decoding token: {e}")
+        metrics.log_trace(
+            "request", trace, endpoint=endpoint, method=request.method, status=response.status_code, user_id=g.get("user_id")
+        )
+    return response
+
+@api.teardown_app_request
+def end_request_trace(exc):
+    """Stop collecting spans for the request."""
+    token = g.pop("trace_token", None)
+    if token is not None:
+        metrics.end_trace(token)
+
+def current_user_id():
+    """Return the user ID verified for this request, raising the verification error if there is none."""
+    if g.auth_error is not None:
+        raise g.auth_error
+    return g.user_id
+
+def cacheable_response(payload, cache_control):
+    """Build a JSON response with an ETag, answering 304 when the client's If-None-Match matches."""
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = cache_control
+    response.add_etag()
+    return response.make_conditional(request)
+
+class Reply:
+    """
+    Reply class holding what a shared handler answers: a JSON payload, a status, and for a
+    cacheable payload its Cache-Control, which also makes it answer If-None-Match with a 304.
+    """
+    def __init__(self, payload, status=200, cache_control=None):
+        """
+        :param payload: The JSON-serializable body.
+        :param status: The HTTP status code.
+        :param cache_control: The Cache-Control header of a cacheable 200 response, or None.
+        """
+        self.payload = payload
+        self.status = status
+        self.cache_control = cache_control
+
+class FlaskRequest:
+    """
+    FlaskRequest class giving shared handlers the current Flask request and this worker's services.
+    Every call runs on the request's thread, so its result is yielded back as it is; asgi.Request
+    provides the same methods as awaitables.
+    """
+    @property
+    def args(self):
+        """The query string arguments."""
+        return request.args
+
+    def current_user_id(self):
+        """Return the verified user ID, raising the verification error if there is none."""
+        return current_user_id()
+
+    def get_json(self):
+        """Return the decoded JSON body."""
+        return request.get_json()
+
+    def database(self):
+        """Return the DatabaseService."""
+        return registry.database()
 
-@app.route('/submit_form', methods=['POST'])
-@limiter.limit("3 per hour")
-def submit_form():
-    """Handle form submission and generate career recommendations."""
+    def blocking(self, func, *args, **kwargs):
+        """Call a function that may block."""
+        return func(*args, **kwargs)
+
+    def submit(self, user_id, pipeline, mapped_data):
+        """Queue a submission on the job queue's thread pool and return the job ID."""
+        return registry.jobs().submit(user_id, STAGES, pipeline.run, user_id, mapped_data)
+
+    def status_url(self, job_id):
+        """Return the URL to poll a job's status at."""
+        return url_for(".submission_status", job_id=job_id)
+
+def shared_view(handler):
+    """
+    Serve a handler shared with the ASGI app from Flask. The handler is a step generator (see
+    services.steps) called with a request adapter and the view arguments, returning a Reply.
+    asgi.py serves the same handler, kept on the view as its handler attribute.
+    """
+    @wraps(handler)
+    def view(**view_args):
+        reply = run(handler(FlaskRequest(), **view_args))
+        if reply.cache_control is not None and reply.status == 200:
+            return cacheable_response(reply.payload, reply.cache_control)
+        return jsonify(reply.payload), reply.status
+    view.handler = handler
+    return view
+
+def submission_pipeline(db_service, ai_service):
+    """Build the submission pipeline from this worker's shared services."""
+    similar_careers = registry.similar_careers() if SIMILARITY_REUSE else None
+    return SubmissionPipeline(
+        db_service, ai_service, registry.explore(), similar_careers,
+        combined=AI_COMBINED_GENERATION, executor=registry.quiz_saves(),
+    )
+
+# Both submission endpoints draw from the same hourly allowance
+submission_limit = limiter.shared_limit("3 per hour", scope="submission")
+
+@api.route('/submit_form', methods=['POST'])
+@submission_limit
+@shared_view
+def submit_form(req):
+    """Handle form submission by queuing career recommendation generation."""
     try:
         # Authenticate user
-        auth_header = request.headers.get("Authorization")
-        user_id = get_user_id_from_token(auth_header)
+        user_id = req.current_user_id()
 
-        # Initialize services
-        db_service = DatabaseService(supabase_extension.client)
-        ai_service = AIService()
+        # Get the shared services for this worker; the first call loads the Gemini SDK
+        db_service = yield req.database()
+        ai_service = yield req.blocking(registry.ai)
 
         # Process form data
+        data = yield req.get_json()
+        if not data:
+            return Reply({"error": "No form data provided."}, 400)
+
+        mapped_data = map_form_data(data, user_id)
+
+        # Queue generation in the background and let the client poll for progress
+        pipeline = yield req.blocking(submission_pipeline, db_service, ai_service)
+        job_id = req.submit(user_id, pipeline, mapped_data)
+
+        return Reply({
+            "message": "Submission accepted.",
+            "job_id": job_id,
+            "status_url": req.status_url(job_id),
+        }, 202)
+
+    except Exception as e:
+        return Reply({"error": f"Error processing request: {str(e)}"}, 500)
+
+@api.route('/submit_form/stream', methods=['POST'])
+@submission_limit
+def submit_form_stream():
+    """
+    Handle form submission, streaming results as newline-delimited JSON while they are generated.
+    The frontend submits through /submit_form; this endpoint is for API clients.
+    """
+    try:
+        user_id = current_user_id()
+
+        db_service = registry.database()
+        ai_service = registry.ai()
+
         data = request.get_json()
         if not data:
             return jsonify({"error": "No form data provided."}), 400
 
         mapped_data = map_form_data(data, user_id)
+    except Exception as e:
+        return jsonify({"error": f"Error processing request: {str(e)}"}), 500
 
-        # Save quiz responses and get updated data
-        db_service.save_quiz_responses(mapped_data)
-        quiz_data = db_service.get_user_quiz_responses(user_id)
-
-        # Generate and save recommendations
-        recommendations = ai_service.generate_recommendations(quiz_data)
-
-        for rec in recommendations[:3]:
-            # Save recommendation
-            rec_data = {
-                "user_id": user_id,
-                "job_title": rec["job_title"],
-                "short_description": rec.get("short_description", ""),
-                "job_description": rec["job_description"],
-                "fit_percentage": rec["fit_percentage"],
-                "tags": rec["tags"],
-                "recommendation_reason": rec["recommendation_reason"],
-                "labels": rec["labels"],
-            }
-            recommendation_id = db_service.save_recommendation(rec_data)
-
-            # Generate and save milestones
-            milestones = ai_service.generate_milestones(rec["job_title"], mapped_data["college_year"])
-            for milestone in milestones:
-                milestone_data = {
-                    "recommendation_id": recommendation_id,
-                    "title": clean_text(milestone["title"]),
-                    "description": clean_text(milestone["description"]),
-                }
-                db_service.save_milestone(milestone_data)
-
-            # Generate and save sources
-            sources = ai_service.generate_sources(rec["job_title"])
-            for source in sources:
-                source_data = {
-                    "recommendation_id": recommendation_id,
-                    "icon": source["icon"],
-                    "title": clean_text(source["title"]),
-                    "description": clean_text(source["description"]),
-                    "status": clean_text(source["status"]),
-                }
-                db_service.save_source(source_data)
-
-        return jsonify({
-            "message": "Recommendations, milestones, and sources saved successfully.",
-            "recommendations": recommendations[:3]
-        }), 200
+    events = submission_pipeline(db_service, ai_service).stream(user_id, mapped_data)
+
+    def body():
+        # Werkzeug closes this generator when the client disconnects; close the pipeline's with it
+        with closing(events):
+            for event in events:
+                yield json.dumps(event) + "\n"
+
+    response = Response(body(), mimetype="application/x-ndjson")
+    # Stop proxies from buffering the stream
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@api.route('/submission_status/<job_id>', methods=['GET'])
+@limiter.limit("5000 per hour")
+@shared_view
+def submission_status(req, job_id):
+    """Report the progress of a queued form submission."""
+    try:
+        user_id = req.current_user_id()
+
+        # A read of the job store, which is a SQLite file by default
+        job = yield req.blocking(lambda: registry.jobs().get(job_id, user_id=user_id))
+        if job is None:
+            return Reply({"error": "Submission not found."}, 404)
+
+        return Reply({
+            "job_id": job["id"],
+            "status": job["status"],
+            "stages": job["stages"],
+            "result": job["result"],
+            "error": job["error"],
+        })
 
     except Exception as e:
-        return jsonify({"error": f"Error processing request: {str(e)}"}), 500
+        return Reply({"error": f"Error fetching submission status: {str(e)}"}, 500)
 
-@app.route('/submit_form', methods=['OPTIONS'])
+@api.route('/submit_form', methods=['OPTIONS'])
 def handle_options():
     """Handle preflight OPTIONS requests for /submit_form."""
     response = jsonify({"message": "Preflight OK"})
@@ -161,126 +309,241 @@ def handle_options():
     response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
     return response, 200
 
-@app.route('/get_recommendations', methods=['GET'])
+@api.route('/get_recommendations', methods=['GET'])
 @limiter.limit("5000 per hour") 
-def get_recommendations():
+@shared_view
+def get_recommendations(req):
     """Fetch career recommendations for a user."""
     try:
-        auth_header = request.headers.get("Authorization")
-        user_id = get_user_id_from_token(auth_header)
+        user_id = req.current_user_id()
         
-        db_service = DatabaseService(supabase_extension.client)
-        recommendations = db_service.get_recommendations(user_id)
+        db_service = yield req.database()
+        recommendations = yield db_service.get_recommendations(user_id)
         
         if not recommendations:
-            return jsonify({"message": "No recommendations found for this user."}), 404
+            return Reply({"message": "No recommendations found for this user."}, 404)
             
-        return jsonify({"recommendations": recommendations}), 200
+        return Reply({"recommendations": recommendations})
         
     except Exception as e:
-        return jsonify({"error": f"Error fetching recommendations: {str(e)}"}), 500
+        return Reply({"error": f"Error fetching recommendations: {str(e)}"}, 500)
+
+@api.route('/get_career_bundle', methods=['GET'])
+@limiter.limit("5000 per hour")
+@shared_view
+def get_career_bundle(req):
+    """Fetch a user's latest career recommendations together with their milestones and action items."""
+    try:
+        user_id = req.current_user_id()
+
+        db_service = yield req.database()
+        recommendations = yield db_service.get_career_bundle(user_id)
+
+        if not recommendations:
+            return Reply({"message": "No recommendations found for this user."}, 404)
+
+        return Reply({"recommendations": recommendations}, cache_control=MILESTONES_CACHE_CONTROL)
+
+    except Exception as e:
+        return Reply({"error": f"Error fetching career bundle: {str(e)}"}, 500)
 
-@app.errorhandler(429)
+@api.app_errorhandler(429)
 def ratelimit_handler(e):
     """Handle rate limit errors."""
-    minutes_remaining = 60
-    if hasattr(e, 'reset_time'):
-        reset_time = datetime.fromtimestamp(e.reset_time)
-        minutes_remaining = int((reset_time - datetime.now()).total_seconds() / 60)
+    current = limiter.current_limit
+    retry_after = max(1, current.reset_at - int(time.time())) if current else 3600
 
     endpoint = request.path
-    if endpoint == '/submit_form':
+    if endpoint in ('/submit_form', '/submit_form/stream'):
         limit_info = "3 submissions per hour"
-    return jsonify({
+    else:
+        limit_info = e.description
+    response = jsonify(rate_limit_payload(limit_info, retry_after))
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 429
+
+def rate_limit_payload(limit_info, retry_after):
+    """Build the body of a 429 response for a limit described as limit_info."""
+    minutes_remaining = math.ceil(retry_after / 60)
+    return {
         "error": "Rate limit exceeded",
         "message": f"You've reached the limit of {limit_info}. Please try again in {minutes_remaining} minutes."
-    }), 429
-    
-@app.route('/explore_recommendations', methods=['GET'])
+    }
+
+@api.route('/explore_recommendations', methods=['GET'])
 @limiter.limit("5000 per hour") 
 def explore_recommendations():
     """Explore and fetch the latest job recommendations."""
+    cursor = request.args.get('cursor', None)
     try:
-        limit = int(request.args.get('limit', 10))
-        cursor = request.args.get('cursor', None)
-
-        # Query sorted by ID in descending order for the latest recommendations
-        query = supabase_extension.client.from_("job_recommendations").select(
-            "id, job_title, short_description, job_description, fit_percentage, recommendation_reason, labels, tags, created_at"
-        ).order("id", desc=True).limit(limit)
-
-        # Use cursor for pagination
-        if cursor:
-            query = query.lt("id", cursor)  # Fetch results with IDs less than the cursor
+        feed = registry.explore()
+        try:
+            page = feed.get_page(
+                cursor=cursor,
+                limit=request.args.get('limit', 10),
+                fields=request.args.get('fields', 'full'),
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error fetching recommendations: {str(e)}"}), 500
 
-        response = query.execute()
+    cache_control = EXPLORE_PAGE_CACHE_CONTROL if cursor else EXPLORE_FIRST_PAGE_CACHE_CONTROL
+    return cacheable_response(page, cache_control)
 
-        # Ensure tags are always a string
-        for rec in response.data:
-            rec['tags'] = rec.get('tags', '')
+@api.route('/similar_careers', methods=['GET'])
+@limiter.limit("5000 per hour")
+def similar_careers():
+    """Suggest existing careers similar to a job title."""
+    job_title = request.args.get("job_title")
+    if not job_title:
+        return jsonify({"error": "job_title is required"}), 400
 
-        # Get new cursor (smallest ID in the current batch)
-        new_cursor = response.data[-1]["id"] if response.data else None
+    try:
+        limit = max(1, min(int(request.args.get("limit", 5)), 20))
+        exclude_id = request.args.get("exclude_id", type=int)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
 
-        return jsonify({"data": response.data, "cursor": new_cursor}), 200
+    try:
+        careers = registry.similar_careers().similar(
+            job_title, tags=request.args.get("tags", ""), k=limit, exclude_id=exclude_id
+        )
+        return cacheable_response({"data": careers}, EXPLORE_FIRST_PAGE_CACHE_CONTROL)
     except Exception as e:
-        return jsonify({"error": f"Error fetching recommendations: {str(e)}"}), 500
+        return jsonify({"error": f"Error fetching similar careers: {str(e)}"}), 500
 
-@app.route('/get_career_milestones', methods=['GET'])
+@api.route('/get_career_milestones', methods=['GET'])
 @limiter.limit("5000 per hour") 
-def get_career_milestones():
+@shared_view
+def get_career_milestones(req):
     """
     Fetch the milestones for a particular career.
     """
-    recommendation_id = request.args.get("recommendation_id")
+    recommendation_id = req.args.get("recommendation_id")
     if not recommendation_id:
-        return jsonify({"error": "recommendation_id is required"}), 400
+        return Reply({"error": "recommendation_id is required"}, 400)
     
     try:
-        response = supabase_extension.client.from_("milestones") \
-            .select("*") \
-            .eq("recommendation_id", recommendation_id) \
-            .execute()
+        db_service = yield req.database()
+        milestones = yield db_service.get_milestones(recommendation_id)
 
-        if not response.data:
-            return jsonify({f"message": "No milestones were found for career {recommendation_id}"}), 404
+        if not milestones:
+            return Reply({"message": f"No milestones were found for career {recommendation_id}"}, 404)
 
-        return jsonify({"milestones": response.data}), 200
+        return Reply({"milestones": milestones}, cache_control=MILESTONES_CACHE_CONTROL)
     except Exception as e:
-        return jsonify({"error": f"Error fetching milestones: {str(e)}"}), 500
+        return Reply({"error": f"Error fetching milestones: {str(e)}"}, 500)
 
-@app.route('/get_action_items', methods=['GET'])
+@api.route('/get_action_items', methods=['GET'])
 @limiter.limit("5000 per hour") 
-def get_action_items():
+@shared_view
+def get_action_items(req):
     """
     Fetch action items for a specific job recommendation.
     """
-    recommendation_id = request.args.get("recommendation_id")
+    recommendation_id = req.args.get("recommendation_id")
     if not recommendation_id:
-        return jsonify({"error": "recommendation_id is required"}), 400
+        return Reply({"error": "recommendation_id is required"}, 400)
 
     try:
-        response = supabase_extension.client.from_("sources") \
-            .select("*") \
-            .eq("recommendation_id", recommendation_id) \
-            .execute()
+        db_service = yield req.database()
+        action_items = yield db_service.get_sources(recommendation_id)
 
-        if not response.data:
-            return jsonify({"message": "No action items found"}), 404
+        if not action_items:
+            return Reply({"message": "No action items found"}, 404)
 
-        return jsonify({"action_items": response.data}), 200
+        return Reply({"action_items": action_items}, cache_control=SOURCES_CACHE_CONTROL)
     except Exception as e:
-        return jsonify({"error": f"Error fetching action items: {str(e)}"}), 500
-
-@app.route('/<path:path>')
+        return Reply({"error": f"Error fetching action items: {str(e)}"}, 500)
+
+@api.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics_endpoint():
+    """Expose this worker's metrics in the Prometheus text format."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            return jsonify({"error": "Invalid metrics token"}), 401
+    return Response(metrics.METRICS.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+@api.route('/', defaults={'path': ''})
+@api.route('/<path:path>')
+@limiter.exempt
 def catch_all(path):
-    """Catch-all route to handle frontend SPA routing."""
-    try:
-        # Attempt to serve the requested file if it exists
-        return send_from_directory(app.static_folder, path)
-    except:
-        # If the file does not exist, serve the frontend's index.html
-        return send_from_directory(app.static_folder, 'index.html')
+    """Serve a frontend file, or index.html for client-side routes."""
+    response = static_files.serve(path, request)
+    if response is None:
+        abort(404)
+    return response
+
+def create_app():
+    """
+    Create the Flask app.
+
+    Importing this module and creating the app only loads Flask and its extensions. The Gemini and
+    Supabase SDKs, their clients, and the static file manifest are loaded on first use, or ahead
+    of time by warm_up.
+
+    :return: The Flask app.
+    """
+    app = Flask(__name__, static_folder=None)
+
+    # Configure Supabase
+    app.config['SUPABASE_URL'] = os.getenv("VITE_SUPABASE_URL")
+    app.config['SUPABASE_KEY'] = os.getenv("VITE_SUPABASE_KEY")
+
+    # Enable CORS for specified origins
+    CORS(app, resources={r"/*": {"origins": ALLOWED_ORIGINS}}, supports_credentials=True)
+
+    # The limiter is bound after the blueprint, so authenticate_request runs before limits are checked
+    app.register_blueprint(api)
+    limiter.init_app(app)
+    registry.init_app(app)
+    return app
+
+def warm_up():
+    """
+    Load the SDKs and create the shared clients and services, so the first request does not pay
+    for them. Failures are logged and left for that request to retry.
+    """
+    start = time.perf_counter()
+    steps = [
+        ("static files", static_files.load),
+        ("ai", registry.ai),
+        ("jobs", registry.jobs),
+        ("database", registry.database),
+        ("explore", registry.explore),
+    ]
+    if SIMILARITY_REUSE:
+        steps.append(("similar careers", lambda: registry.similar_careers().refresh()))
+    for name, step in steps:
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
+
+_warm_up_thread = None
+
+def start_warm_up():
+    """
+    Run warm_up on a background thread, if WARM_UP is enabled. Called once the worker is serving,
+    e.g. from gunicorn's post_worker_init hook or the ASGI app's startup; later calls in the same
+    process return the thread already started.
+
+    :return: The warm-up thread, or None when warm-up is disabled.
+    """
+    global _warm_up_thread
+    if not WARM_UP:
+        return None
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
+
+app = create_app()
 
 if __name__ == '__main__':
+    start_warm_up()
     app.run(debug=True)
\ No newline at end of file
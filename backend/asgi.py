@@ -0,0 +1,340 @@
+"""
+ASGI entry point, for serving the I/O-bound endpoints from an event loop.
+
+The /get_* reads, /submit_form and /submission_status run the same handlers as their Flask views
+(see app.shared_view), driven on the event loop with AsyncDatabaseService and the AIService *_async
+methods, so a request waiting on Supabase or Gemini holds a coroutine instead of a thread, and
+background submissions run as tasks on the same loop.
+Every other request (the streamed submission, explore, similar careers, metrics, preflight
+requests and the frontend) is passed to the Flask app through asgiref's WSGI adapter, which runs it
+on a thread pool. Both paths share the services, caches, rate-limit counters and job store of
+app.py, so responses and limits are the same whichever path serves a request.
+
+Run with (from the backend directory):
+    uvicorn asgi:app --workers 2
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+The WSGI entry point (gunicorn app:app) is unchanged.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from limits import parse as parse_limit
+from werkzeug.http import generate_etag, parse_etags, quote_etag
+
+import app as wsgi
+from config import WARM_UP
+from services import metrics
+from services.steps import run_async
+from services.submission import STAGES
+
+logger = logging.getLogger(__name__)
+
+# The routes served on the event loop, registered by route() below
+ROUTES = []
+
+
+class Request:
+    """
+    Request class holding the parts of an ASGI HTTP request the handlers use. It provides the
+    methods of app.FlaskRequest, returning awaitables for calls that wait on I/O.
+    """
+    def __init__(self, scope, receive, path_params):
+        """
+        :param scope: The ASGI connection scope.
+        :param receive: The ASGI receive callable, for reading the body.
+        :param path_params: The values of the route's <name> placeholders.
+        """
+        self.scope = scope
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        self.args = {name: values[0] for name, values in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        self.path_params = path_params
+        self.user_id = None
+        self.auth_error = None
+        self._receive = receive
+
+    @property
+    def remote_addr(self):
+        """The client address, as Flask-Limiter's get_remote_address reports it."""
+        client = self.scope.get("client")
+        return client[0] if client else "127.0.0.1"
+
+    def authenticate(self):
+        """Verify the bearer token once, keeping the user ID or the verification error."""
+        try:
+            with metrics.span("auth.verify"):
+                self.user_id = wsgi.get_user_id_from_token(self.headers.get("authorization"))
+        except ValueError as e:
+            self.auth_error = e
+
+    def current_user_id(self):
+        """Return the verified user ID, raising the verification error if there is none."""
+        if self.auth_error is not None:
+            raise self.auth_error
+        return self.user_id
+
+    def rate_limit_key(self):
+        """Identify the client like services.rate_limit.rate_limit_key, so both paths share counters."""
+        return f"user:{self.user_id}" if self.user_id else self.remote_addr
+
+    async def get_json(self):
+        """
+        Read and decode the JSON body.
+
+        :return: The decoded body, or None if it is empty.
+        :raises ValueError: If the body is not valid JSON.
+        """
+        body = bytearray()
+        while True:
+            message = await self._receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        return json.loads(body) if body else None
+
+    def database(self):
+        """Return an awaitable of the AsyncDatabaseService."""
+        return wsgi.registry.async_database()
+
+    def blocking(self, func, *args, **kwargs):
+        """Return an awaitable of a call that may block, made on a worker thread."""
+        return asyncio.to_thread(func, *args, **kwargs)
+
+    def submit(self, user_id, pipeline, mapped_data):
+        """Queue a submission as a task on the event loop and return the job ID."""
+        return wsgi.registry.jobs().submit_async(user_id, STAGES, pipeline.run_async, user_id, mapped_data)
+
+    def status_url(self, job_id):
+        """Return the URL to poll a job's status at."""
+        return f"{self.scope.get('root_path', '')}/submission_status/{job_id}"
+
+
+class Response:
+    """
+    Response class holding a status, headers and a complete body.
+    """
+    def __init__(self, body, status=200, headers=None):
+        """
+        :param body: The body as bytes.
+        :param status: The HTTP status code.
+        :param headers: A dictionary of response headers.
+        """
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+
+    async def send(self, send):
+        """Send the response through an ASGI send callable."""
+        headers = {**self.headers, "Content-Length": str(len(self.body))}
+        await send({
+            "type": "http.response.start",
+            "status": self.status,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        })
+        await send({"type": "http.response.body", "body": self.body})
+
+
+def json_response(payload, status=200):
+    """
+    Build a JSON response serialized the way Flask's jsonify does, so both entry points send the
+    same bytes and therefore the same ETags.
+    """
+    body = f"{wsgi.app.json.dumps(payload, separators=(',', ':'))}\n".encode()
+    return Response(body, status, {"Content-Type": "application/json"})
+
+
+def reply_response(request, reply):
+    """Build the response for a shared handler's app.Reply, as app.shared_view does."""
+    if reply.cache_control is not None and reply.status == 200:
+        return cacheable_response(request, reply.payload, reply.cache_control)
+    return json_response(reply.payload, reply.status)
+
+
+def cacheable_response(request, payload, cache_control):
+    """Build a JSON response with an ETag, answering 304 when the client's If-None-Match matches."""
+    response = json_response(payload)
+    etag = generate_etag(response.body)
+    headers = {"Cache-Control": cache_control, "ETag": quote_etag(etag)}
+    if parse_etags(request.headers.get("if-none-match")).contains(etag):
+        return Response(b"", 304, headers)
+    response.headers.update(headers)
+    return response
+
+
+class RateLimit:
+    """
+    RateLimit class that checks one Flask-Limiter limit against the limiter's own storage, in the
+    bucket the Flask route uses, so a client's requests count once whichever path serves them.
+    """
+    def __init__(self, limit, scope, description=None):
+        """
+        :param limit: A limit string, e.g. "5000 per hour".
+        :param scope: The bucket: the Flask endpoint name, or the scope of a shared limit.
+        :param description: How the limit is described in the 429 message.
+        """
+        self.item = parse_limit(limit)
+        self.scope = scope
+        self.description = description or str(self.item)
+
+    async def exceeded(self, request):
+        """
+        Count a request against the limit. The limiter's storage is synchronous (a SQLite file by
+        default), so it is used from a worker thread rather than on the event loop.
+
+        :return: A 429 response if the limit was already reached, otherwise None.
+        """
+        if not wsgi.limiter.enabled:
+            return None
+        reset_time = await asyncio.to_thread(self._hit, request.rate_limit_key())
+        if reset_time is None:
+            return None
+        retry_after = max(1, int(reset_time - time.time()))
+        response = json_response(wsgi.rate_limit_payload(self.description, retry_after), 429)
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    def _hit(self, key):
+        """
+        Count a hit for a client.
+
+        :return: None if the hit was allowed, otherwise when the limit's window resets.
+        """
+        strategy = wsgi.limiter.limiter
+        if strategy.hit(self.item, key, self.scope):
+            return None
+        return strategy.get_window_stats(self.item, key, self.scope).reset_time
+
+
+class Route:
+    """
+    Route class matching a method and a path pattern with <name> placeholders.
+    """
+    def __init__(self, method, rule, handler, limit):
+        """
+        :param method: The HTTP method.
+        :param rule: The path, in Flask's rule syntax, also used as the endpoint label in metrics.
+        :param handler: A shared handler, called with a Request and the path parameters.
+        :param limit: The RateLimit checked before the handler runs.
+        """
+        self.method = method
+        self.rule = rule
+        self.handler = handler
+        self.limit = limit
+        self.pattern = re.compile("^" + re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", rule) + "$")
+
+    def match(self, scope):
+        """Return the path parameters if the route handles the request, otherwise None."""
+        if scope["method"] != self.method:
+            return None
+        match = self.pattern.match(scope["path"])
+        return match.groupdict() if match else None
+
+
+def route(method, rule, view, limit="5000 per hour", scope=None, description=None):
+    """
+    Serve a Flask view's shared handler on the event loop. The limit is kept in the view's own
+    bucket, unless a shared scope is given.
+    """
+    ROUTES.append(Route(method, rule, view.handler, RateLimit(limit, scope or f"api.{view.__name__}", description)))
+
+
+route("POST", "/submit_form", wsgi.submit_form, limit="3 per hour", scope="submission", description="3 submissions per hour")
+route("GET", "/submission_status/<job_id>", wsgi.submission_status)
+route("GET", "/get_recommendations", wsgi.get_recommendations)
+route("GET", "/get_career_bundle", wsgi.get_career_bundle)
+route("GET", "/get_career_milestones", wsgi.get_career_milestones)
+route("GET", "/get_action_items", wsgi.get_action_items)
+
+
+class AsyncApp:
+    """
+    AsyncApp class, the ASGI application: registered routes are awaited on the event loop and every
+    other request is handed to the Flask app.
+    """
+    def __init__(self, flask_app, routes=ROUTES):
+        """
+        :param flask_app: The Flask app serving everything without an async route.
+        :param routes: The async routes.
+        """
+        self.fallback = WsgiToAsgi(flask_app)
+        self.routes = routes
+        self._warm_up_task = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] == "http":
+            for candidate in self.routes:
+                path_params = candidate.match(scope)
+                if path_params is not None:
+                    await self.handle(candidate, Request(scope, receive, path_params), send)
+                    return
+        await self.fallback(scope, receive, send)
+
+    async def handle(self, matched, request, send):
+        """Run a route's handler with the same authentication, limits, CORS headers and timing as the Flask hooks."""
+        token = metrics.start_trace()
+        try:
+            request.authenticate()
+            try:
+                response = await matched.limit.exceeded(request)
+                if response is None:
+                    reply = await run_async(matched.handler(request, **request.path_params))
+                    response = reply_response(request, reply)
+            except Exception:
+                logger.exception("Unhandled error serving %s", request.path)
+                response = json_response({"error": "Internal Server Error"}, 500)
+            response.headers.update(wsgi.cors_headers(request.headers.get("origin")))
+            if "Access-Control-Allow-Origin" in response.headers:
+                response.headers["Vary"] = "Origin"
+
+            trace = metrics.current_trace()
+            wsgi.HTTP_REQUEST_SECONDS.observe(
+                trace.elapsed_ms() / 1000, endpoint=matched.rule, method=request.method, status=response.status
+            )
+            metrics.log_trace(
+                "request", trace, endpoint=matched.rule, method=request.method, status=response.status, user_id=request.user_id
+            )
+            await response.send(send)
+        finally:
+            metrics.end_trace(token)
+
+    async def lifespan(self, receive, send):
+        """Warm up when the server starts, and close the async Supabase connections when it stops."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                wsgi.start_warm_up()
+                if WARM_UP:
+                    self._warm_up_task = asyncio.create_task(self.warm_up())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._warm_up_task is not None:
+                    self._warm_up_task.cancel()
+                await wsgi.registry.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def warm_up():
+        """Create the async Supabase client, which has to be done on the server's event loop."""
+        try:
+            await wsgi.registry.async_database()
+        except Exception:
+            logger.exception("Warm-up step async database failed")
+
+
+app = AsyncApp(wsgi.app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=5000)
@@ -0,0 +1,69 @@
+"""
+Measure the per-request cost of verifying the bearer token, with and without the verified-token
+cache, for HS256 tokens and for RS256 tokens checked against a JWKS.
+
+The "middleware" rows time the before_request hook inside a request context, so they include
+header parsing and storing the result on flask.g.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_auth --repeat 5000
+"""
+import argparse
+import json
+import time
+import timeit
+import urllib.parse
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import app as app_module
+from services.auth import create_token_verifier
+
+JWT_SECRET = "benchmark-secret"
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def make_jwks_url(private_key):
+    """Publish the public key as a data: URL so the JWKS fetch needs no server."""
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return "data:application/json," + urllib.parse.quote(json.dumps({"keys": [{**jwk, "kid": "bench", "use": "sig"}]}))
+
+
+def time_per_call(func, repeat):
+    func()  # Warm up the cache and the key set
+    return timeit.timeit(func, number=repeat) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    claims = {"sub": USER_ID, "aud": "authenticated", "exp": int(time.time() + 3600)}
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    tokens = {
+        "HS256": jwt.encode(claims, JWT_SECRET, algorithm="HS256"),
+        "RS256": jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "bench"}),
+    }
+    jwks_url = make_jwks_url(private_key)
+
+    print(f"{'':<24} {'uncached us':>12} {'cached us':>10} {'speedup':>8}")
+    for algorithm, token in tokens.items():
+        header = f"Bearer {token}"
+        uncached = create_token_verifier(JWT_SECRET, jwks_url=jwks_url, max_entries=0)
+        cached = create_token_verifier(JWT_SECRET, jwks_url=jwks_url)
+        uncached_us = time_per_call(lambda: uncached.user_id_from_header(header), args.repeat)
+        cached_us = time_per_call(lambda: cached.user_id_from_header(header), args.repeat)
+        print(f"{algorithm + ' verifier':<24} {uncached_us:12.1f} {cached_us:10.1f} {uncached_us / cached_us:7.1f}x")
+
+        results = []
+        for verifier in (uncached, cached):
+            app_module.token_verifier = verifier
+            with app_module.app.test_request_context("/", headers={"Authorization": header}):
+                results.append(time_per_call(app_module.authenticate_request, args.repeat))
+        print(f"{algorithm + ' middleware':<24} {results[0]:12.1f} {results[1]:10.1f} {results[0] / results[1]:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
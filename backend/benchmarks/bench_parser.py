@@ -0,0 +1,144 @@
+"""
+Compare per-response parse time of the compiled parsers in services/parsing.py with the original
+per-line regex parsers, over the recorded responses in fixtures/recorded_responses.json.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_parser --repeat 2000
+"""
+import argparse
+import json
+import os
+import re
+import timeit
+
+from services import parsing
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "recorded_responses.json")
+
+
+def legacy_parse_recommendations(text):
+    """The original AIService._parse_recommendations, kept as the baseline."""
+    recommendations = []
+    current_recommendation = {}
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if "Recommendation" in line:
+            if current_recommendation:
+                recommendations.append(current_recommendation)
+            current_recommendation = {}
+            continue
+        job_title_match = re.search(r"Job Title:\*\*(.*?)\*\*", line) or \
+            re.search(r"1\.\s*\*\*Job Title:\*\*(.*)", line) or re.search(r"Job Title:(.*)", line)
+        short_desc_match = re.search(r"Short Description:\*\*(.*?)\*\*", line) or \
+            re.search(r"2\.\s*\*\*Short Description:\*\*(.*)", line) or re.search(r"Short Description:(.*)", line)
+        job_desc_match = re.search(r"Full Job Description:\*\*(.*?)\*\*", line) or \
+            re.search(r"3\.\s*\*\*Full Job Description:\*\*(.*)", line) or re.search(r"Full Job Description:(.*)", line)
+        rec_reason_match = re.search(r"Why it's recommended:\*\*(.*?)\*\*", line) or \
+            re.search(r"4\.\s*\*\*Why it's recommended:\*\*(.*)", line) or re.search(r"Why it's recommended:(.*)", line)
+        fit_match = re.search(r"Fit Percentage:\*\*(.*?)\*\*", line) or \
+            re.search(r"5\.\s*\*\*Fit Percentage:\*\*(.*)", line) or re.search(r"Fit Percentage:(.*)", line)
+        tags_match = re.search(r"Tags:\*\*(.*?)\*\*", line) or \
+            re.search(r"6\.\s*\*\*Tags:\*\*(.*)", line) or re.search(r"Tags:(.*)", line)
+        labels_match = re.search(r"Labels:\*\*(.*?)\*\*", line) or \
+            re.search(r"7\.\s*\*\*Labels:\*\*(.*)", line) or re.search(r"Labels:(.*)", line)
+        if job_title_match:
+            current_recommendation["job_title"] = job_title_match.group(1).strip()
+        elif short_desc_match:
+            current_recommendation["short_description"] = short_desc_match.group(1).strip()
+        elif job_desc_match:
+            current_recommendation["job_description"] = job_desc_match.group(1).strip()
+        elif rec_reason_match:
+            current_recommendation["recommendation_reason"] = rec_reason_match.group(1).strip()
+        elif fit_match:
+            current_recommendation["fit_percentage"] = fit_match.group(1).strip()
+        elif tags_match:
+            current_recommendation["tags"] = tags_match.group(1).strip()
+        elif labels_match:
+            current_recommendation["labels"] = [label.strip() for label in labels_match.group(1).split(",")]
+    if current_recommendation:
+        recommendations.append(current_recommendation)
+    return recommendations
+
+
+def legacy_parse_milestones(text):
+    """The original AIService._parse_milestones, kept as the baseline."""
+    milestones = []
+    current_milestone = {}
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        title_match = re.search(r"Title:\s*(.*)", line)
+        description_match = re.search(r"Description:\s*(.*)", line)
+        if title_match:
+            if current_milestone:
+                milestones.append(current_milestone)
+            current_milestone = {"title": title_match.group(1).strip()}
+        elif description_match:
+            current_milestone["description"] = description_match.group(1).strip()
+    if current_milestone:
+        milestones.append(current_milestone)
+    return milestones
+
+
+def legacy_parse_sources(text):
+    """The original AIService._parse_sources, kept as the baseline."""
+    sources = []
+    current_source = {}
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        title_match = re.search(r"Title:\s*(.*)", line)
+        description_match = re.search(r"Description:\s*(.*)", line)
+        status_match = re.search(r"Status:\s*(.*)", line)
+        icon_match = re.search(r"Icon:\s*(.)", line)
+        if icon_match:
+            if "title" in current_source:
+                sources.append(current_source)
+                current_source = {}
+            current_source["icon"] = icon_match.group(1).strip()
+        elif title_match:
+            if current_source:
+                sources.append(current_source)
+            current_source['title'] = title_match.group(1).strip()
+        elif description_match:
+            current_source["description"] = description_match.group(1).strip()
+        elif status_match:
+            current_source["status"] = status_match.group(1).strip()
+    if "title" in current_source:
+        sources.append(current_source)
+    return sources
+
+
+PARSERS = {
+    "recommendations": (legacy_parse_recommendations, parsing.parse_recommendations),
+    "milestones": (legacy_parse_milestones, parsing.parse_milestones),
+    "sources": (legacy_parse_sources, parsing.parse_sources),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="Times each response is parsed.")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+
+    print(f"{'prompt type':<16} {'legacy us':>10} {'compiled us':>12} {'speedup':>8}")
+    for prompt_type, (legacy, compiled) in PARSERS.items():
+        texts = [entry["text"] for entry in corpus if entry["type"] == prompt_type]
+        for text in texts:
+            assert legacy(text) == compiled(text), f"Parsers disagree on a {prompt_type} response"
+        legacy_time = timeit.timeit(lambda: [legacy(text) for text in texts], number=args.repeat)
+        compiled_time = timeit.timeit(lambda: [compiled(text) for text in texts], number=args.repeat)
+        per_response = 1e6 / (args.repeat * len(texts))
+        print(f"{prompt_type:<16} {legacy_time * per_response:10.1f} {compiled_time * per_response:12.1f} "
+              f"{legacy_time / compiled_time:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure the per-request cost of a rate-limit hit for each storage backend, including the shared
+SQLite file used by default.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_rate_limit --hits 20000 --concurrency 1
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import services.rate_limit  # noqa: F401  (registers the sqlite:// scheme)
+
+
+def run(storage_uri, hits, concurrency):
+    """Return per-hit latencies in microseconds."""
+    limiter = FixedWindowRateLimiter(storage_from_string(storage_uri))
+    limit = parse("5000 per hour")
+
+    def hit(i):
+        start = time.perf_counter()
+        limiter.hit(limit, f"user:{i % 100}")
+        return (time.perf_counter() - start) * 1e6
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(hit, range(hits)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Threads hitting the limiter; above 1 the tail also includes GIL hand-offs.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            "memory": "memory://",
+            "sqlite": f"sqlite:///{os.path.join(directory, 'ratelimit.sqlite3')}",
+        }
+        print(f"{'storage':<10} {'p50 us':>8} {'p99 us':>8}")
+        for label, uri in backends.items():
+            latencies = sorted(run(uri, args.hits, args.concurrency))
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f"{label:<10} {statistics.median(latencies):8.1f} {p99:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
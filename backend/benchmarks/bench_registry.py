@@ -0,0 +1,83 @@
+"""
+Measure /get_recommendations throughput with and without the process-wide ServiceRegistry.
+
+Supabase is replaced by a local PostgREST stub, so the numbers reflect client construction and
+connection handling rather than database work.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_registry --requests 500 --concurrency 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+
+import app as app_module
+from benchmarks.stub_postgrest import StubPostgrest, STUB_SUPABASE_KEY
+from services.database import DatabaseService
+from services.registry import ServiceRegistry
+
+JWT_SECRET = "benchmark-secret"
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def seed_rows(count=9):
+    return [
+        {
+            "id": i,
+            "user_id": USER_ID,
+            "job_title": f"Career {i}",
+            "short_description": "A short description.",
+            "created_at": f"2024-01-{i:02d}T00:00:00",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def run(client, token, total, concurrency):
+    """Issue `total` requests across `concurrency` threads and return requests per second."""
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def call(_):
+        response = client.get("/get_recommendations", headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    app = app_module.app
+    app_module.token_verifier.secret = JWT_SECRET
+    token = jwt.encode({"sub": USER_ID, "aud": "authenticated", "exp": time.time() + 3600}, JWT_SECRET, algorithm="HS256")
+
+    with StubPostgrest({"job_recommendations": seed_rows()}) as stub:
+        app.config["SUPABASE_URL"] = stub.url
+        app.config["SUPABASE_KEY"] = STUB_SUPABASE_KEY
+        app.config["RATELIMIT_ENABLED"] = False
+        client = app.test_client()
+
+        shared = ServiceRegistry(app)
+        per_request = ServiceRegistry(app)
+        # Mimic the old behaviour: a brand new Supabase client for every request
+        per_request.database = lambda: DatabaseService(per_request._create_supabase_client())
+
+        for label, registry in (("per-request clients", per_request), ("shared registry", shared)):
+            app_module.registry = registry
+            run(client, token, min(20, args.requests), args.concurrency)
+            connections_before = stub.connection_count
+            rps = run(client, token, args.requests, args.concurrency)
+            connections = stub.connection_count - connections_before
+            print(f"{label:<20} {rps:8.1f} req/s  {connections:5d} TCP connections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Measure cold start: how long `import app` takes in a fresh interpreter, how long until a freshly
+started server answers its first request, and how long warm_up takes to load the SDKs and create
+the clients that the first request would otherwise pay for.
+
+Every measurement runs in a new process, so nothing is cached in memory between runs. The server
+is a plain werkzeug server on a free port, and the first request is GET /metrics, which needs no
+external service.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --json startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), os.pardir)
+
+# Modules that should only be loaded when first used
+HEAVY_MODULES = ["google.generativeai", "supabase", "numpy"]
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+SERVER_SCRIPT = """
+import sys
+from werkzeug.serving import make_server
+import app
+make_server("127.0.0.1", int(sys.argv[1]), app.app, threaded=True).serve_forever()
+"""
+
+WARM_UP_SCRIPT = """
+import json, time
+import app
+app.app.config["SUPABASE_URL"] = "http://127.0.0.1:9"
+app.app.config["SUPABASE_KEY"] = "startup-benchmark"
+start = time.perf_counter()
+app.warm_up()
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+def environment():
+    # Keep counters and recorded prompts out of the working directory
+    return {**os.environ, "RATELIMIT_STORAGE_URI": "memory://", "AI_PROMPT_CACHE_MODE": "off", "WARM_UP": "false"}
+
+
+def run_script(script):
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=environment(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(timeout=60):
+    """Start a server process and return the seconds until its first successful response."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, str(port)],
+        cwd=BACKEND_DIR, env=environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(values):
+    return {"median_s": statistics.median(values), "min_s": min(values), "max_s": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    imports = [run_script(IMPORT_SCRIPT) for _ in range(args.runs)]
+    results = {
+        "import": summarize([result["seconds"] for result in imports]),
+        "heavy_modules_loaded_by_import": imports[0]["loaded"],
+        "first_response": summarize([time_to_first_response() for _ in range(args.runs)]),
+        "warm_up": summarize([run_script(WARM_UP_SCRIPT)["seconds"] for _ in range(args.runs)]),
+    }
+
+    for name in ("import", "first_response", "warm_up"):
+        result = results[name]
+        print(f"{name:<16} median {result['median_s'] * 1000:8.1f} ms   "
+              f"min {result['min_s'] * 1000:8.1f} ms   max {result['max_s'] * 1000:8.1f} ms")
+    print(f"heavy modules loaded by import: {', '.join(results['heavy_modules_loaded_by_import']) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump(results, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+A stand-in for google.generativeai.GenerativeModel that answers with recorded responses after a
+configurable delay, so the submission pipeline can be load tested without network or quota.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+from google.api_core.exceptions import ServiceUnavailable
+
+from services import parsing
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "recorded_responses.json")
+
+# Phrases from each template in config.PROMPTS, used to tell which kind of response to return
+PROMPT_MARKERS = [
+    ("combined", "single JSON document"),
+    ("recommendations", "career recommendations"),
+    ("milestones", "milestones for the career path"),
+    ("sources", "learning resources"),
+]
+
+# The fields every parsed item must have for a recording to count as well-formed
+REQUIRED_KEYS = {
+    "recommendations": parsing.RECOMMENDATION_KEYS,
+    "milestones": parsing.MILESTONE_KEYS,
+    "sources": parsing.SOURCE_KEYS,
+}
+
+
+def load_responses(path=CORPUS_PATH):
+    """
+    Load well-formed recorded response texts grouped by prompt type. Recordings with missing
+    fields, kept in the corpus to exercise the parsers, are skipped.
+
+    :param path: A JSON file of {"type", "text", "expected"} entries.
+    :return: A dictionary mapping each prompt type to a list of texts.
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+    responses = {}
+    for entry in corpus:
+        keys = REQUIRED_KEYS[entry["type"]]
+        if entry["expected"] and all(all(key in item for key in keys) for item in entry["expected"]):
+            responses.setdefault(entry["type"], []).append(entry["text"])
+    responses["combined"] = combined_responses(responses)
+    return responses
+
+
+def combined_responses(responses):
+    """
+    Assemble combined JSON responses from the recorded recommendations, milestones and sources.
+
+    :param responses: Texts by prompt type, as returned by load_responses.
+    :return: A list of JSON texts in the shape parsing.parse_combined expects.
+    """
+    milestones = [parsing.parse_milestones(text)[:5] for text in responses["milestones"]]
+    # The line parser lists each source twice; keep one copy of each
+    sources = [list({id(source): source for source in parsing.parse_sources(text)}.values())[:3]
+               for text in responses["sources"]]
+    documents = []
+    for text in responses["recommendations"]:
+        recommendations = parsing.parse_recommendations(text)
+        if len(recommendations) != 3:
+            continue
+        documents.append(json.dumps({"recommendations": [
+            {**rec, "milestones": milestones[index % len(milestones)], "sources": sources[index % len(sources)]}
+            for index, rec in enumerate(recommendations)
+        ]}))
+    return documents
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Answers generate_content calls with canned responses, cycling through the recorded ones for
+    each prompt type, and counts calls by type. A share of calls can fail with a 503 to exercise
+    retries and fallback.
+    """
+    def __init__(self, responses=None, latency=0.0, jitter=0.0, chunk_size=80, seed=None, error_rate=0.0):
+        """
+        :param responses: Texts by prompt type; defaults to fixtures/recorded_responses.json.
+        :param latency: Seconds each call takes.
+        :param jitter: Up to this many extra seconds are added to each call at random.
+        :param chunk_size: Characters per chunk when streaming.
+        :param seed: An optional random seed for the jitter and injected errors.
+        :param error_rate: The probability that a call fails with ServiceUnavailable after its delay.
+        """
+        self.responses = responses or load_responses()
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        """
+        Return a recorded response for the prompt's type.
+
+        :param prompt: The formatted prompt.
+        :param stream: Whether to return an iterator of chunks.
+        :return: An object with a .text attribute, or an iterator of them when streaming.
+        """
+        text, delay, fail = self._next(prompt)
+        if not stream:
+            time.sleep(delay)
+            if fail:
+                raise ServiceUnavailable("Injected upstream error")
+            return _Response(text)
+        return self._stream(text, delay, fail)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        """
+        Return a recorded response for the prompt's type, waiting without blocking the event loop.
+
+        :param prompt: The formatted prompt.
+        :return: An object with a .text attribute.
+        """
+        text, delay, fail = self._next(prompt)
+        await asyncio.sleep(delay)
+        if fail:
+            raise ServiceUnavailable("Injected upstream error")
+        return _Response(text)
+
+    def _next(self, prompt):
+        """Pick the response text, delay and outcome of the next call for a prompt."""
+        prompt_type = next((name for name, marker in PROMPT_MARKERS if marker in prompt), "recommendations")
+        with self._lock:
+            texts = self.responses[prompt_type]
+            text = texts[self.calls[prompt_type] % len(texts)]
+            self.calls[prompt_type] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            self.errors += fail
+        return text, delay, fail
+
+    def _stream(self, text, delay, fail=False):
+        chunks = [text[start:start + self.chunk_size] for start in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            if fail:
+                raise ServiceUnavailable("Injected upstream error")
+            yield _Response(chunk)
+
+    @property
+    def total_calls(self):
+        """The number of calls made so far."""
+        with self._lock:
+            return sum(self.calls.values())
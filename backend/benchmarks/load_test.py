@@ -0,0 +1,309 @@
+"""
+End-to-end load test of the Flask app against a local PostgREST stub and a fake Gemini model.
+
+Each scenario drives one endpoint at the given concurrency and reports throughput, latency
+percentiles, and the number of Supabase requests and model calls per request. Background
+submissions are waited for, so /submit_form counts include the whole pipeline. Rate limiting
+is disabled for the run.
+
+With --asgi the requests go to the ASGI app (asgi.py) from one event loop instead of to the Flask
+app from a thread pool, so concurrency is the number of requests in flight rather than threads.
+--db-latency makes every Supabase request wait, as a remote database would.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --requests 200 --concurrency 8 --llm-latency 0.2
+    python -m benchmarks.load_test --scenarios submit_form --json results.json
+    python -m benchmarks.load_test --asgi --scenarios get_recommendations --requests 2000 --concurrency 1000 --db-latency 0.05
+"""
+import os
+
+# Keep counters and recorded prompts out of the working directory unless configured explicitly
+os.environ.setdefault("RATELIMIT_STORAGE_URI", "memory://")
+os.environ.setdefault("AI_PROMPT_CACHE_MODE", "off")
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+
+import app as app_module
+from benchmarks.fake_genai import FakeGenerativeModel
+from benchmarks.stub_postgrest import StubPostgrest, STUB_SUPABASE_KEY
+from services.database import build_snapshots
+from services.registry import ServiceRegistry
+
+JWT_SECRET = "load-test-secret"
+
+SCENARIOS = ["submit_form", "get_recommendations", "explore_recommendations", "get_career_milestones", "get_action_items"]
+
+FORM_DATA = {
+    "collegeYear": "Junior",
+    "fieldOfStudy": "Computer Science",
+    "favoriteCourse": "Statistics",
+    "topHobbies": "Chess, hiking",
+    "careerPriorities": "Impact, growth",
+    "idealWorkEnvironment": "Collaborative",
+    "industriesOfInterest": "Healthcare, technology",
+}
+
+
+def user_id(index):
+    return f"00000000-0000-0000-0000-{index:012d}"
+
+
+def seed_tables(users):
+    """
+    Build rows for `users` users, each with 3 recommendations, 5 milestones and 3 sources per
+    recommendation, and a snapshot of their recommendations as the backfill would write it.
+    """
+    tables = {"quiz_responses": [], "job_recommendations": [], "milestones": [], "sources": []}
+    next_id = 1
+    for index in range(users):
+        tables["quiz_responses"].append({"id": next_id, "user_id": user_id(index), "college_year": "Junior"})
+        next_id += 1
+        for rec_index in range(3):
+            rec_id = next_id
+            next_id += 1
+            tables["job_recommendations"].append({
+                "id": rec_id, "user_id": user_id(index), "job_title": f"Career {index}-{rec_index}",
+                "short_description": "A short description.", "job_description": "A longer description. " * 20,
+                "fit_percentage": "80%", "recommendation_reason": "Because.", "labels": ["Analytical"],
+                "tags": "Technology", "created_at": f"2024-01-01T00:{index % 60:02d}:{rec_index:02d}",
+            })
+            for step in range(5):
+                tables["milestones"].append({"id": next_id, "recommendation_id": rec_id, "title": f"Step {step}", "description": "..."})
+                next_id += 1
+            for step in range(3):
+                tables["sources"].append({
+                    "id": next_id, "recommendation_id": rec_id, "icon": "📘",
+                    "title": f"Source {step}", "description": "...", "status": "Not Started",
+                })
+                next_id += 1
+    newest_first = sorted(tables["job_recommendations"], key=lambda rec: rec["created_at"], reverse=True)
+    tables["recommendation_snapshots"] = [
+        {"user_id": user, "recommendations": rows} for user, rows in build_snapshots(newest_first).items()
+    ]
+    return tables
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class LoadTest:
+    """
+    Runs scenarios against the app with a fresh ServiceRegistry bound to a StubPostgrest, and
+    restores the app's registry, token verifier secret, and limiter when closed.
+    """
+    def __init__(self, users=50, llm_latency=0.0, llm_jitter=0.0, seed=0, llm_error_rate=0.0, db_latency=0.0, asgi=False):
+        """
+        :param users: The number of seeded users.
+        :param llm_latency: Seconds each fake model call takes.
+        :param llm_jitter: Up to this many extra seconds per model call.
+        :param seed: The random seed for request parameters and jitter.
+        :param llm_error_rate: The share of model calls that fail with a 503.
+        :param db_latency: Seconds each Supabase request takes.
+        :param asgi: Whether to drive the ASGI app from an event loop instead of the Flask app from threads.
+        """
+        self.users = users
+        self.asgi = asgi
+        self.random = random.Random(seed)
+        self.stub = StubPostgrest(seed_tables(users), latency=db_latency)
+        self.model = FakeGenerativeModel(latency=llm_latency, jitter=llm_jitter, seed=seed, error_rate=llm_error_rate)
+        self.tokens = [
+            jwt.encode({"sub": user_id(index), "aud": "authenticated", "exp": time.time() + 3600}, JWT_SECRET)
+            for index in range(users)
+        ]
+        self.recommendation_ids = [row["id"] for row in self.stub.tables["job_recommendations"]]
+
+    def __enter__(self):
+        self.stub.__enter__()
+        app = app_module.app
+        self._saved = (
+            app_module.registry, app_module.token_verifier.secret, app_module.limiter.enabled,
+            app.config.get("SUPABASE_URL"), app.config.get("SUPABASE_KEY"),
+        )
+        app.config["SUPABASE_URL"] = self.stub.url
+        app.config["SUPABASE_KEY"] = STUB_SUPABASE_KEY
+        app_module.token_verifier.secret = JWT_SECRET
+        app_module.limiter.enabled = False
+        self.registry = app_module.registry = ServiceRegistry(app)
+        ai_service = self.registry.ai()
+        ai_service.model = ai_service.fallback_model = self.model
+        self.client = app.test_client()
+        if self.asgi:
+            from asgi import app as asgi_app
+
+            # One loop for every scenario, since the async Supabase client belongs to the loop that made it
+            self.loop = asyncio.new_event_loop()
+            self.asgi_app = asgi_app
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.asgi:
+            self.loop.run_until_complete(self.registry.aclose())
+            self.loop.close()
+        app = app_module.app
+        (app_module.registry, app_module.token_verifier.secret, app_module.limiter.enabled,
+         app.config["SUPABASE_URL"], app.config["SUPABASE_KEY"]) = self._saved
+        self.stub.__exit__(*exc_info)
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.random.choice(self.tokens)}"}
+
+    def _plan(self, scenario):
+        """Pick the (method, path, keyword arguments) of one request for a scenario."""
+        if scenario == "submit_form":
+            return "POST", "/submit_form", {"json": FORM_DATA, "headers": self._headers()}
+        if scenario == "get_recommendations":
+            return "GET", "/get_recommendations", {"headers": self._headers()}
+        if scenario == "explore_recommendations":
+            # Half the visitors land on the first page, the rest follow a cursor
+            cursor = "" if self.random.random() < 0.5 else f"&cursor={self.random.choice(self.recommendation_ids)}"
+            return "GET", f"/explore_recommendations?limit=10{cursor}", {}
+        recommendation_id = self.random.choice(self.recommendation_ids)
+        return "GET", f"/{scenario}?recommendation_id={recommendation_id}", {}
+
+    def _request(self, scenario):
+        """Issue one request for a scenario and return (status, job_id or None)."""
+        method, path, kwargs = self._plan(scenario)
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, (response.get_json(silent=True) or {}).get("job_id")
+
+    async def _request_async(self, client, scenario):
+        """Issue one request for a scenario to the ASGI app and return (status, job_id or None)."""
+        method, path, kwargs = self._plan(scenario)
+        response = await client.request(method, path, **kwargs)
+        body = response.json() if response.headers.get("content-type") == "application/json" else {}
+        return response.status_code, body.get("job_id")
+
+    def _wait_for_jobs(self, job_ids, timeout=300):
+        """Wait for queued submissions and return their durations in seconds and the number that failed."""
+        durations, failed = [], 0
+        deadline = time.monotonic() + timeout
+        for job_id in job_ids:
+            while True:
+                job = self.registry.jobs().get(job_id)
+                if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+                    break
+                time.sleep(0.01)
+            durations.append(job["updated_at"] - job["created_at"])
+            failed += job["status"] != "succeeded"
+        return durations, failed
+
+    def run(self, scenario, requests, concurrency):
+        """
+        Drive one scenario and measure it.
+
+        :param scenario: One of SCENARIOS.
+        :param requests: The number of requests to send.
+        :param concurrency: The number of threads sending them.
+        :return: A dictionary of results for the scenario.
+        """
+        db_before, llm_before = self.stub.request_count, self.model.total_calls
+
+        def timed(_):
+            start = time.perf_counter()
+            status, job_id = self._request(scenario)
+            return time.perf_counter() - start, status, job_id
+
+        start = time.perf_counter()
+        if self.asgi:
+            results = self.loop.run_until_complete(self._run_async(scenario, requests, concurrency))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(timed, range(requests)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _, _ in results)
+        errors = sum(status >= 400 and status != 404 for _, status, _ in results)
+        report = {
+            "scenario": scenario,
+            "requests": requests,
+            "concurrency": concurrency,
+            "throughput": requests / elapsed,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "errors": errors,
+        }
+
+        job_ids = [job_id for _, _, job_id in results if job_id]
+        if job_ids:
+            durations, failed = self._wait_for_jobs(job_ids)
+            durations = sorted(duration * 1000 for duration in durations)
+            report.update(job_p50_ms=percentile(durations, 0.50), job_p99_ms=percentile(durations, 0.99), job_failures=failed)
+
+        report["db_calls_per_request"] = (self.stub.request_count - db_before) / requests
+        report["llm_calls_per_request"] = (self.model.total_calls - llm_before) / requests
+        return report
+
+    async def _run_async(self, scenario, requests, concurrency):
+        """
+        Send a scenario's requests to the ASGI app with at most concurrency in flight, then wait
+        for the background jobs they queued, which run on this loop.
+
+        :return: A list of (latency, status, job_id) tuples.
+        """
+        import httpx
+
+        slots = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=self.asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            async def timed():
+                async with slots:
+                    start = time.perf_counter()
+                    status, job_id = await self._request_async(client, scenario)
+                    return time.perf_counter() - start, status, job_id
+
+            results = await asyncio.gather(*(timed() for _ in range(requests)))
+
+        jobs = self.registry.jobs()
+        pending = [job_id for _, _, job_id in results if job_id]
+        while pending:
+            await asyncio.sleep(0.01)
+            pending = [job_id for job_id in pending if jobs.get(job_id)["status"] not in ("succeeded", "failed")]
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50, help="Users seeded in the stub database.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake model call.")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra random seconds per model call.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of model calls that fail with a 503.")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Seconds per Supabase request.")
+    parser.add_argument("--asgi", action="store_true", help="Drive the ASGI app from an event loop.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    reports = []
+    with LoadTest(users=args.users, llm_latency=args.llm_latency, llm_jitter=args.llm_jitter,
+                  llm_error_rate=args.llm_error_rate, db_latency=args.db_latency, asgi=args.asgi) as load_test:
+        print(f"{'scenario':<26} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7} {'llm/req':>8} {'errors':>6}")
+        for scenario in args.scenarios:
+            report = load_test.run(scenario, args.requests, args.concurrency)
+            reports.append(report)
+            print(f"{scenario:<26} {report['throughput']:8.1f} {report['p50_ms']:8.1f} {report['p95_ms']:8.1f} "
+                  f"{report['p99_ms']:8.1f} {report['db_calls_per_request']:7.2f} {report['llm_calls_per_request']:8.2f} "
+                  f"{report['errors']:6d}")
+            if "job_p50_ms" in report:
+                print(f"{'  (background job)':<26} {'':>8} {report['job_p50_ms']:8.1f} {'':>8} {report['job_p99_ms']:8.1f} "
+                      f"{'':>7} {'':>8} {report['job_failures']:6d}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump(reports, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+A small in-memory stand-in for Supabase's PostgREST API, used by the benchmarks so they can run
+without network access. It understands the subset of the query syntax the backend uses:
+eq./lt./gt./in. filters, order, limit, insert/upsert/delete with return=representation, and patch.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# A JWT-shaped key that passes supabase-py's API key validation
+STUB_SUPABASE_KEY = "stub.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.signature"
+
+RESERVED_PARAMS = {"select", "order", "limit", "on_conflict", "columns"}
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when a load test opens hundreds at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class StubPostgrest:
+    """
+    An in-memory PostgREST server running on a background thread.
+    """
+    def __init__(self, tables=None, host="127.0.0.1", port=0, latency=0.0):
+        """
+        Initialize the stub server.
+
+        :param tables: Initial rows, keyed by table name.
+        :param latency: Seconds each request waits before it is answered, like a remote database.
+        :param host: The interface to bind to.
+        :param port: The port to bind to, or 0 to pick a free one.
+        """
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.request_count = 0
+        self.connection_count = 0
+        # Requests per "METHOD table", e.g. "POST milestones"
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self._next_id = 1 + max((row.get("id", 0) for rows in self.tables.values() for row in rows), default=0)
+        self.server = _Server((host, port), self._make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """The base URL to use as SUPABASE_URL."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def select(self, table, params):
+        """Return the rows of a table that match PostgREST-style query parameters."""
+        rows = [row for row in self.tables.get(table, []) if self._matches(row, params)]
+        for key, value in params:
+            if key == "order":
+                column, _, direction = value.partition(".")
+                rows.sort(key=lambda row: row.get(column) or 0, reverse=direction.startswith("desc"))
+            elif key == "limit":
+                rows = rows[:int(value)]
+        return rows
+
+    def insert(self, table, payload, on_conflict=None):
+        """
+        Insert one or more rows, assigning sequential ids. With on_conflict, a row whose value in
+        that column matches an existing row replaces it instead, as an upsert does.
+        """
+        rows = payload if isinstance(payload, list) else [payload]
+        with self.lock:
+            existing = self.tables.setdefault(table, [])
+            inserted = []
+            for row in rows:
+                match = next((old for old in existing if on_conflict and old.get(on_conflict) == row.get(on_conflict)), None)
+                if match is not None:
+                    match.update(row)
+                    inserted.append(match)
+                    continue
+                row = {"id": self._next_id, "created_at": datetime.now(timezone.utc).isoformat(), **row}
+                self._next_id += 1
+                existing.append(row)
+                inserted.append(row)
+        return inserted
+
+    def delete(self, table, params):
+        """Delete the rows of a table that match PostgREST-style query parameters."""
+        with self.lock:
+            kept, deleted = [], []
+            for row in self.tables.get(table, []):
+                (deleted if self._matches(row, params) else kept).append(row)
+            self.tables[table] = kept
+        return deleted
+
+    @staticmethod
+    def _matches(row, params):
+        for column, condition in params:
+            if column in RESERVED_PARAMS:
+                continue
+            operator, _, value = condition.partition(".")
+            actual = row.get(column)
+            if operator == "eq" and str(actual) != value:
+                return False
+            if operator == "lt" and not (actual is not None and float(actual) < float(value)):
+                return False
+            if operator == "gt" and not (actual is not None and float(actual) > float(value)):
+                return False
+            if operator == "in" and str(actual) not in value.strip("()").replace('"', "").split(","):
+                return False
+        return True
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connection_count += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _route(self):
+                # postgrest-py sends a JSON body even on GET, which must be drained for keep-alive
+                self.body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                parts = urlsplit(self.path)
+                table = parts.path.rsplit("/", 1)[-1]
+                with stub.lock:
+                    stub.calls[f"{self.command} {table}"] += 1
+                return table, parse_qsl(parts.query)
+
+            def _respond(self, rows, status=200):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub.lock:
+                    stub.request_count += 1
+                single = "vnd.pgrst.object" in self.headers.get("Accept", "")
+                body = json.dumps(rows[0] if single and rows else rows).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                return json.loads(self.body or b"null")
+
+            def do_GET(self):
+                table, params = self._route()
+                self._respond(stub.select(table, params))
+
+            def do_POST(self):
+                table, params = self._route()
+                on_conflict = dict(params).get("on_conflict") if "merge-duplicates" in self.headers.get("Prefer", "") else None
+                self._respond(stub.insert(table, self._read_json(), on_conflict=on_conflict), status=201)
+
+            def do_PATCH(self):
+                table, params = self._route()
+                updates = self._read_json()
+                rows = stub.select(table, params)
+                for row in rows:
+                    row.update(updates)
+                self._respond(rows)
+
+            def do_DELETE(self):
+                table, params = self._route()
+                self._respond(stub.delete(table, params))
+
+        return Handler
@@ -1,3 +1,145 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables before any settings below are read
+load_dotenv()
+
+# Upper bound on concurrent Gemini calls issued by AIService.generate_details
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", "8"))
+
+# Upper bound on concurrent Gemini calls per worker when serving through asgi.py, where calls are
+# coroutines rather than pool threads
+AI_ASYNC_MAX_CONCURRENCY = int(os.getenv("AI_ASYNC_MAX_CONCURRENCY", "64"))
+
+# Seconds to wait on a single Gemini call before treating it as failed
+AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT", "30"))
+
+# Seconds a model call may take across every retry and the fallback model
+AI_CALL_DEADLINE = float(os.getenv("AI_CALL_DEADLINE", "45"))
+
+# Attempts per model for timeouts, 429s and 5xx responses, with jittered exponential backoff
+AI_MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", "3"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "8"))
+
+# Consecutive transient failures that stop calls to a model, and seconds before one is retried
+AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5"))
+AI_BREAKER_RESET_TIMEOUT = float(os.getenv("AI_BREAKER_RESET_TIMEOUT", "30"))
+
+# Model used when the primary one is failing; set to an empty string to disable fallback
+AI_FALLBACK_MODEL = os.getenv("AI_FALLBACK_MODEL", "gemini-1.5-flash-8b")
+
+# Ask Gemini for JSON matching a response schema; the line-based parser remains the fallback
+AI_STRUCTURED_OUTPUT = os.getenv("AI_STRUCTURED_OUTPUT", "false").lower() == "true"
+
+# Token budget for the quiz answers in the recommendation prompts. Each answer is cut to the field
+# budget, then the longest answers are cut further until all of them fit in AI_QUIZ_TOKEN_BUDGET.
+AI_QUIZ_TOKEN_BUDGET = int(os.getenv("AI_QUIZ_TOKEN_BUDGET", "800"))
+AI_QUIZ_FIELD_TOKEN_BUDGET = int(os.getenv("AI_QUIZ_FIELD_TOKEN_BUDGET", "200"))
+
+# Cache in front of AIService.generate_milestones and generate_sources ("memory", "sqlite", or "none")
+AI_CACHE_BACKEND = os.getenv("AI_CACHE_BACKEND", "memory")
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "ai_cache.sqlite3")
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Concurrent milestone and source generations for the same career share one Gemini call. Set a lock
+# directory (with AI_CACHE_BACKEND=sqlite) to also coalesce them across worker processes.
+AI_SINGLE_FLIGHT_LOCK_DIR = os.getenv("AI_SINGLE_FLIGHT_LOCK_DIR")
+
+# Raw model responses keyed by model, exact prompt, and generation config, stored in SQLite.
+# Modes: "cache" (serve and store), "record" (always call and store), "replay" (serve stored
+# responses only, never calling Gemini; for offline load tests), or "off".
+AI_PROMPT_CACHE_MODE = os.getenv("AI_PROMPT_CACHE_MODE", "cache")
+AI_PROMPT_CACHE_PATH = os.getenv("AI_PROMPT_CACHE_PATH", "ai_prompts.sqlite3")
+AI_PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("AI_PROMPT_CACHE_MAX_ENTRIES", "10000"))
+AI_PROMPT_CACHE_TTL = float(os.getenv("AI_PROMPT_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Background submission jobs; the job store must be "sqlite" for status to be visible across workers
+SUBMISSION_WORKERS = int(os.getenv("SUBMISSION_WORKERS", "4"))
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "sqlite")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.sqlite3")
+JOB_TTL = float(os.getenv("JOB_TTL", str(24 * 3600)))
+JOB_STORE_MAX_ENTRIES = int(os.getenv("JOB_STORE_MAX_ENTRIES", "10000"))
+# A queued or running job not updated for this many seconds is reported as failed, since the
+# worker running it has most likely restarted and taken the job with it
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "600"))
+
+# Read-through cache for /get_action_items, keyed by recommendation_id. Milestones are not cached
+# because the frontend edits their "updates" column directly in Supabase; their ETag still lets
+# clients revalidate without resending an unchanged body.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "4096"))
+SOURCES_CACHE_TTL = float(os.getenv("SOURCES_CACHE_TTL", "3600"))
+MILESTONES_CACHE_CONTROL = "private, no-cache"
+SOURCES_CACHE_CONTROL = f"public, max-age={int(SOURCES_CACHE_TTL)}"
+
+# Per-user snapshot of the latest recommendations behind /get_recommendations, stored in the
+# recommendation_snapshots table (sql/recommendation_snapshots.sql) and cached in each worker. A
+# worker that did not save a submission may serve the previous snapshot for up to the cache TTL.
+RECOMMENDATION_SNAPSHOT_CACHE_TTL = float(os.getenv("RECOMMENDATION_SNAPSHOT_CACHE_TTL", "10"))
+# After a snapshot read or write fails, e.g. because the key in use cannot access the table, reads
+# go straight to job_recommendations for this many seconds instead of failing the same way again.
+RECOMMENDATION_SNAPSHOT_RETRY_INTERVAL = float(os.getenv("RECOMMENDATION_SNAPSHOT_RETRY_INTERVAL", "300"))
+RECOMMENDATION_SNAPSHOT_BACKFILL_BATCH_SIZE = int(os.getenv("RECOMMENDATION_SNAPSHOT_BACKFILL_BATCH_SIZE", "200"))
+
+# Page cache for /explore_recommendations. The first page changes whenever a submission is saved,
+# while pages behind a cursor only change if rows are deleted, so they can live much longer. The
+# backend ("memory", "sqlite", or "none") must be "sqlite" for a submission saved by one worker to
+# refresh the first page served by the others.
+EXPLORE_CACHE_BACKEND = os.getenv("EXPLORE_CACHE_BACKEND", "sqlite")
+EXPLORE_CACHE_PATH = os.getenv("EXPLORE_CACHE_PATH", "explore_cache.sqlite3")
+EXPLORE_MAX_LIMIT = int(os.getenv("EXPLORE_MAX_LIMIT", "50"))
+EXPLORE_CACHE_MAX_ENTRIES = int(os.getenv("EXPLORE_CACHE_MAX_ENTRIES", "512"))
+EXPLORE_FIRST_PAGE_TTL = float(os.getenv("EXPLORE_FIRST_PAGE_TTL", "30"))
+EXPLORE_PAGE_TTL = float(os.getenv("EXPLORE_PAGE_TTL", "300"))
+EXPLORE_FIRST_PAGE_CACHE_CONTROL = f"public, max-age={int(EXPLORE_FIRST_PAGE_TTL)}"
+EXPLORE_PAGE_CACHE_CONTROL = f"public, max-age={int(EXPLORE_PAGE_TTL)}"
+
+# Near-duplicate careers reuse already generated sources (and milestones, for careers saved by the
+# same worker for the same college year) instead of calling Gemini again. Two careers are the same
+# when their titles have the same words, in any order, and the hashed n-gram cosine similarity of
+# title and tags is at or above the threshold. "Healthcare Data Scientist" and "Data Scientist
+# (Healthcare)" merge; "Marine Biologist" and "Biologist", or "Sports Data Analyst" and "Data
+# Analyst", do not, although they score 0.74 and 0.84. The index keeps the newest SIMILARITY_MAX_ENTRIES.
+SIMILARITY_REUSE = os.getenv("SIMILARITY_REUSE", "true").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.72"))
+SIMILARITY_REFRESH_INTERVAL = float(os.getenv("SIMILARITY_REFRESH_INTERVAL", "300"))
+SIMILARITY_MAX_ENTRIES = int(os.getenv("SIMILARITY_MAX_ENTRIES", "50000"))
+
+# Verified access tokens are remembered until they expire (or for at most JWT_CACHE_MAX_TTL seconds).
+# Set SUPABASE_JWKS_URL to also accept asymmetrically signed tokens; the key set is cached locally.
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+JWT_CACHE_MAX_TTL = float(os.getenv("JWT_CACHE_MAX_TTL", "3600"))
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL")
+
+# Where Flask-Limiter keeps its counters. The default SQLite file is shared by every worker on the
+# host; use memory:// for per-process counters or a redis:// URI to share them across hosts.
+RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "sqlite:///ratelimit.sqlite3")
+
+# Bearer token required to scrape /metrics; when unset the endpoint is open, so restrict it at the
+# proxy instead. Metrics are per worker process.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Generate a submission's recommendations, milestones and sources with one JSON-mode call, falling
+# back to separate calls when the response does not validate. Off by default: the careers are only
+# known once the call returns, so it always pays for milestones and sources, skipping the result
+# cache, similar-career reuse and single-flight that the separate calls use for careers seen before.
+# Turn it on when most submissions produce careers that have not been generated yet.
+AI_COMBINED_GENERATION = os.getenv("AI_COMBINED_GENERATION", "false").lower() == "true"
+
+# The built frontend served by the catch-all route, relative to the backend directory. Run
+# `python -m services.static_files` after each build to write its .br/.gz variants.
+STATIC_ROOT = os.getenv("STATIC_ROOT", os.path.join("frontend", "dist"))
+
+# Load the Gemini and Supabase SDKs and create their clients in the background as soon as a worker
+# starts (see gunicorn.conf.py), instead of on the first request that needs them
+WARM_UP = os.getenv("WARM_UP", "true").lower() == "true"
+
+# HTTP connection pool shared by every request in a worker process for Supabase calls
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+
 PROMPTS = {
     "recommendations": """Generate three personalized career recommendations based on the following quiz data:
 {quiz_data}
@@ -40,5 +182,20 @@ Title: Learn Python Basics
 Description: Enroll in the 'Python for Beginners' course on Coursera to build foundational programming skills.
 Status: Not Started
 
-Ensure there are exactly 3 resources, and no other content outside of this structure."""
-}
\ No newline at end of file
+Ensure there are exactly 3 resources, and no other content outside of this structure.""",
+
+    "combined": """Generate three personalized career recommendations based on the following quiz data:
+{quiz_data}
+
+CRITICAL: Avoid making superficial connections like merely combining the two industries they suggested. 
+Additionally, avoid overly-obvious suggestions like "Biologist" for a Biology student.
+
+Answer with a single JSON document of the form {{"recommendations": [...]}} holding exactly 3 recommendations.
+Each recommendation has:
+- job_title (<5 words), short_description, job_description, recommendation_reason
+- fit_percentage (e.g. "85%")
+- tags (2-3 comma-separated categories that the career falls into. E.g., 'Data Science, Music')
+- labels (a list of short labels)
+- milestones: exactly 5 objects with a title and a detailed description, starting with their {college_year} of college
+- sources: exactly 3 actionable resources, each with an icon (a single relevant emoji), a title, a one-sentence description, and status "Not Started"."""
+}
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Keep rate-limit counters in memory so test runs do not count against each other
+os.environ.setdefault("RATELIMIT_STORAGE_URI", "memory://")
+
+# Keep job records out of the working directory
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="pathweiz-tests-"), "jobs.sqlite3"))
@@ -0,0 +1,8 @@
+# Gunicorn reads this file automatically when started from the backend directory.
+
+
+def post_worker_init(worker):
+    """Start loading SDKs and clients in the background once the worker is ready to serve."""
+    from app import start_warm_up
+
+    start_warm_up()
@@ -1,19 +1,86 @@
-import google.generativeai as genai
-import re
-from config import PROMPTS
+import asyncio
+import logging
+import itertools
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import PROMPTS, AI_MAX_WORKERS, AI_ASYNC_MAX_CONCURRENCY, AI_CALL_TIMEOUT, AI_CALL_DEADLINE, AI_STRUCTURED_OUTPUT
+from config import AI_MAX_ATTEMPTS, AI_RETRY_BASE_DELAY, AI_RETRY_MAX_DELAY, AI_FALLBACK_MODEL
+from config import AI_BREAKER_FAILURE_THRESHOLD, AI_BREAKER_RESET_TIMEOUT
+from config import AI_QUIZ_TOKEN_BUDGET, AI_QUIZ_FIELD_TOKEN_BUDGET
+from services import parsing
+from services.cache import make_cache_key
+from services.metrics import METRICS
+from services.prompt_budget import estimate_tokens, format_quiz_data
+from services.resilience import ModelCaller
+from services.single_flight import SingleFlight
+from utils import normalize_job_title
+
+logger = logging.getLogger(__name__)
+
+AI_REQUEST_SECONDS = METRICS.histogram(
+    "ai_request_seconds", "Latency of model calls, until the last chunk when streaming.", ["prompt_type", "outcome"]
+)
+AI_FIRST_CHUNK_SECONDS = METRICS.histogram(
+    "ai_first_chunk_seconds", "Time until the first chunk of a streamed model call.", ["prompt_type"]
+)
+AI_PARSE_SECONDS = METRICS.histogram(
+    "ai_parse_seconds", "Time spent parsing model responses.", ["prompt_type"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+AI_TOKENS = METRICS.counter("ai_tokens", "Tokens sent to and generated by the model.", ["prompt_type", "kind"])
+AI_ESTIMATED_TOKENS = METRICS.histogram(
+    "ai_estimated_tokens", "Estimated tokens per model call, from the prompt and response text.", ["prompt_type", "kind"],
+    buckets=(32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+AI_PROMPT_CACHE_REQUESTS = METRICS.counter(
+    "ai_prompt_cache_requests", "Prompt cache lookups by result.", ["prompt_type", "result"]
+)
 
 class AIService:
     """
     AIService class to interact with the generative AI model for generating career recommendations,
     milestones, and learning sources based on provided data.
+
+    The *_async methods do the same work as coroutines, using the SDK's async client, for the ASGI
+    entry point.
     """
-    def __init__(self, model_name="gemini-1.5-flash"):
+    # Shared by every instance so the number of in-flight Gemini calls stays bounded per process
+    _executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="ai-service")
+
+    def __init__(self, model_name="gemini-1.5-flash", cache=None, prompt_cache=None,
+                 fallback_model_name=AI_FALLBACK_MODEL, caller=None, single_flight=None):
         """
         Initialize the AIService with a specified model name.
         
         :param model_name: The name of the generative AI model to use.
+        :param cache: An optional Cache used for milestones and sources.
+        :param prompt_cache: An optional PromptCache of raw responses keyed by the exact request.
+        :param fallback_model_name: An optional model to call when the primary one keeps failing.
+        :param caller: An optional ModelCaller holding the retry, deadline and circuit breaker settings.
+        :param single_flight: An optional SingleFlight that coalesces concurrent milestone and source
+            generations for the same key; defaults to coalescing within this process.
         """
+        # Imported here so that loading the app does not pay for the Gemini SDK
+        import google.generativeai as genai
+
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self.fallback_model_name = fallback_model_name or None
+        self.fallback_model = genai.GenerativeModel(fallback_model_name) if fallback_model_name else None
+        self.cache = cache
+        self.prompt_cache = prompt_cache
+        self.caller = caller or ModelCaller(
+            max_attempts=AI_MAX_ATTEMPTS,
+            base_delay=AI_RETRY_BASE_DELAY,
+            max_delay=AI_RETRY_MAX_DELAY,
+            deadline=AI_CALL_DEADLINE,
+            call_timeout=AI_CALL_TIMEOUT,
+            failure_threshold=AI_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=AI_BREAKER_RESET_TIMEOUT,
+        )
+        self.single_flight = single_flight or SingleFlight()
+        # Bounds in-flight async calls the way _executor bounds threads
+        self._async_slots = asyncio.Semaphore(AI_ASYNC_MAX_CONCURRENCY)
 
     def generate_recommendations(self, quiz_data):
         """
@@ -22,36 +89,532 @@ class AIService:
         :param quiz_data: A dictionary containing quiz data.
         :return: A list of parsed career recommendations.
         """
-        prompt = PROMPTS["recommendations"].format(
-            quiz_data="\n".join([f"{key}: {value}" for key, value in quiz_data.items() if key != "user_id"])
-        )
-        response = self.model.generate_content(prompt)
-        return self._parse_recommendations(response.text)
+        prompt = self._recommendations_prompt(quiz_data)
+        return self._parse_recommendations(self._generate(prompt, "recommendations"))
+
+    async def generate_recommendations_async(self, quiz_data):
+        """
+        Generate career recommendations based on quiz data, as a coroutine.
+        
+        :param quiz_data: A dictionary containing quiz data.
+        :return: A list of parsed career recommendations.
+        """
+        prompt = self._recommendations_prompt(quiz_data)
+        return self._parse_recommendations(await self._generate_async(prompt, "recommendations"))
+
+    def generate_submission(self, quiz_data, college_year):
+        """
+        Generate recommendations with their milestones and sources in one JSON-mode call.
+        
+        The milestones and sources are also stored in the result cache, so later multi-call
+        generations for the same careers reuse them.
+        
+        :param quiz_data: A dictionary containing quiz data.
+        :param college_year: The college year the milestones start from.
+        :return: A (recommendations, details) tuple, where details holds a (milestones, sources)
+            tuple per recommendation, as returned by generate_details.
+        :raises parsing.InvalidResponseError: If the response does not match the combined schema.
+        """
+        prompt = PROMPTS["combined"].format(quiz_data=self._format_quiz_data(quiz_data), college_year=college_year)
+        return self._parse_submission(self._generate(prompt, "combined", structured=True), college_year)
+
+    async def generate_submission_async(self, quiz_data, college_year):
+        """
+        Generate recommendations with their milestones and sources in one JSON-mode call, as a coroutine.
+        
+        :param quiz_data: A dictionary containing quiz data.
+        :param college_year: The college year the milestones start from.
+        :return: A (recommendations, details) tuple, as returned by generate_submission.
+        :raises parsing.InvalidResponseError: If the response does not match the combined schema.
+        """
+        prompt = PROMPTS["combined"].format(quiz_data=self._format_quiz_data(quiz_data), college_year=college_year)
+        return self._parse_submission(await self._generate_async(prompt, "combined", structured=True), college_year)
+
+    def _parse_submission(self, text, college_year):
+        """
+        Parse a combined response and store its milestones and sources in the result cache.
+        
+        :param text: The raw text response from the AI model.
+        :param college_year: The college year the milestones start from.
+        :return: A (recommendations, details) tuple.
+        :raises parsing.InvalidResponseError: If the response does not match the combined schema.
+        """
+        start = time.perf_counter()
+        try:
+            recommendations, details = parsing.parse_combined(text)
+        finally:
+            AI_PARSE_SECONDS.observe(time.perf_counter() - start, prompt_type="combined")
+
+        for rec, (milestones, sources) in zip(recommendations, details):
+            self._cache_set(self._milestones_key(rec["job_title"], college_year), milestones)
+            self._cache_set(self._sources_key(rec["job_title"]), sources)
+        return recommendations, details
+
+    def stream_recommendations(self, quiz_data):
+        """
+        Generate career recommendations, yielding each one as soon as the model has produced it.
+        
+        :param quiz_data: A dictionary containing quiz data.
+        :return: An iterator of parsed career recommendations.
+        """
+        prompt = self._recommendations_prompt(quiz_data)
+        key = self._prompt_key(prompt, None)
+        text = self._prompt_cache_get(key, "recommendations")
+        if text is not None:
+            return self._iter_recommendations(text.split("\n"), eager=True)
+
+        start = time.perf_counter()
+
+        def attempt(model, timeout):
+            # Errors usually surface on the first chunk, so it is part of the retried attempt;
+            # a stream that fails part way through is not retried
+            response = model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+            chunks = iter(response)
+            try:
+                first = next(chunks, None)
+            except Exception:
+                self._close_stream(response)
+                raise
+            return response, (chunks if first is None else itertools.chain([first], chunks))
+
+        response, chunks = self.caller.call(attempt, self._models(), "recommendations")
+        lines = self._iter_lines(self._record_chunks(key, prompt, response, chunks, start))
+        return self._iter_recommendations(lines, eager=True)
+
+    def _record_chunks(self, key, prompt, response, chunks, start):
+        """
+        Pass the text of streamed chunks through, recording the stream's latency and token usage
+        and storing the full response once the stream completes. The response is closed when the
+        caller stops reading early, e.g. after enough recommendations or a client disconnect.
+        """
+        received, chunk = [], None
+        try:
+            for chunk in chunks:
+                if not received:
+                    AI_FIRST_CHUNK_SECONDS.observe(time.perf_counter() - start, prompt_type="recommendations")
+                received.append(chunk.text)
+                yield chunk.text
+        except Exception:
+            AI_REQUEST_SECONDS.observe(time.perf_counter() - start, prompt_type="recommendations", outcome="error")
+            raise
+        finally:
+            self._close_stream(response)
+        AI_REQUEST_SECONDS.observe(time.perf_counter() - start, prompt_type="recommendations", outcome="ok")
+        # Usage totals arrive with the last chunk
+        self._record_usage("recommendations", chunk)
+        self._record_estimate("recommendations", prompt, "".join(received))
+        if self.prompt_cache is not None:
+            self.prompt_cache.set(key, "".join(received))
+
+    @staticmethod
+    def _close_stream(response):
+        """
+        Release the connection behind a streaming response. The SDK has no public close, so this
+        cancels its underlying gRPC call, or closes the generator reading its REST response.
+        """
+        stream = getattr(response, "_iterator", None)
+        close = getattr(stream, "cancel", None) or getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+    def _generate(self, prompt, prompt_type, structured=None, deadline=None):
+        """
+        Call the model for a prompt, asking for JSON output when structured output is enabled.
+        Transient failures are retried and fall back to the secondary model through the caller.
+        Responses are served from and stored in the prompt cache when one is configured.
+        
+        :param prompt: The formatted prompt.
+        :param prompt_type: The key of the prompt in PROMPTS, used to pick the response schema.
+        :param structured: Whether to ask for JSON output; defaults to AI_STRUCTURED_OUTPUT.
+        :param deadline: An optional monotonic time after which nobody waits for the result.
+        :return: The response text.
+        """
+        generation_config = self._generation_config(prompt_type, structured)
+        key = self._prompt_key(prompt, generation_config)
+        text = self._prompt_cache_get(key, prompt_type)
+        if text is None:
+            def attempt(model, timeout):
+                response = model.generate_content(prompt, **self._request_kwargs(generation_config, timeout))
+                return response, response.text
+
+            start = time.perf_counter()
+            try:
+                budget = None if deadline is None else deadline - time.monotonic()
+                response, text = self.caller.call(attempt, self._models(), prompt_type, budget=budget)
+            except Exception:
+                AI_REQUEST_SECONDS.observe(time.perf_counter() - start, prompt_type=prompt_type, outcome="error")
+                raise
+            self._record_response(prompt_type, key, prompt, response, text, start)
+        return text
+
+    async def _generate_async(self, prompt, prompt_type, structured=None):
+        """
+        Call the model for a prompt through the SDK's async client, like _generate.
+        
+        :param prompt: The formatted prompt.
+        :param prompt_type: The key of the prompt in PROMPTS, used to pick the response schema.
+        :param structured: Whether to ask for JSON output; defaults to AI_STRUCTURED_OUTPUT.
+        :return: The response text.
+        """
+        generation_config = self._generation_config(prompt_type, structured)
+        key = self._prompt_key(prompt, generation_config)
+        text = self._prompt_cache_get(key, prompt_type)
+        if text is None:
+            async def attempt(model, timeout):
+                async with self._async_slots:
+                    response = await model.generate_content_async(
+                        prompt, **self._request_kwargs(generation_config, timeout)
+                    )
+                return response, response.text
+
+            start = time.perf_counter()
+            try:
+                response, text = await self.caller.call_async(attempt, self._models(), prompt_type)
+            except Exception:
+                AI_REQUEST_SECONDS.observe(time.perf_counter() - start, prompt_type=prompt_type, outcome="error")
+                raise
+            self._record_response(prompt_type, key, prompt, response, text, start)
+        return text
+
+    @staticmethod
+    def _generation_config(prompt_type, structured):
+        """
+        Build the generation config asking for JSON output, when structured output is enabled.
+        
+        :param prompt_type: The key of the prompt in PROMPTS, used to pick the response schema.
+        :param structured: Whether to ask for JSON output; None means AI_STRUCTURED_OUTPUT.
+        :return: The generation config, or None for plain text output.
+        """
+        if not (AI_STRUCTURED_OUTPUT if structured is None else structured):
+            return None
+        return {
+            "response_mime_type": "application/json",
+            "response_schema": parsing.RESPONSE_SCHEMAS[prompt_type],
+        }
+
+    @staticmethod
+    def _request_kwargs(generation_config, timeout):
+        """Build the keyword arguments of one model call."""
+        kwargs = {"request_options": {"timeout": timeout}}
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        return kwargs
+
+    def _record_response(self, prompt_type, key, prompt, response, text, start):
+        """Record a successful call's latency and token usage, and store its text in the prompt cache."""
+        AI_REQUEST_SECONDS.observe(time.perf_counter() - start, prompt_type=prompt_type, outcome="ok")
+        self._record_usage(prompt_type, response)
+        self._record_estimate(prompt_type, prompt, text)
+        if self.prompt_cache is not None:
+            self.prompt_cache.set(key, text)
+
+    def _models(self):
+        """Return the (name, model) pairs to try, primary first."""
+        if self.fallback_model is None:
+            return [(self.model_name, self.model)]
+        return [(self.model_name, self.model), (self.fallback_model_name, self.fallback_model)]
+
+    def _prompt_cache_get(self, key, prompt_type):
+        """
+        Look up a response in the prompt cache, counting hits and misses.
+        
+        :param key: A key from _prompt_key.
+        :param prompt_type: The key of the prompt in PROMPTS.
+        :return: The stored response text, or None if the model should be called.
+        """
+        if self.prompt_cache is None:
+            return None
+        text = self.prompt_cache.get(key)
+        AI_PROMPT_CACHE_REQUESTS.inc(prompt_type=prompt_type, result="miss" if text is None else "hit")
+        return text
+
+    @staticmethod
+    def _record_usage(prompt_type, response):
+        """
+        Count the prompt and output tokens reported with a response, when the model reports them.
+        
+        :param prompt_type: The key of the prompt in PROMPTS.
+        :param response: The response, or the last streamed chunk.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        AI_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, prompt_type=prompt_type, kind="prompt")
+        AI_TOKENS.inc(getattr(usage, "candidates_token_count", 0) or 0, prompt_type=prompt_type, kind="output")
+
+    @staticmethod
+    def _record_estimate(prompt_type, prompt, text):
+        """
+        Record the estimated input and output tokens of a call, which are available even when the
+        model reports no usage, and log them.
+        
+        :param prompt_type: The key of the prompt in PROMPTS.
+        :param prompt: The prompt sent.
+        :param text: The response text.
+        """
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        AI_ESTIMATED_TOKENS.observe(input_tokens, prompt_type=prompt_type, kind="input")
+        AI_ESTIMATED_TOKENS.observe(output_tokens, prompt_type=prompt_type, kind="output")
+        logger.debug("%s call: ~%d input tokens, ~%d output tokens", prompt_type, input_tokens, output_tokens)
+
+    def _prompt_key(self, prompt, generation_config):
+        """
+        Build the prompt cache key for a request. Streamed and unstreamed calls without a
+        generation config share keys, since the full response text is the same.
+        
+        :param prompt: The formatted prompt.
+        :param generation_config: The generation config sent with the prompt, if any.
+        :return: The cache key, or None when there is no prompt cache.
+        """
+        if self.prompt_cache is None:
+            return None
+        return self.prompt_cache.key(self.model_name, prompt, generation_config)
+
+    def _recommendations_prompt(self, quiz_data):
+        """
+        Build the recommendations prompt from quiz data.
+        
+        :param quiz_data: A dictionary containing quiz data.
+        :return: The formatted prompt.
+        """
+        return PROMPTS["recommendations"].format(quiz_data=self._format_quiz_data(quiz_data))
+
+    @staticmethod
+    def _format_quiz_data(quiz_data):
+        """Format the quiz answers as one "field: answer" line each, within AI_QUIZ_TOKEN_BUDGET."""
+        return format_quiz_data(quiz_data, AI_QUIZ_TOKEN_BUDGET, AI_QUIZ_FIELD_TOKEN_BUDGET)
 
-    def generate_milestones(self, job_title, college_year):
+    def generate_milestones(self, job_title, college_year, deadline=None):
         """
         Generate milestones for a specific career path.
         
         :param job_title: The job title for which to generate milestones.
+        :param college_year: The college year the milestones start from.
+        :param deadline: An optional monotonic time after which the model call gives up.
         :return: A list of parsed milestones.
         """
-        prompt = PROMPTS["milestones"].format(
-            job_title=job_title,
-            college_year=college_year
-        )
-        response = self.model.generate_content(prompt)
-        return self._parse_milestones(response.text)
+        key = self._milestones_key(job_title, college_year)
+        milestones = self._cache_get(key)
+        if milestones is None:
+            def generate():
+                prompt = PROMPTS["milestones"].format(
+                    job_title=job_title,
+                    college_year=college_year
+                )
+                result = self._parse_milestones(self._generate(prompt, "milestones", deadline=deadline))
+                self._cache_set(key, result)
+                return result
 
-    def generate_sources(self, job_title):
+            milestones = self.single_flight.do(key, generate, recheck=lambda: self._cache_get(key), name="milestones")
+        return milestones
+
+    def generate_sources(self, job_title, deadline=None):
         """
         Generate learning sources for a specific career path.
         
+        :param job_title: The job title for which to generate learning sources.
+        :param deadline: An optional monotonic time after which the model call gives up.
+        :return: A list of parsed learning sources.
+        """
+        key = self._sources_key(job_title)
+        sources = self._cache_get(key)
+        if sources is None:
+            def generate():
+                prompt = PROMPTS["sources"].format(job_title=job_title)
+                result = self._parse_sources(self._generate(prompt, "sources", deadline=deadline))
+                self._cache_set(key, result)
+                return result
+
+            sources = self.single_flight.do(key, generate, recheck=lambda: self._cache_get(key), name="sources")
+        return sources
+
+    async def generate_milestones_async(self, job_title, college_year):
+        """
+        Generate milestones for a specific career path, as a coroutine.
+        
+        :param job_title: The job title for which to generate milestones.
+        :param college_year: The college year the milestones start from.
+        :return: A list of parsed milestones.
+        """
+        key = self._milestones_key(job_title, college_year)
+        milestones = self._cache_get(key)
+        if milestones is None:
+            async def generate():
+                prompt = PROMPTS["milestones"].format(job_title=job_title, college_year=college_year)
+                result = self._parse_milestones(await self._generate_async(prompt, "milestones"))
+                self._cache_set(key, result)
+                return result
+
+            milestones = await self.single_flight.do_async(
+                key, generate, recheck=lambda: self._cache_get(key), name="milestones"
+            )
+        return milestones
+
+    async def generate_sources_async(self, job_title):
+        """
+        Generate learning sources for a specific career path, as a coroutine.
+        
         :param job_title: The job title for which to generate learning sources.
         :return: A list of parsed learning sources.
         """
-        prompt = PROMPTS["sources"].format(job_title=job_title)
-        response = self.model.generate_content(prompt)
-        return self._parse_sources(response.text)
+        key = self._sources_key(job_title)
+        sources = self._cache_get(key)
+        if sources is None:
+            async def generate():
+                prompt = PROMPTS["sources"].format(job_title=job_title)
+                result = self._parse_sources(await self._generate_async(prompt, "sources"))
+                self._cache_set(key, result)
+                return result
+
+            sources = await self.single_flight.do_async(key, generate, recheck=lambda: self._cache_get(key), name="sources")
+        return sources
+
+    def _milestones_key(self, job_title, college_year):
+        """Build the result cache key of the milestones for a job title and college year."""
+        return self._cache_key("milestones", normalize_job_title(job_title), " ".join(str(college_year).lower().split()))
+
+    def _sources_key(self, job_title):
+        """Build the result cache key of the sources for a job title."""
+        return self._cache_key("sources", normalize_job_title(job_title))
+
+    def _cache_key(self, prompt_type, *args):
+        """
+        Build the cache key for a prompt type and its normalized arguments.
+        
+        :param prompt_type: The key of the prompt in PROMPTS.
+        :param args: The normalized prompt arguments.
+        :return: A content-addressed cache key.
+        """
+        return make_cache_key(prompt_type, self.model_name, PROMPTS[prompt_type], *args)
+
+    def _cache_get(self, key):
+        """Return a cached result, or None if there is no cache or no entry."""
+        return self.cache.get(key) if self.cache is not None else None
+
+    def _cache_set(self, key, value):
+        """Cache a non-empty result."""
+        if self.cache is not None and value:
+            self.cache.set(key, value)
+
+    def generate_details(self, recommendations, college_year, timeout=AI_CALL_DEADLINE, reused=None):
+        """
+        Generate milestones and sources for several recommendations concurrently.
+        
+        Every milestone and source call is submitted to the shared thread pool up front, so the
+        whole fan-out takes about one LLM round trip. A call that fails or misses the deadline
+        yields an empty list instead of failing the other recommendations; the calls are given
+        the same deadline, so one that misses it stops and frees its worker.
+        
+        :param recommendations: A list of parsed recommendations.
+        :param college_year: The college year used when generating milestones.
+        :param timeout: The number of seconds to wait for the fan-out to complete.
+        :param reused: An optional list of (milestones, sources) tuples, one per recommendation,
+            holding rows reused from a similar career; None entries are generated.
+        :return: A list of (milestones, sources) tuples in the same order as the recommendations.
+        """
+        reused = reused or [(None, None)] * len(recommendations)
+        deadline = time.monotonic() + timeout
+        pending = [
+            self.submit_details(rec["job_title"], college_year, milestones=milestones, sources=sources, deadline=deadline)
+            for rec, (milestones, sources) in zip(recommendations, reused)
+        ]
+        return [
+            (self._collect(milestones, deadline, "milestones"), self._collect(sources, deadline, "sources"))
+            for milestones, sources in pending
+        ]
+
+    async def generate_details_async(self, recommendations, college_year, timeout=AI_CALL_DEADLINE, reused=None):
+        """
+        Generate milestones and sources for several recommendations concurrently, as a coroutine.
+        Failures and calls that miss the deadline yield empty lists, as in generate_details.
+        
+        :param recommendations: A list of parsed recommendations.
+        :param college_year: The college year used when generating milestones.
+        :param timeout: The number of seconds to wait for the fan-out to complete.
+        :param reused: An optional list of (milestones, sources) tuples, one per recommendation;
+            None entries are generated.
+        :return: A list of (milestones, sources) tuples in the same order as the recommendations.
+        """
+        reused = reused or [(None, None)] * len(recommendations)
+        pending = [
+            (
+                milestones if milestones is not None
+                else asyncio.ensure_future(self.generate_milestones_async(rec["job_title"], college_year)),
+                sources if sources is not None
+                else asyncio.ensure_future(self.generate_sources_async(rec["job_title"])),
+            )
+            for rec, (milestones, sources) in zip(recommendations, reused)
+        ]
+        tasks = [item for pair in pending for item in pair if isinstance(item, asyncio.Future)]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        return [
+            (self._collect_task(milestones, "milestones"), self._collect_task(sources, "sources"))
+            for milestones, sources in pending
+        ]
+
+    @staticmethod
+    def _collect_task(task, label):
+        """
+        Return the result of a fan-out task, or an empty list if it failed or is still running.
+        
+        :param task: An asyncio task, or a reused result.
+        :param label: A short name for the call, used in log messages.
+        :return: The parsed result of the call, or an empty list.
+        """
+        if not isinstance(task, asyncio.Future):
+            return task
+        if not task.done():
+            task.cancel()
+            logger.warning("Timed out generating %s", label)
+            return []
+        if task.exception() is not None:
+            logger.error("Failed to generate %s", label, exc_info=task.exception())
+            return []
+        return task.result()
+
+    def submit_details(self, job_title, college_year, milestones=None, sources=None, deadline=None):
+        """
+        Start generating milestones and sources for one job title on the shared thread pool.
+        
+        :param job_title: The job title for which to generate milestones and sources.
+        :param college_year: The college year used when generating milestones.
+        :param milestones: Optional milestones to use instead of generating them.
+        :param sources: Optional sources to use instead of generating them.
+        :param deadline: An optional monotonic time after which the model calls give up.
+        :return: A (milestones, sources) tuple of futures.
+        """
+        return (
+            self._completed(milestones) if milestones is not None
+            else self._executor.submit(self.generate_milestones, job_title, college_year, deadline),
+            self._completed(sources) if sources is not None
+            else self._executor.submit(self.generate_sources, job_title, deadline),
+        )
+
+    @staticmethod
+    def _completed(result):
+        """Wrap a known result in a finished future."""
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _collect(self, future, deadline, label):
+        """
+        Wait for a fan-out call and return its result, or an empty list if it failed.
+        
+        :param future: The future returned by the thread pool.
+        :param deadline: The monotonic time after which the call is abandoned. The call was
+            given the same deadline, so it stops on its own shortly after.
+        :param label: A short name for the call, used in log messages.
+        :return: The parsed result of the call, or an empty list.
+        """
+        try:
+            return future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.warning("Timed out generating %s", label)
+        except Exception:
+            logger.exception("Failed to generate %s", label)
+        return []
 
     def _parse_recommendations(self, text):
         """
@@ -60,74 +623,31 @@ class AIService:
         :param text: The raw text response from the AI model.
         :return: A list of parsed recommendations.
         """
-        recommendations = []
-        current_recommendation = {}
-        
-        # Split the text into lines and process each line
-        lines = text.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            if "Recommendation" in line:
-                if current_recommendation:
-                    recommendations.append(current_recommendation)
-                current_recommendation = {}
-                continue
-
-            # Extract information using regex patterns
-            job_title_match = re.search(r"Job Title:\*\*(.*?)\*\*", line) or \
-                            re.search(r"1\.\s*\*\*Job Title:\*\*(.*)", line) or \
-                            re.search(r"Job Title:(.*)", line)
-            
-            short_desc_match = re.search(r"Short Description:\*\*(.*?)\*\*", line) or \
-                              re.search(r"2\.\s*\*\*Short Description:\*\*(.*)", line) or \
-                              re.search(r"Short Description:(.*)", line)
-            
-            job_desc_match = re.search(r"Full Job Description:\*\*(.*?)\*\*", line) or \
-                            re.search(r"3\.\s*\*\*Full Job Description:\*\*(.*)", line) or \
-                            re.search(r"Full Job Description:(.*)", line)
-            
-            rec_reason_match = re.search(r"Why it's recommended:\*\*(.*?)\*\*", line) or \
-                              re.search(r"4\.\s*\*\*Why it's recommended:\*\*(.*)", line) or \
-                              re.search(r"Why it's recommended:(.*)", line)
-            
-            fit_match = re.search(r"Fit Percentage:\*\*(.*?)\*\*", line) or \
-                       re.search(r"5\.\s*\*\*Fit Percentage:\*\*(.*)", line) or \
-                       re.search(r"Fit Percentage:(.*)", line)
-            
-            tags_match = re.search(r"Tags:\*\*(.*?)\*\*", line) or \
-                        re.search(r"6\.\s*\*\*Tags:\*\*(.*)", line) or \
-                        re.search(r"Tags:(.*)", line)
-            
-            labels_match = re.search(r"Labels:\*\*(.*?)\*\*", line) or \
-                          re.search(r"7\.\s*\*\*Labels:\*\*(.*)", line) or \
-                          re.search(r"Labels:(.*)", line)
-
-            # Update current recommendation with matched content
-            if job_title_match:
-                current_recommendation["job_title"] = job_title_match.group(1).strip()
-            elif short_desc_match:
-                current_recommendation["short_description"] = short_desc_match.group(1).strip()
-            elif job_desc_match:
-                current_recommendation["job_description"] = job_desc_match.group(1).strip()
-            elif rec_reason_match:
-                current_recommendation["recommendation_reason"] = rec_reason_match.group(1).strip()
-            elif fit_match:
-                current_recommendation["fit_percentage"] = fit_match.group(1).strip()
-            elif tags_match:
-                current_recommendation["tags"] = tags_match.group(1).strip()
-            elif labels_match:
-                current_recommendation["labels"] = [label.strip() for label in labels_match.group(1).split(",")]
-
-        # Add the last recommendation if it exists
-        if current_recommendation:
-            recommendations.append(current_recommendation)
-
+        start = time.perf_counter()
+        recommendations = parsing.parse_recommendations(text)
+        AI_PARSE_SECONDS.observe(time.perf_counter() - start, prompt_type="recommendations")
         return recommendations
 
+    @staticmethod
+    def _iter_lines(chunks):
+        """
+        Reassemble streamed text chunks into complete lines.
+        
+        :param chunks: An iterator of text fragments.
+        :return: An iterator of lines, without their trailing newlines.
+        """
+        return parsing.iter_lines(chunks)
+
+    def _iter_recommendations(self, lines, eager=False):
+        """
+        Parse recommendations from an iterator of response lines.
+        
+        :param lines: An iterator of lines from the AI response.
+        :param eager: If true, yield each recommendation as soon as its Labels line is parsed.
+        :return: An iterator of parsed recommendations.
+        """
+        return parsing.iter_recommendations(lines, eager=eager)
+
     def _parse_milestones(self, text):
         """
         Parse the AI response for milestones.
@@ -135,28 +655,9 @@ class AIService:
         :param text: The raw text response from the AI model.
         :return: A list of parsed milestones.
         """
-        milestones = []
-        lines = text.strip().split('\n')
-        current_milestone = {}
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            title_match = re.search(r"Title:\s*(.*)", line)
-            description_match = re.search(r"Description:\s*(.*)", line)
-
-            if title_match:
-                if current_milestone:
-                    milestones.append(current_milestone)
-                current_milestone = {"title": title_match.group(1).strip()}
-            elif description_match:
-                current_milestone["description"] = description_match.group(1).strip()
-
-        if current_milestone:
-            milestones.append(current_milestone)
-
+        start = time.perf_counter()
+        milestones = parsing.parse_milestones(text)
+        AI_PARSE_SECONDS.observe(time.perf_counter() - start, prompt_type="milestones")
         return milestones
 
     def _parse_sources(self, text):
@@ -166,36 +667,7 @@ class AIService:
         :param text: The raw text response from the AI model.
         :return: A list of parsed learning sources.
         """
-        sources = []
-        lines = text.strip().split('\n')
-        current_source = {}
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            title_match = re.search(r"Title:\s*(.*)", line)
-            description_match = re.search(r"Description:\s*(.*)", line)
-            status_match = re.search(r"Status:\s*(.*)", line)
-            icon_match = re.search(r"Icon:\s*(.)", line)
-
-            if icon_match:
-                if "title" in current_source:
-                    sources.append(current_source)
-                    current_source = {}
-                current_source["icon"] = icon_match.group(1).strip()
-            elif title_match:
-                if current_source:
-                    sources.append(current_source)
-                current_source['title'] = title_match.group(1).strip()
-            elif description_match:
-                current_source["description"] = description_match.group(1).strip()
-            elif status_match:
-                current_source["status"] = status_match.group(1).strip()
-
-        if "title" in current_source:
-            sources.append(current_source)
-
+        start = time.perf_counter()
+        sources = parsing.parse_sources(text)
+        AI_PARSE_SECONDS.observe(time.perf_counter() - start, prompt_type="sources")
         return sources
-    
\ No newline at end of file
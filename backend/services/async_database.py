@@ -0,0 +1,41 @@
+import asyncio
+from contextlib import nullcontext
+
+from services.database import DatabaseService
+from services.steps import run_async
+
+
+class AsyncDatabaseService(DatabaseService):
+    """
+    AsyncDatabaseService class with every DatabaseService operation as a coroutine on the async
+    Supabase client. The queries are DatabaseService's own; only how they are executed differs.
+    Requests wait on the event loop instead of holding a thread, so one worker can keep many of
+    them in flight.
+    """
+    _run = staticmethod(run_async)
+
+    def __init__(self, supabase_client, cache=None, max_in_flight=None):
+        """
+        Initialize the AsyncDatabaseService with an async Supabase client.
+
+        :param supabase_client: An instance of the async Supabase client (supabase.AsyncClient).
+        :param cache: An optional Cache for learning sources and recommendation snapshots. Share it
+            with the DatabaseService so both see the same entries.
+        :param max_in_flight: An optional bound on concurrent requests, normally the size of the
+            client's connection pool. Requests beyond it wait on a semaphore rather than in the
+            pool's own queue, which is rescanned on every request and slows down when thousands wait.
+        """
+        super().__init__(supabase_client, cache=cache)
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight else nullcontext()
+
+    async def _execute(self, table, operation, query):
+        """
+        Execute a query once a slot is free, timing only the request itself.
+
+        :param table: The table the query targets.
+        :param operation: "select", "insert", "upsert", "update" or "delete".
+        :param query: The built query.
+        :return: The query response.
+        """
+        async with self._slots:
+            return await super()._execute(table, operation, query)
@@ -0,0 +1,105 @@
+import hashlib
+import time
+
+import jwt
+
+from services.cache import MemoryCache
+
+# Algorithms accepted for keys published in the JWKS; HS256 tokens are checked against the shared secret
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+
+class TokenVerifier:
+    """
+    TokenVerifier class that verifies Supabase access tokens and remembers the claims of tokens it
+    has already verified, so a token polled with many times is only decoded once.
+    """
+    def __init__(self, secret=None, jwks_url=None, audience="authenticated", cache=None, max_ttl=3600,
+                 jwks_lifespan=600):
+        """
+        Initialize the TokenVerifier.
+
+        :param secret: The shared secret for HS256 tokens.
+        :param jwks_url: An optional JWKS endpoint for RS256/ES256 tokens; its keys are cached locally.
+        :param audience: The audience every token must carry.
+        :param cache: An optional MemoryCache of verified claims, keyed by token hash.
+        :param max_ttl: The longest a verified token is remembered, for tokens that expire later or never.
+        :param jwks_lifespan: Seconds to keep the fetched key set before refetching it.
+        """
+        self.secret = secret
+        self.audience = audience
+        self.cache = cache
+        self.max_ttl = max_ttl
+        self.jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=jwks_lifespan) if jwks_url else None
+
+    def user_id_from_header(self, auth_header):
+        """
+        Verify the bearer token in an Authorization header and extract the user ID.
+
+        :param auth_header: The Authorization header value.
+        :return: The token's "sub" claim.
+        :raises ValueError: If the header is malformed or the token is not valid.
+        """
+        if not auth_header or not auth_header.startswith("Bearer "):
+            raise ValueError("Invalid Authorization header format. Expected 'Bearer <token>'.")
+        return self.verify(auth_header.split(" ")[1]).get("sub")
+
+    def verify(self, token):
+        """
+        Return the claims of a valid token, from the cache when it has been verified before.
+
+        :param token: The encoded JWT.
+        :return: The decoded claims.
+        :raises ValueError: If the token is not valid.
+        """
+        if self.cache is None:
+            return self._decode(token)
+
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        claims = self.cache.get(key)
+        if claims is None:
+            claims = self._decode(token)
+            ttl = self.max_ttl
+            if "exp" in claims:
+                ttl = min(ttl, claims["exp"] - time.time())
+            if ttl > 0:
+                self.cache.set(key, claims, ttl=ttl)
+        return claims
+
+    def _decode(self, token):
+        """
+        Verify a token's signature, expiry, and audience.
+
+        :param token: The encoded JWT.
+        :return: The decoded claims.
+        :raises ValueError: If the token is not valid.
+        """
+        try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+            if algorithm in ASYMMETRIC_ALGORITHMS and self.jwks_client is not None:
+                key, algorithms = self.jwks_client.get_signing_key_from_jwt(token).key, ASYMMETRIC_ALGORITHMS
+            else:
+                key, algorithms = self.secret, ["HS256"]
+            return jwt.decode(token, key, algorithms=algorithms, audience=self.audience)
+        except jwt.ExpiredSignatureError:
+            raise ValueError("Token has expired.")
+        except jwt.InvalidAudienceError:
+            raise ValueError("Invalid audience.")
+        except jwt.InvalidTokenError as e:
+            raise ValueError(f"Invalid token: {e}")
+        except Exception as e:
+            raise ValueError(f"Error decoding token: {e}")
+
+
+def create_token_verifier(secret, jwks_url=None, max_entries=10000, max_ttl=3600):
+    """
+    Create a TokenVerifier with an in-memory verified-token cache.
+
+    :param secret: The shared secret for HS256 tokens.
+    :param jwks_url: An optional JWKS endpoint for asymmetric tokens.
+    :param max_entries: The number of verified tokens to remember; 0 disables the cache.
+    :param max_ttl: The longest a verified token is remembered.
+    :return: A TokenVerifier.
+    """
+    cache = MemoryCache(max_entries=max_entries, ttl=max_ttl) if max_entries else None
+    return TokenVerifier(secret=secret, jwks_url=jwks_url, cache=cache, max_ttl=max_ttl)
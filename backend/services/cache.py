@@ -0,0 +1,219 @@
+import abc
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(*parts):
+    """
+    Build a content-addressed cache key from JSON-serializable parts.
+
+    :param parts: The values that determine the cached result.
+    :return: A hex SHA-256 digest of the parts.
+    """
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Cache(abc.ABC):
+    """
+    Base class for cache backends. Subclasses implement _get and _set; this class keeps the
+    hit/miss counters shared by every backend.
+    """
+    def __init__(self, ttl):
+        """
+        :param ttl: The default number of seconds an entry stays valid.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached value for a key, or None if it is missing or expired.
+
+        :param key: The cache key.
+        :return: The cached value or None.
+        """
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value under a key.
+
+        :param key: The cache key.
+        :param value: A JSON-serializable value.
+        :param ttl: Seconds until the entry expires, defaulting to the cache's TTL.
+        """
+        self._set(key, value, time.time() + (self.ttl if ttl is None else ttl))
+
+    def stats(self):
+        """
+        Return the hit/miss counters for this cache.
+
+        :return: A dictionary with hits, misses, and hit_rate.
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    @abc.abstractmethod
+    def _get(self, key):
+        """Return the unexpired value stored under a key, or None."""
+
+    @abc.abstractmethod
+    def _set(self, key, value, expires_at):
+        """Store a value under a key until the expires_at timestamp."""
+
+
+class MemoryCache(Cache):
+    """
+    In-process cache with least-recently-used eviction and per-entry expiry.
+    """
+    def __init__(self, max_entries=1024, ttl=3600):
+        """
+        :param max_entries: The number of entries kept before the least recently used is evicted.
+        :param ttl: The default number of seconds an entry stays valid.
+        """
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove a key from the cache if present.
+
+        :param key: The cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(Cache):
+    """
+    Cache stored in a local SQLite file, so every worker process on a host shares the same entries.
+    Expired entries are deleted as entries are written and, when max_entries is set, so are the
+    entries closest to expiry once the file holds more than that many.
+    """
+    # Expired entries and entry counts are checked once every this many writes rather than on each one
+    EVICT_EVERY = 100
+
+    def __init__(self, path, ttl=3600, max_entries=None):
+        """
+        :param path: The path of the SQLite database file.
+        :param ttl: The default number of seconds an entry stays valid.
+        :param max_entries: An optional bound on the number of entries kept.
+        """
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        """Return this thread's connection, opening a new one after a fork."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key, value, expires_at):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self):
+        """Delete expired entries, then the entries closest to expiry beyond max_entries."""
+        connection = self._connection()
+        connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        if self.max_entries is not None:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at "
+                "LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))",
+                (self.max_entries,),
+            )
+
+    def delete(self, key):
+        """
+        Remove a key from the cache if present.
+
+        :param key: The cache key.
+        """
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        self._connection().execute("DELETE FROM cache")
+
+
+def create_cache(backend, path=None, max_entries=None, ttl=3600):
+    """
+    Create a cache backend by name.
+
+    :param backend: "memory", "sqlite", or "none".
+    :param path: The SQLite file path, required for the sqlite backend.
+    :param max_entries: The LRU size of the memory backend (1024 if not given), or the optional
+        entry bound of the sqlite backend.
+    :param ttl: The default number of seconds an entry stays valid.
+    :return: A Cache instance, or None when caching is disabled.
+    :raises ValueError: If the backend name is unknown.
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries or 1024, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(path, ttl=ttl, max_entries=max_entries)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -1,18 +1,79 @@
-from flask_supabase import Supabase
+import logging
+import time
+from datetime import datetime, timezone
+
+from config import SOURCES_CACHE_TTL, RECOMMENDATION_SNAPSHOT_CACHE_TTL, RECOMMENDATION_SNAPSHOT_RETRY_INTERVAL
+from services.metrics import METRICS
+from services.steps import run, shared
+
+logger = logging.getLogger(__name__)
+
+DB_REQUEST_SECONDS = METRICS.histogram(
+    "db_request_seconds", "Latency of Supabase requests.", ["table", "operation", "outcome"]
+)
+DB_ROWS = METRICS.counter("db_rows", "Rows returned or written by Supabase requests.", ["table", "operation"])
+
+# One row per user holding their latest recommendations, see sql/recommendation_snapshots.sql
+SNAPSHOT_TABLE = "recommendation_snapshots"
+SNAPSHOT_SIZE = 3
+# The columns of job_recommendations, so a snapshot reads back exactly like the rows it copies
+SNAPSHOT_COLUMNS = (
+    "id", "user_id", "job_title", "short_description", "job_description", "fit_percentage",
+    "recommendation_reason", "labels", "tags", "created_at",
+)
+
+def build_snapshots(recommendations, user_ids=()):
+    """
+    Group recommendation rows into per-user snapshots.
+
+    :param recommendations: Rows of job_recommendations, newest first for each user.
+    :param user_ids: Users to include even without any rows, so their empty snapshot is stored too.
+    :return: A dictionary mapping each user ID to its first SNAPSHOT_SIZE rows, limited to SNAPSHOT_COLUMNS.
+    """
+    snapshots = {user_id: [] for user_id in user_ids}
+    for rec in recommendations:
+        rows = snapshots.setdefault(rec["user_id"], [])
+        if len(rows) < SNAPSHOT_SIZE:
+            rows.append({column: rec[column] for column in SNAPSHOT_COLUMNS if column in rec})
+    return snapshots
+
+def snapshot_rows(snapshots):
+    """
+    Build the recommendation_snapshots rows to upsert for a set of snapshots.
+
+    :param snapshots: A dictionary mapping user IDs to their snapshot rows.
+    :return: A list of table rows.
+    """
+    updated_at = datetime.now(timezone.utc).isoformat()
+    return [
+        {"user_id": user_id, "recommendations": rows, "updated_at": updated_at}
+        for user_id, rows in snapshots.items()
+    ]
 
 class DatabaseService:
     """
     DatabaseService class to interact with the Supabase client for performing CRUD operations
     related to quiz responses, job recommendations, milestones, and learning sources.
+
+    The operations are written once as step generators (see services.steps) and run on the
+    calling thread here; AsyncDatabaseService runs the same operations as coroutines.
     """
-    def __init__(self, supabase_client):
+    # Runs each operation's steps; AsyncDatabaseService awaits them instead
+    _run = staticmethod(run)
+
+    def __init__(self, supabase_client, cache=None):
         """
         Initialize the DatabaseService with a Supabase client.
         
         :param supabase_client: An instance of the Supabase client.
+        :param cache: An optional Cache for learning sources and recommendation snapshots.
         """
         self.client = supabase_client
+        self.cache = cache
+        # Monotonic time until which reads skip the snapshot table after it failed
+        self._snapshots_retry_at = 0.0
 
+    @shared
     def save_quiz_responses(self, mapped_data):
         """
         Save or update quiz responses for a user.
@@ -21,13 +82,14 @@ class DatabaseService:
         :return: The saved or updated quiz responses.
         :raises Exception: If the upsert operation fails.
         """
-        response = self.client.from_("quiz_responses") \
-            .upsert(mapped_data, on_conflict=["user_id"]) \
-            .execute()
+        query = self.client.from_("quiz_responses") \
+            .upsert(mapped_data, on_conflict=["user_id"])
+        response = yield self._execute("quiz_responses", "upsert", query)
         if not response.data:
             raise Exception(f"Failed to upsert quiz responses: {response}")
         return response.data
 
+    @shared
     def get_user_quiz_responses(self, user_id):
         """
         Fetch quiz responses for a specific user.
@@ -36,15 +98,16 @@ class DatabaseService:
         :return: The quiz responses of the user.
         :raises Exception: If the fetch operation fails.
         """
-        response = self.client.from_("quiz_responses") \
+        query = self.client.from_("quiz_responses") \
             .select("*") \
             .eq("user_id", user_id) \
-            .single() \
-            .execute()
+            .single()
+        response = yield self._execute("quiz_responses", "select", query)
         if not response.data:
             raise Exception(f"Failed to fetch quiz responses: {response}")
         return response.data
 
+    @shared
     def save_recommendation(self, rec_data):
         """
         Save a job recommendation and return its ID.
@@ -53,11 +116,13 @@ class DatabaseService:
         :return: The ID of the saved recommendation.
         :raises Exception: If the insert operation fails.
         """
-        response = self.client.from_("job_recommendations").insert(rec_data).execute()
+        query = self.client.from_("job_recommendations").insert(rec_data)
+        response = yield self._execute("job_recommendations", "insert", query)
         if not response.data:
             raise Exception(f"Failed to insert recommendation: {response}")
         return response.data[0]["id"]
 
+    @shared
     def save_milestone(self, milestone_data):
         """
         Save a milestone for a recommendation.
@@ -66,11 +131,13 @@ class DatabaseService:
         :return: The saved milestone data.
         :raises Exception: If the insert operation fails.
         """
-        response = self.client.from_("milestones").insert(milestone_data).execute()
+        query = self.client.from_("milestones").insert(milestone_data)
+        response = yield self._execute("milestones", "insert", query)
         if not response.data:
             raise Exception(f"Failed to insert milestone: {response}")
         return response.data
 
+    @shared
     def save_source(self, source_data):
         """
         Save a learning source for a recommendation.
@@ -79,23 +146,424 @@ class DatabaseService:
         :return: The saved source data.
         :raises Exception: If the insert operation fails.
         """
-        response = self.client.from_("sources").insert(source_data).execute()
+        query = self.client.from_("sources").insert(source_data)
+        response = yield self._execute("sources", "insert", query)
         if not response.data:
             raise Exception(f"Failed to insert source")
         return response.data
 
+    @shared
+    def save_recommendations(self, recs_data):
+        """
+        Save several job recommendations in a single request.
+        
+        :param recs_data: A list of dictionaries containing the recommendation data to be saved.
+        :return: The IDs of the saved recommendations, in input order.
+        :raises Exception: If the insert operation fails.
+        """
+        rows = yield self._insert_recommendations(recs_data)
+        return [row["id"] for row in rows]
+
+    @shared
+    def save_milestones(self, milestones_data):
+        """
+        Save several milestones in a single request.
+        
+        :param milestones_data: A list of dictionaries containing the milestone data to be saved.
+        :return: The saved milestone data, in input order.
+        :raises Exception: If the insert operation fails.
+        """
+        if not milestones_data:
+            return []
+        query = self.client.from_("milestones").insert(milestones_data)
+        response = yield self._execute("milestones", "insert", query)
+        if len(response.data or []) != len(milestones_data):
+            raise Exception(f"Failed to insert milestones: {response}")
+        return response.data
+
+    @shared
+    def save_sources(self, sources_data):
+        """
+        Save several learning sources in a single request.
+        
+        :param sources_data: A list of dictionaries containing the source data to be saved.
+        :return: The saved source data, in input order.
+        :raises Exception: If the insert operation fails.
+        """
+        if not sources_data:
+            return []
+        query = self.client.from_("sources").insert(sources_data)
+        response = yield self._execute("sources", "insert", query)
+        if len(response.data or []) != len(sources_data):
+            raise Exception(f"Failed to insert sources: {response}")
+        return response.data
+
+    @shared
+    def save_recommendation_bundle(self, bundle, snapshot=False):
+        """
+        Save recommendations together with their milestones and sources in three requests.
+        
+        PostgREST cannot span a transaction across tables, so if the milestone or source insert
+        fails, every row written for the bundle is deleted again before the error is re-raised.
+        
+        :param bundle: A list of (rec_data, milestones_data, sources_data) tuples. The child rows
+            must not include a recommendation_id; it is filled in once the recommendations exist.
+        :param snapshot: Whether to also make the saved recommendations their user's snapshot,
+            as a submission does.
+        :return: The IDs of the saved recommendations, in input order.
+        :raises Exception: If any insert operation fails.
+        """
+        recommendations = yield self._insert_recommendations([rec_data for rec_data, _, _ in bundle])
+        recommendation_ids = [row["id"] for row in recommendations]
+        try:
+            yield self.save_milestones([
+                {**milestone_data, "recommendation_id": recommendation_id}
+                for recommendation_id, (_, milestones_data, _) in zip(recommendation_ids, bundle)
+                for milestone_data in milestones_data
+            ])
+            sources = yield self.save_sources([
+                {**source_data, "recommendation_id": recommendation_id}
+                for recommendation_id, (_, _, sources_data) in zip(recommendation_ids, bundle)
+                for source_data in sources_data
+            ])
+        except Exception:
+            try:
+                yield self.delete_recommendations(recommendation_ids)
+            except Exception:
+                # Raise the insert error below rather than this one
+                logger.exception("Failed to delete partially saved recommendations %s", recommendation_ids)
+            raise
+
+        # Write-through: the saved rows are exactly what the read endpoints would fetch
+        self._cache_children("sources", recommendation_ids, sources, SOURCES_CACHE_TTL)
+        if snapshot:
+            snapshots = build_snapshots(recommendations)
+            for user_id, rows in snapshots.items():
+                if len(rows) < SNAPSHOT_SIZE:
+                    # Fewer new recommendations than a snapshot holds, so older ones fill the rest
+                    rows = yield self._query_recommendations(user_id, SNAPSHOT_SIZE)
+                    snapshots[user_id] = build_snapshots(rows)[user_id]
+            yield self._refresh_snapshots(snapshots)
+        return recommendation_ids
+
+    @shared
+    def delete_recommendations(self, recommendation_ids):
+        """
+        Delete job recommendations along with their milestones and sources.
+        
+        :param recommendation_ids: The IDs of the recommendations to delete.
+        """
+        for table, column in (("milestones", "recommendation_id"), ("sources", "recommendation_id"), ("job_recommendations", "id")):
+            yield self._execute(table, "delete", self.client.from_(table).delete().in_(column, recommendation_ids))
+
+    @shared
     def get_recommendations(self, user_id, limit=3):
         """
-        Fetch the most recent recommendations for a user.
+        Fetch the most recent recommendations for a user from their snapshot, which is cached or
+        read by primary key. A user without a snapshot yet is read from job_recommendations, and
+        the snapshot, empty if they have no recommendations, is written for the next request. If
+        the snapshot cannot be read or written, the error is logged and job_recommendations is
+        read directly for RECOMMENDATION_SNAPSHOT_RETRY_INTERVAL seconds.
+        
+        :param user_id: The ID of the user whose recommendations are to be fetched.
+        :param limit: The maximum number of recommendations to fetch.
+        :return: A list of the most recent recommendations for the user.
+        """
+        if limit > SNAPSHOT_SIZE:
+            return (yield self._query_recommendations(user_id, limit))
+
+        key = f"recommendations:{user_id}"
+        rows = self.cache.get(key) if self.cache is not None else None
+        if rows is None:
+            if time.monotonic() < self._snapshots_retry_at:
+                return (yield self._query_recommendations(user_id, limit))
+            try:
+                rows = yield self.get_recommendation_snapshot(user_id)
+            except Exception:
+                # E.g. the snapshot table is missing; job_recommendations still has the data
+                logger.exception("Failed to read the recommendation snapshot for %s", user_id)
+                self._pause_snapshots()
+                return (yield self._query_recommendations(user_id, limit))
+            if rows is None:
+                rows = yield self._query_recommendations(user_id, SNAPSHOT_SIZE)
+                # Only adds the snapshot if a submission has not written a newer one meanwhile
+                yield self._refresh_snapshots(build_snapshots(rows, [user_id]), overwrite=False)
+            elif self.cache is not None:
+                self.cache.set(key, rows, ttl=RECOMMENDATION_SNAPSHOT_CACHE_TTL)
+        return rows[:limit]
+
+    @shared
+    def get_recommendation_snapshot(self, user_id):
+        """
+        Fetch a user's recommendation snapshot.
+        
+        :param user_id: The ID of the user.
+        :return: The snapshot's recommendations, newest first, or None if the user has no snapshot.
+        """
+        query = self.client.from_(SNAPSHOT_TABLE) \
+            .select("recommendations") \
+            .eq("user_id", user_id) \
+            .limit(1)
+        response = yield self._execute(SNAPSHOT_TABLE, "select", query)
+        return response.data[0]["recommendations"] if response.data else None
+
+    @shared
+    def save_recommendation_snapshots(self, snapshots, overwrite=True):
+        """
+        Save several users' recommendation snapshots in a single request.
+        
+        :param snapshots: A dictionary mapping user IDs to their snapshot rows, as built by build_snapshots.
+        :param overwrite: Whether to replace existing snapshots, or keep them and only add missing ones.
+        :raises Exception: If the upsert operation fails.
+        """
+        rows = snapshot_rows(snapshots)
+        query = self.client.from_(SNAPSHOT_TABLE) \
+            .upsert(rows, on_conflict="user_id", ignore_duplicates=not overwrite)
+        response = yield self._execute(SNAPSHOT_TABLE, "upsert", query)
+        if overwrite and len(response.data or []) != len(rows):
+            raise Exception(f"Failed to upsert recommendation snapshots: {response}")
+
+    @shared
+    def delete_recommendation_snapshots(self, user_ids):
+        """
+        Delete users' recommendation snapshots, so their reads fall back to job_recommendations.
+        
+        :param user_ids: The IDs of the users.
+        """
+        yield self._execute(SNAPSHOT_TABLE, "delete", self.client.from_(SNAPSHOT_TABLE).delete().in_("user_id", user_ids))
+
+    @shared
+    def get_quiz_user_ids(self, after_user_id=None, limit=1000):
+        """
+        Fetch the IDs of users with quiz responses in ID order, for backfilling snapshots.
+        
+        :param after_user_id: Only return users with a larger ID.
+        :param limit: The maximum number of IDs to fetch.
+        :return: A list of user IDs.
+        """
+        query = self.client.from_("quiz_responses").select("user_id")
+        if after_user_id is not None:
+            query = query.gt("user_id", after_user_id)
+        response = yield self._execute("quiz_responses", "select", query.order("user_id").limit(limit))
+        return [row["user_id"] for row in response.data]
+
+    @shared
+    def get_recommendations_for_users(self, user_ids):
+        """
+        Fetch the SNAPSHOT_SIZE newest recommendations of several users, for backfilling snapshots.
+        
+        Each user is read with their own limited query. A single in_() query over the batch would
+        be cut off at PostgREST's max-rows setting without an error, dropping the oldest rows of
+        users with a long history, and the snapshots built from them would never be corrected.
+        
+        :param user_ids: The IDs of the users.
+        :return: A list of recommendations with SNAPSHOT_COLUMNS, newest first for each user.
+        """
+        recommendations = []
+        for user_id in user_ids:
+            query = self.client.from_("job_recommendations") \
+                .select(", ".join(SNAPSHOT_COLUMNS)) \
+                .eq("user_id", user_id) \
+                .order("created_at", desc=True) \
+                .limit(SNAPSHOT_SIZE)
+            response = yield self._execute("job_recommendations", "select", query)
+            recommendations.extend(response.data)
+        return recommendations
+
+    @shared
+    def get_recommendation_titles(self, after_id=0, limit=1000):
+        """
+        Fetch the titles and tags of recommendations in ID order, for building the similarity index.
+        
+        :param after_id: Only return recommendations with a larger ID.
+        :param limit: The maximum number of recommendations to fetch.
+        :return: A list of dictionaries with "id", "job_title", and "tags".
+        """
+        query = self.client.from_("job_recommendations") \
+            .select("id, job_title, tags") \
+            .gt("id", after_id) \
+            .order("id") \
+            .limit(limit)
+        response = yield self._execute("job_recommendations", "select", query)
+        return response.data
+
+    @shared
+    def get_career_bundle(self, user_id, limit=3):
+        """
+        Fetch a user's most recent recommendations with their milestones and sources embedded,
+        using a single PostgREST query.
+        
+        :param user_id: The ID of the user whose recommendations are to be fetched.
+        :param limit: The maximum number of recommendations to fetch.
+        :return: A list of recommendations, each with "milestones" and "sources" lists.
+        """
+        query = self.client.from_("job_recommendations") \
+            .select("*, milestones(*), sources(*)") \
+            .eq("user_id", user_id) \
+            .order("created_at", desc=True) \
+            .limit(limit)
+        response = yield self._execute("job_recommendations", "select", query)
+
+        # Warm the per-recommendation source cache with the embedded rows
+        if self.cache is not None:
+            for rec in response.data:
+                if rec.get("sources"):
+                    self.cache.set(f"sources:{rec['id']}", rec["sources"], ttl=SOURCES_CACHE_TTL)
+        return response.data
+
+    @shared
+    def get_milestones(self, recommendation_id):
+        """
+        Fetch the milestones of a recommendation. They are always read from the table, since the
+        frontend edits them directly in Supabase.
+        
+        :param recommendation_id: The ID of the recommendation.
+        :return: A list of milestones.
+        """
+        return (yield self._get_children("milestones", recommendation_id))
+
+    @shared
+    def get_sources(self, recommendation_id):
+        """
+        Fetch the learning sources of a recommendation, serving from the cache when possible.
+        
+        :param recommendation_id: The ID of the recommendation.
+        :return: A list of learning sources.
+        """
+        return (yield self._get_children("sources", recommendation_id, SOURCES_CACHE_TTL))
+
+    @shared
+    def _insert_recommendations(self, recs_data):
+        """
+        Insert several job recommendations in a single request.
+        
+        :param recs_data: A list of dictionaries containing the recommendation data to be saved.
+        :return: The saved rows, in input order.
+        :raises Exception: If the insert operation fails.
+        """
+        query = self.client.from_("job_recommendations").insert(recs_data)
+        response = yield self._execute("job_recommendations", "insert", query)
+        if len(response.data or []) != len(recs_data):
+            raise Exception(f"Failed to insert recommendations: {response}")
+        return response.data
+
+    @shared
+    def _query_recommendations(self, user_id, limit):
+        """
+        Fetch the most recent recommendations for a user from job_recommendations.
         
         :param user_id: The ID of the user whose recommendations are to be fetched.
         :param limit: The maximum number of recommendations to fetch.
         :return: A list of the most recent recommendations for the user.
         """
-        response = self.client.from_("job_recommendations") \
+        query = self.client.from_("job_recommendations") \
             .select("*") \
             .eq("user_id", user_id) \
             .order("created_at", desc=True) \
-            .limit(limit) \
-            .execute()
-        return response.data
\ No newline at end of file
+            .limit(limit)
+        response = yield self._execute("job_recommendations", "select", query)
+        return response.data
+
+    @shared
+    def _refresh_snapshots(self, snapshots, overwrite=True):
+        """
+        Save users' snapshots, caching them if they replaced the stored ones. A failed save is
+        logged rather than raised, since the recommendations themselves are saved, and snapshot
+        reads are paused. When replacing, the users' old snapshots are deleted instead, so reads
+        fall back to job_recommendations rather than serving them.
+        
+        :param snapshots: A dictionary mapping user IDs to their snapshot rows.
+        :param overwrite: Whether to replace existing snapshots, or only add missing ones.
+        """
+        if not snapshots:
+            return
+        try:
+            yield self.save_recommendation_snapshots(snapshots, overwrite=overwrite)
+        except Exception:
+            logger.exception("Failed to save recommendation snapshots")
+            self._pause_snapshots()
+            if overwrite:
+                yield self._drop_snapshots(list(snapshots))
+            return
+        if overwrite and self.cache is not None:
+            for user_id, rows in snapshots.items():
+                self.cache.set(f"recommendations:{user_id}", rows, ttl=RECOMMENDATION_SNAPSHOT_CACHE_TTL)
+
+    def _pause_snapshots(self):
+        """Read job_recommendations directly for a while, after the snapshot table failed."""
+        self._snapshots_retry_at = time.monotonic() + RECOMMENDATION_SNAPSHOT_RETRY_INTERVAL
+
+    @shared
+    def _drop_snapshots(self, user_ids):
+        """Forget users' snapshots in the cache and the table, logging a failed delete."""
+        if self.cache is not None:
+            for user_id in user_ids:
+                self.cache.delete(f"recommendations:{user_id}")
+        try:
+            yield self.delete_recommendation_snapshots(user_ids)
+        except Exception:
+            logger.exception("Failed to delete stale recommendation snapshots for %s", user_ids)
+
+    @shared
+    def _execute(self, table, operation, query):
+        """
+        Execute a query, recording its latency and row count.
+        
+        :param table: The table the query targets.
+        :param operation: "select", "insert", "upsert", "update" or "delete".
+        :param query: The built query.
+        :return: The query response.
+        """
+        start = time.perf_counter()
+        try:
+            response = yield query.execute()
+        except Exception:
+            DB_REQUEST_SECONDS.observe(time.perf_counter() - start, table=table, operation=operation, outcome="error")
+            raise
+        DB_REQUEST_SECONDS.observe(time.perf_counter() - start, table=table, operation=operation, outcome="ok")
+        data = response.data
+        DB_ROWS.inc(len(data) if isinstance(data, list) else int(bool(data)), table=table, operation=operation)
+        return response
+
+    @shared
+    def _get_children(self, table, recommendation_id, ttl=None):
+        """
+        Read the rows of a child table for a recommendation, through the cache when ttl is given.
+        
+        :param table: "milestones" or "sources".
+        :param recommendation_id: The ID of the recommendation.
+        :param ttl: Seconds to cache a non-empty result, or None to bypass the cache.
+        :return: A list of rows.
+        """
+        cached = self.cache is not None and ttl is not None
+        key = f"{table}:{recommendation_id}"
+        if cached:
+            rows = self.cache.get(key)
+            if rows is not None:
+                return rows
+
+        query = self.client.from_(table) \
+            .select("*") \
+            .eq("recommendation_id", recommendation_id)
+        response = yield self._execute(table, "select", query)
+        if response.data and cached:
+            self.cache.set(key, response.data, ttl=ttl)
+        return response.data
+
+    def _cache_children(self, table, recommendation_ids, rows, ttl):
+        """
+        Populate the cache with freshly saved child rows, grouped by recommendation.
+        
+        :param table: "milestones" or "sources".
+        :param recommendation_ids: The IDs of the recommendations the rows belong to.
+        :param rows: The saved rows.
+        :param ttl: Seconds to cache each group.
+        """
+        if self.cache is None:
+            return
+        grouped = {recommendation_id: [] for recommendation_id in recommendation_ids}
+        for row in rows:
+            grouped[row["recommendation_id"]].append(row)
+        for recommendation_id, group in grouped.items():
+            if group:
+                self.cache.set(f"{table}:{recommendation_id}", group, ttl=ttl)
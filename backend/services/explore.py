@@ -0,0 +1,127 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Column sets clients can request; "summary" leaves out the long free-text fields
+EXPLORE_FIELDS = {
+    "full": "id, job_title, short_description, job_description, fit_percentage, recommendation_reason, labels, tags, created_at",
+    "summary": "id, job_title, short_description, fit_percentage, labels, tags, created_at",
+}
+
+# Cache key of the token that first-page keys carry; replacing it retires every cached first page
+GENERATION_KEY = "explore:generation"
+# Seconds the token is kept, well past any first page cached under it
+GENERATION_TTL = 7 * 24 * 3600
+
+
+class ExploreFeed:
+    """
+    ExploreFeed class that serves keyset-paginated pages of the latest job recommendations, caching
+    hot pages and prefetching the page after each one served. With a cache shared by several
+    worker processes, a submission saved by any of them refreshes the first page for all.
+    """
+    def __init__(self, supabase_client, cache=None, max_limit=50, first_page_ttl=30, page_ttl=300):
+        """
+        Initialize the ExploreFeed.
+
+        :param supabase_client: An instance of the Supabase client.
+        :param cache: An optional Cache for pages, shared across workers when it is a SQLiteCache.
+        :param max_limit: The largest page size a client may request.
+        :param first_page_ttl: Seconds to cache the first page, which changes whenever recommendations are added.
+        :param page_ttl: Seconds to cache later pages, which only change if rows are deleted.
+        """
+        self.client = supabase_client
+        self.cache = cache
+        self.max_limit = max_limit
+        self.first_page_ttl = first_page_ttl
+        self.page_ttl = page_ttl
+        self._prefetching = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="explore-prefetch")
+
+    def get_page(self, cursor=None, limit=10, fields="full"):
+        """
+        Fetch a page of recommendations, newest first.
+
+        :param cursor: The ID returned as the previous page's cursor, or None for the first page.
+        :param limit: The requested page size; it is clamped to between 1 and max_limit.
+        :param fields: A key of EXPLORE_FIELDS.
+        :return: A dictionary with the page "data" and the "cursor" for the next page.
+        :raises ValueError: If limit is not an integer or fields is unknown.
+        """
+        limit = max(1, min(int(limit), self.max_limit))
+        if fields not in EXPLORE_FIELDS:
+            raise ValueError(f"fields must be one of: {', '.join(EXPLORE_FIELDS)}")
+
+        key = self._key(cursor, limit, fields)
+        page = self.cache.get(key) if self.cache is not None else None
+        if page is None:
+            page = self._fetch(cursor, limit, fields)
+            self._store(key, cursor, page)
+
+        if page["cursor"] is not None and len(page["data"]) == limit:
+            self._prefetch(page["cursor"], limit, fields)
+        return page
+
+    def invalidate(self):
+        """Drop cached first pages so newly saved recommendations appear at the top of the feed."""
+        if self.cache is not None:
+            # A fresh token rather than a counter, so concurrent invalidations cannot cancel out
+            self.cache.set(GENERATION_KEY, uuid.uuid4().hex, ttl=GENERATION_TTL)
+
+    def _key(self, cursor, limit, fields):
+        # Only the first page is affected by new rows, so only its key carries the generation
+        generation = self.cache.get(GENERATION_KEY) if cursor is None and self.cache is not None else None
+        return f"explore:{fields}:{limit}:{cursor}:{generation}"
+
+    def _store(self, key, cursor, page):
+        if self.cache is not None:
+            self.cache.set(key, page, ttl=self.first_page_ttl if cursor is None else self.page_ttl)
+
+    def _fetch(self, cursor, limit, fields):
+        """
+        Query one page from Supabase.
+
+        :return: A dictionary with the page "data" and the "cursor" for the next page.
+        """
+        query = self.client.from_("job_recommendations").select(EXPLORE_FIELDS[fields]) \
+            .order("id", desc=True) \
+            .limit(limit)
+
+        # Use cursor for pagination
+        if cursor:
+            query = query.lt("id", cursor)  # Fetch results with IDs less than the cursor
+
+        data = query.execute().data
+
+        # Ensure tags are always a string
+        for rec in data:
+            rec['tags'] = rec.get('tags', '')
+
+        # Get new cursor (smallest ID in the current batch)
+        return {"data": data, "cursor": data[-1]["id"] if data else None}
+
+    def _prefetch(self, cursor, limit, fields):
+        """Load the next page into the cache in the background unless it is cached or already loading."""
+        if self.cache is None:
+            return
+        key = self._key(cursor, limit, fields)
+        with self._lock:
+            if key in self._prefetching:
+                return
+            self._prefetching.add(key)
+
+        def load():
+            try:
+                if self.cache.get(key) is None:
+                    self._store(key, cursor, self._fetch(cursor, limit, fields))
+            except Exception:
+                logger.exception("Failed to prefetch explore page after cursor %s", cursor)
+            finally:
+                with self._lock:
+                    self._prefetching.discard(key)
+
+        self._executor.submit(load)
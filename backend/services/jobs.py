@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import METRICS, log_trace, trace
+
+logger = logging.getLogger(__name__)
+
+JOB_SECONDS = METRICS.histogram("job_seconds", "Time from a job starting to run until it finishes.", ["status"])
+JOB_QUEUE_SECONDS = METRICS.histogram("job_queue_seconds", "Time jobs wait in the queue before running.")
+
+
+class JobQueue:
+    """
+    JobQueue class that runs long submissions on a background thread pool, or as tasks on the
+    event loop when submitted with submit_async, and records their progress in a Cache, so any
+    worker sharing the cache can report a job's status.
+    """
+    def __init__(self, store, max_workers=4, stale_after=None):
+        """
+        Initialize the JobQueue.
+
+        :param store: A Cache holding job records; use a SQLiteCache when running several workers.
+        :param max_workers: The number of jobs that may run at once in this process.
+        :param stale_after: Seconds after which a queued or running job that has not been updated
+            is reported as failed, e.g. because the worker running it restarted. None never does.
+        """
+        self.store = store
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-queue")
+        self._lock = threading.Lock()
+        # The event loop only keeps weak references to tasks, so running ones are held here
+        self._tasks = set()
+
+    def submit(self, user_id, stages, func, *args):
+        """
+        Queue a job and return immediately.
+
+        :param user_id: The ID of the user who owns the job.
+        :param stages: The names of the stages the job reports progress for.
+        :param func: The callable to run. It receives the args followed by a progress keyword
+            argument, called as progress(stage, state).
+        :return: The ID of the new job.
+        """
+        job_id = self._create(user_id, stages)
+        self._executor.submit(self._run, job_id, func, args)
+        return job_id
+
+    def submit_async(self, user_id, stages, func, *args):
+        """
+        Queue a job as a task on the running event loop and return immediately. Unlike submit, the
+        number of jobs in flight is not bounded by the thread pool.
+
+        :param user_id: The ID of the user who owns the job.
+        :param stages: The names of the stages the job reports progress for.
+        :param func: The coroutine function to run, called like the func of submit.
+        :return: The ID of the new job.
+        """
+        job_id = self._create(user_id, stages)
+        task = asyncio.get_running_loop().create_task(self._run_async(job_id, func, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    def _create(self, user_id, stages):
+        """Save a new queued job record and return its ID."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "status": "queued",
+            "stages": {stage: "pending" for stage in stages},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+        }
+        self._save(job)
+        return job["id"]
+
+    def get(self, job_id, user_id=None):
+        """
+        Fetch a job record.
+
+        :param job_id: The ID of the job.
+        :param user_id: If given, only return the job when it belongs to this user.
+        :return: The job record, or None if it does not exist or belongs to someone else.
+        """
+        job = self.store.get(self._key(job_id))
+        if job is None or (user_id is not None and job["user_id"] != user_id):
+            return None
+        if self._is_stale(job):
+            logger.warning("Job %s has not been updated since %s; marking it failed", job_id, job["updated_at"])
+            job = self._update(job_id, status="failed", error="Processing was interrupted. Please submit your responses again.")
+        return job
+
+    def _is_stale(self, job):
+        """Whether a job is still queued or running but has not been updated for stale_after seconds."""
+        return (
+            self.stale_after is not None
+            and job["status"] in ("queued", "running")
+            and time.time() - job["updated_at"] > self.stale_after
+        )
+
+    def _run(self, job_id, func, args):
+        """Run a job, recording its progress, outcome, and timing."""
+        self._start(job_id)
+        with trace() as current:
+            try:
+                result = func(*args, progress=self._progress(job_id))
+            except Exception as e:
+                logger.exception("Job %s failed", job_id)
+                status, fields = "failed", {"error": str(e)}
+            else:
+                status, fields = "succeeded", {"result": result}
+        self._finish(job_id, current, status, fields)
+
+    async def _run_async(self, job_id, func, args):
+        """Await a job, recording its progress, outcome, and timing."""
+        self._start(job_id)
+        with trace() as current:
+            try:
+                result = await func(*args, progress=self._progress(job_id))
+            except Exception as e:
+                logger.exception("Job %s failed", job_id)
+                status, fields = "failed", {"error": str(e)}
+            else:
+                status, fields = "succeeded", {"result": result}
+        self._finish(job_id, current, status, fields)
+
+    def _start(self, job_id):
+        """Mark a job as running and record how long it was queued."""
+        job = self._update(job_id, status="running")
+        JOB_QUEUE_SECONDS.observe(max(0.0, time.time() - job["created_at"]))
+
+    def _progress(self, job_id):
+        """Return the progress callback handed to a job."""
+        return lambda stage, state: self._update_stage(job_id, stage, state)
+
+    def _finish(self, job_id, current, status, fields):
+        """Record a job's outcome and log its timing."""
+        self._update(job_id, status=status, **fields)
+        JOB_SECONDS.observe(current.elapsed_ms() / 1000, status=status)
+        log_trace("job", current, job_id=job_id, status=status)
+
+    def _update_stage(self, job_id, stage, state):
+        """Record the state of one stage of a job."""
+        with self._lock:
+            job = self.store.get(self._key(job_id))
+            job["stages"][stage] = state
+            self._save(job)
+
+    def _update(self, job_id, **fields):
+        """Update top-level fields of a job record."""
+        with self._lock:
+            job = self.store.get(self._key(job_id))
+            job.update(fields)
+            self._save(job)
+        return job
+
+    def _save(self, job):
+        job["updated_at"] = time.time()
+        self.store.set(self._key(job["id"]), job)
+
+    @staticmethod
+    def _key(job_id):
+        return f"job:{job_id}"
@@ -0,0 +1,310 @@
+"""
+In-process counters, latency histograms, and per-request trace spans.
+
+Metrics are kept per worker process and rendered in the Prometheus text exposition format by the
+/metrics endpoint, so each gunicorn worker is scraped (or summed) separately. Recording a value is
+a dictionary lookup and a bisect under a lock, cheap enough to leave on in production.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from fast cache reads to slow model calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Structured timing lines go to their own logger so they can be routed or silenced separately
+timing_logger = logging.getLogger("pathweiz.timing")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Counter class holding a monotonically increasing value per label combination.
+    """
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        :param name: The metric name.
+        :param documentation: The HELP text.
+        :param labelnames: The names of the labels every sample carries.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Increment the counter.
+
+        :param amount: The amount to add.
+        :param labels: A value for each of the counter's label names.
+        """
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        :param labels: A value for each of the counter's label names.
+        :return: The current value for the labels, or 0.
+        """
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_number(value)}"
+
+
+class Histogram:
+    """
+    Histogram class counting observations into cumulative buckets per label combination.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        :param name: The metric name.
+        :param documentation: The HELP text.
+        :param labelnames: The names of the labels every sample carries.
+        :param buckets: The sorted upper bounds of the buckets; +Inf is added implicitly.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Record an observation.
+
+        :param value: The observed value, usually seconds.
+        :param labels: A value for each of the histogram's label names.
+        """
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        """
+        :param labels: A value for each of the histogram's label names.
+        :return: The number of observations for the labels.
+        """
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_number(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_number(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    MetricsRegistry class that owns a worker's metrics and renders them for scraping.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        """
+        Return the counter with a name, creating it on first use.
+
+        :param name: The metric name, without the _total suffix.
+        :param documentation: The HELP text.
+        :param labelnames: The names of the counter's labels.
+        :return: A Counter.
+        """
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Return the histogram with a name, creating it on first use.
+
+        :param name: The metric name.
+        :param documentation: The HELP text.
+        :param labelnames: The names of the histogram's labels.
+        :param buckets: The upper bounds of the buckets.
+        :return: A Histogram.
+        """
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        :return: The exposition text.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            # Counter samples carry a _total suffix, and the metadata names them the same way
+            name = f"{metric.name}_total" if metric.kind == "counter" else metric.name
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# The registry every service records into
+METRICS = MetricsRegistry()
+
+SPAN_SECONDS = METRICS.histogram("span_seconds", "Duration of traced pipeline stages.", ["name"])
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    Trace class collecting the spans recorded while handling one request or job.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def to_dict(self):
+        """
+        :return: A JSON-serializable list of spans, each with a name, start and duration in ms.
+        """
+        return [dict(span) for span in self.spans]
+
+
+def start_trace():
+    """
+    Start a trace for the current context, so spans recorded from now on are collected.
+
+    :return: A token to pass to end_trace.
+    """
+    return _current_trace.set(Trace())
+
+
+def end_trace(token):
+    """
+    Stop the trace started with start_trace, restoring the previous one.
+
+    :param token: The token returned by start_trace.
+    """
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # Streamed responses can finish in a different context than they started in
+        _current_trace.set(None)
+
+
+@contextmanager
+def trace():
+    """
+    Start a trace for the current context, so spans recorded inside it are collected.
+
+    :return: A context manager yielding the Trace.
+    """
+    token = start_trace()
+    try:
+        yield current_trace()
+    finally:
+        end_trace(token)
+
+
+def current_trace():
+    """
+    :return: The Trace of the current context, or None.
+    """
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a stage, record it in the span_seconds histogram, and add it to the current trace.
+
+    :param name: The stage name, e.g. "submission.save".
+    :param attributes: Extra fields logged with the span.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        SPAN_SECONDS.observe(duration, name=name)
+        current = _current_trace.get()
+        if current is not None:
+            current.spans.append({
+                "name": name,
+                "start_ms": round((start - current.started) * 1000, 2),
+                "duration_ms": round(duration * 1000, 2),
+                **attributes,
+            })
+
+
+def log_trace(kind, current, **fields):
+    """
+    Log one structured JSON line with the total duration and spans of a trace.
+
+    :param kind: What was traced, e.g. "request" or "job".
+    :param current: The Trace.
+    :param fields: Extra fields to include, e.g. the endpoint and status.
+    """
+    if not timing_logger.isEnabledFor(logging.INFO):
+        return
+    timing_logger.info(json.dumps(
+        {"kind": kind, **fields, "duration_ms": current.elapsed_ms(), "spans": current.to_dict()}, default=str
+    ))
@@ -0,0 +1,384 @@
+"""
+Parsers for the AI model's recommendation, milestone, and source responses.
+
+Each line is classified with a single precompiled alternation over every field label, and only
+the matched field's value patterns are tried, instead of running every pattern on every line.
+Field priority and value patterns are unchanged from the original per-field regexes, so the
+parsed output is identical. Responses produced in JSON mode are parsed with json.loads first,
+and fall back to the line parser if they are not valid JSON.
+"""
+import json
+import re
+
+
+class _FieldMatcher:
+    """
+    Classify lines by the field labels they contain and extract the value of the highest-priority
+    field whose value pattern matches.
+    """
+    def __init__(self, fields):
+        """
+        :param fields: (name, label, value_patterns) tuples in priority order. Labels must be plain
+            text; value_patterns are tried in order and the first match's group 1 is the value.
+        """
+        self._priority = {name: index for index, (name, _, _) in enumerate(fields)}
+        self._labels = re.compile("|".join(f"(?P<{name}>{re.escape(label)})" for name, label, _ in fields))
+        # Patterns that start with the label can begin searching at the label's first occurrence
+        self._patterns = {
+            name: [(re.compile(pattern), pattern.startswith(label)) for pattern in patterns]
+            for name, label, patterns in fields
+        }
+        # For each field, the labels that outrank it, to detect lines that mention several fields
+        self._higher = {
+            name: re.compile("|".join(re.escape(label) for _, label, _ in fields[:index])) if index else None
+            for index, (name, _, _) in enumerate(fields)
+        }
+
+    def match(self, line):
+        """
+        Find the field a line describes.
+
+        :param line: A stripped response line.
+        :return: A (field name, value) tuple, or None if no field matches.
+        """
+        first = self._labels.search(line)
+        if first is None:
+            return None
+        name = first.lastgroup
+        higher = self._higher[name]
+        if higher is None or not higher.search(line, first.end()):
+            value = self._extract(name, line, first.start())
+            if value is not None:
+                return name, value
+
+        # Rare: several labels on one line, or the first label's value patterns did not match
+        found = {match.lastgroup for match in self._labels.finditer(line)}
+        for name in sorted(found, key=self._priority.__getitem__):
+            value = self._extract(name, line, 0)
+            if value is not None:
+                return name, value
+        return None
+
+    def _extract(self, name, line, position):
+        """Return the value of a field, or None if none of its patterns match."""
+        for pattern, starts_with_label in self._patterns[name]:
+            value = pattern.search(line, position if starts_with_label else 0)
+            if value:
+                return value.group(1)
+        return None
+
+
+def _recommendation_field(name, label, number):
+    return (name, f"{label}:", [
+        rf"{label}:\*\*(.*?)\*\*",
+        rf"{number}\.\s*\*\*{label}:\*\*(.*)",
+        rf"{label}:(.*)",
+    ])
+
+
+_RECOMMENDATION_FIELDS = _FieldMatcher([
+    _recommendation_field("job_title", "Job Title", 1),
+    _recommendation_field("short_description", "Short Description", 2),
+    _recommendation_field("job_description", "Full Job Description", 3),
+    _recommendation_field("recommendation_reason", "Why it's recommended", 4),
+    _recommendation_field("fit_percentage", "Fit Percentage", 5),
+    _recommendation_field("tags", "Tags", 6),
+    _recommendation_field("labels", "Labels", 7),
+])
+
+_MILESTONE_FIELDS = _FieldMatcher([
+    ("title", "Title:", [r"Title:\s*(.*)"]),
+    ("description", "Description:", [r"Description:\s*(.*)"]),
+])
+
+_SOURCE_FIELDS = _FieldMatcher([
+    ("icon", "Icon:", [r"Icon:\s*(.)"]),
+    ("title", "Title:", [r"Title:\s*(.*)"]),
+    ("description", "Description:", [r"Description:\s*(.*)"]),
+    ("status", "Status:", [r"Status:\s*(.*)"]),
+])
+
+RECOMMENDATION_KEYS = [
+    "job_title", "short_description", "job_description", "recommendation_reason", "fit_percentage", "tags", "labels",
+]
+MILESTONE_KEYS = ["title", "description"]
+SOURCE_KEYS = ["icon", "title", "description", "status"]
+
+
+def _split_lines(text):
+    return text.strip().split('\n')
+
+
+def iter_lines(chunks):
+    """
+    Reassemble streamed text chunks into complete lines.
+
+    :param chunks: An iterator of text fragments.
+    :return: An iterator of lines, without their trailing newlines.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split('\n')
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def iter_recommendations(lines, eager=False):
+    """
+    Parse recommendations from an iterator of response lines.
+
+    :param lines: An iterator of lines from the AI response.
+    :param eager: If true, yield each recommendation as soon as its Labels line is parsed
+        instead of waiting for the next recommendation header.
+    :return: An iterator of parsed recommendations.
+    """
+    current_recommendation = {}
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if "Recommendation" in line:
+            if current_recommendation:
+                yield current_recommendation
+            current_recommendation = {}
+            continue
+
+        field = _RECOMMENDATION_FIELDS.match(line)
+        if field is None:
+            continue
+        name, value = field
+        if name == "labels":
+            current_recommendation["labels"] = [label.strip() for label in value.split(",")]
+            if eager:
+                yield current_recommendation
+                current_recommendation = {}
+        else:
+            current_recommendation[name] = value.strip()
+
+    # Add the last recommendation if it exists
+    if current_recommendation:
+        yield current_recommendation
+
+
+def parse_recommendations(text):
+    """
+    Parse the AI response for recommendations.
+
+    :param text: The raw text response from the AI model, as text or JSON.
+    :return: A list of parsed recommendations.
+    """
+    structured = parse_structured(text, RECOMMENDATION_KEYS)
+    if structured is not None:
+        for recommendation in structured:
+            if isinstance(recommendation.get("labels"), str):
+                recommendation["labels"] = recommendation["labels"].split(",")
+            if "labels" in recommendation:
+                recommendation["labels"] = [str(label).strip() for label in recommendation["labels"]]
+        return structured
+    return list(iter_recommendations(_split_lines(text)))
+
+
+def parse_milestones(text):
+    """
+    Parse the AI response for milestones.
+
+    :param text: The raw text response from the AI model, as text or JSON.
+    :return: A list of parsed milestones.
+    """
+    structured = parse_structured(text, MILESTONE_KEYS)
+    if structured is not None:
+        return structured
+
+    milestones = []
+    current_milestone = {}
+
+    for line in _split_lines(text):
+        line = line.strip()
+        if not line:
+            continue
+
+        field = _MILESTONE_FIELDS.match(line)
+        if field is None:
+            continue
+        name, value = field
+        if name == "title":
+            if current_milestone:
+                milestones.append(current_milestone)
+            current_milestone = {"title": value.strip()}
+        else:
+            current_milestone["description"] = value.strip()
+
+    if current_milestone:
+        milestones.append(current_milestone)
+
+    return milestones
+
+
+def parse_sources(text):
+    """
+    Parse the AI response for learning sources.
+
+    :param text: The raw text response from the AI model, as text or JSON.
+    :return: A list of parsed learning sources.
+    """
+    structured = parse_structured(text, SOURCE_KEYS)
+    if structured is not None:
+        return structured
+
+    sources = []
+    current_source = {}
+
+    for line in _split_lines(text):
+        line = line.strip()
+        if not line:
+            continue
+
+        field = _SOURCE_FIELDS.match(line)
+        if field is None:
+            continue
+        name, value = field
+        if name == "icon":
+            if "title" in current_source:
+                sources.append(current_source)
+                current_source = {}
+            current_source["icon"] = value.strip()
+        elif name == "title":
+            # The source is appended here and again when the next icon arrives; kept as-is so
+            # output matches what has always been stored.
+            if current_source:
+                sources.append(current_source)
+            current_source["title"] = value.strip()
+        else:
+            current_source[name] = value.strip()
+
+    if "title" in current_source:
+        sources.append(current_source)
+
+    return sources
+
+
+def parse_structured(text, keys):
+    """
+    Parse a JSON-mode response into a list of dictionaries.
+
+    :param text: The raw text response from the AI model.
+    :param keys: The keys to keep from each item.
+    :return: A list of dictionaries with string values, or None if the text is not a JSON list of objects.
+    """
+    stripped = text.strip()
+    if not stripped.startswith(("[", "{")):
+        return None
+    try:
+        items = json.loads(stripped)
+    except ValueError:
+        return None
+    if isinstance(items, dict) and len(items) == 1:
+        items = next(iter(items.values()))
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return None
+    return [
+        {key: item[key] if isinstance(item[key], list) else str(item[key]).strip() for key in keys if key in item}
+        for item in items
+    ]
+
+
+class InvalidResponseError(ValueError):
+    """Raised when a structured response does not match the expected shape."""
+
+
+# Items expected in each recommendation of a combined response
+COMBINED_COUNTS = {"recommendations": 3, "milestones": 5, "sources": 3}
+
+
+def parse_combined(text):
+    """
+    Parse and validate a combined JSON response holding recommendations with their milestones
+    and sources.
+
+    :param text: The raw text response from the AI model.
+    :return: A (recommendations, details) tuple, where details holds a (milestones, sources)
+        tuple per recommendation.
+    :raises InvalidResponseError: If the response is not valid JSON, misses a required field,
+        or has the wrong number of recommendations, milestones or sources.
+    """
+    try:
+        document = json.loads(text)
+    except ValueError as e:
+        raise InvalidResponseError(f"Combined response is not JSON: {e}") from e
+    items = document.get("recommendations") if isinstance(document, dict) else document
+    recommendations = _validated_items(items, RECOMMENDATION_KEYS, "recommendations")
+
+    details = []
+    for item, recommendation in zip(items, recommendations):
+        labels = recommendation["labels"]
+        recommendation["labels"] = [
+            str(label).strip() for label in (labels.split(",") if isinstance(labels, str) else labels)
+        ]
+        details.append((
+            _validated_items(item.get("milestones"), MILESTONE_KEYS, "milestones"),
+            _validated_items(item.get("sources"), SOURCE_KEYS, "sources"),
+        ))
+    return recommendations, details
+
+
+def _validated_items(items, keys, kind):
+    """Check a list of objects has the expected length and fields, and keep only those fields."""
+    if not isinstance(items, list) or len(items) != COMBINED_COUNTS[kind]:
+        raise InvalidResponseError(f"Expected {COMBINED_COUNTS[kind]} {kind}, got {items!r:.80}")
+    validated = []
+    for item in items:
+        if not isinstance(item, dict) or any(not item.get(key) for key in keys):
+            raise InvalidResponseError(f"{kind} item is missing one of {keys}: {item!r:.80}")
+        validated.append({key: item[key] if isinstance(item[key], list) else str(item[key]).strip() for key in keys})
+    return validated
+
+
+def response_schema(keys, list_keys=()):
+    """
+    Build a Gemini response_schema for a JSON array of objects with string fields.
+
+    :param keys: The required keys of each object.
+    :param list_keys: Keys whose values are arrays of strings.
+    :return: A schema dictionary suitable for GenerationConfig.response_schema.
+    """
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                key: {"type": "array", "items": {"type": "string"}} if key in list_keys else {"type": "string"}
+                for key in keys
+            },
+            "required": list(keys),
+        },
+    }
+
+
+def combined_schema():
+    """
+    Build the response_schema for a combined response: an object holding recommendations, each
+    with nested milestones and sources. Item counts are checked by parse_combined.
+
+    :return: A schema dictionary suitable for GenerationConfig.response_schema.
+    """
+    recommendation = response_schema(RECOMMENDATION_KEYS, list_keys={"labels"})["items"]
+    recommendation["properties"]["milestones"] = response_schema(MILESTONE_KEYS)
+    recommendation["properties"]["sources"] = response_schema(SOURCE_KEYS)
+    recommendation["required"] += ["milestones", "sources"]
+    return {
+        "type": "object",
+        "properties": {"recommendations": {"type": "array", "items": recommendation}},
+        "required": ["recommendations"],
+    }
+
+
+RESPONSE_SCHEMAS = {
+    "recommendations": response_schema(RECOMMENDATION_KEYS, list_keys={"labels"}),
+    "milestones": response_schema(MILESTONE_KEYS),
+    "sources": response_schema(SOURCE_KEYS),
+    "combined": combined_schema(),
+}
@@ -0,0 +1,90 @@
+"""
+Compaction of quiz answers for the recommendation prompts.
+
+Only the answers map_form_data collects are sent; database columns such as id and created_at and
+empty answers are left out, whitespace is collapsed, and long free-text answers are cut at a word
+boundary so the answers fit a token budget. Token counts are estimated from the text length, which
+is close enough for budgeting without calling the model's count_tokens endpoint.
+"""
+import math
+
+from utils import QUIZ_FIELDS
+
+# Gemini averages about four characters per token on English text
+CHARS_PER_TOKEN = 4
+
+ELLIPSIS = "…"
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in a text.
+
+    :param text: The text, or None.
+    :return: The estimated token count.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def format_quiz_data(quiz_data, budget, field_budget, fields=QUIZ_FIELDS):
+    """
+    Format quiz answers as one "field: answer" line each, within a token budget.
+
+    :param quiz_data: The quiz answers, e.g. from map_form_data or a quiz_responses row.
+    :param budget: The estimated tokens all the lines may take together.
+    :param field_budget: The estimated tokens a single answer may take.
+    :param fields: The fields to include, in order; others are ignored.
+    :return: The formatted answers.
+    """
+    answers = {}
+    for field in fields:
+        value = quiz_data.get(field)
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value if item not in (None, ""))
+        text = " ".join(str(value).split()) if value is not None else ""
+        if text:
+            answers[field] = truncate(text, field_budget * CHARS_PER_TOKEN)
+
+    # Characters left for the answers once every "field: " label and newline is paid for
+    available = budget * CHARS_PER_TOKEN - sum(len(field) + 3 for field in answers)
+    share = _fair_share([len(text) for text in answers.values()], available)
+    if share is not None:
+        answers = {field: truncate(text, share) for field, text in answers.items()}
+    return "\n".join(f"{field}: {text}" for field, text in answers.items())
+
+
+def truncate(text, limit):
+    """
+    Cut a text to at most limit characters, at a word boundary where there is one, marking the cut.
+
+    :param text: The text.
+    :param limit: The maximum length, including the marker.
+    :return: The text, or its cut version.
+    """
+    if len(text) <= limit:
+        return text
+    cut = text[:max(limit - len(ELLIPSIS), 0)]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:.") + ELLIPSIS
+
+
+def _fair_share(lengths, available):
+    """
+    Find the longest length every text can keep so that together they fit, cutting only the
+    longest ones: shorter texts are kept whole and the rest share what remains equally.
+
+    :param lengths: The lengths of the texts.
+    :param available: The total length they may take.
+    :return: The length to cut longer texts to, or None if everything already fits.
+    """
+    if sum(lengths) <= available:
+        return None
+    remaining = max(available, 0)
+    ordered = sorted(lengths)
+    for index, length in enumerate(ordered):
+        share = remaining // (len(ordered) - index)
+        if length > share:
+            return share
+        remaining -= length
+    return None
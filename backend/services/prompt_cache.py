@@ -0,0 +1,82 @@
+import json
+
+from services.cache import make_cache_key, SQLiteCache
+
+# "cache" serves stored responses and stores new ones, "record" always calls the model and stores
+# the response, and "replay" only serves stored responses, so it never touches the network.
+PROMPT_CACHE_MODES = ("off", "cache", "record", "replay")
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when no response was recorded for a prompt."""
+
+
+class PromptCache:
+    """
+    PromptCache class that stores raw model responses keyed by the exact request sent to the
+    model, so identical prompts are answered without calling it again.
+    """
+    def __init__(self, store, mode="cache"):
+        """
+        Initialize the PromptCache.
+
+        :param store: The Cache holding response text, usually a SQLiteCache.
+        :param mode: One of PROMPT_CACHE_MODES.
+        :raises ValueError: If the mode is unknown.
+        """
+        if mode not in PROMPT_CACHE_MODES:
+            raise ValueError(f"Unknown prompt cache mode: {mode}")
+        self.store = store
+        self.mode = mode
+
+    @staticmethod
+    def key(model_name, prompt, generation_config=None):
+        """
+        Build the cache key for a model request.
+
+        :param model_name: The name of the model.
+        :param prompt: The formatted prompt.
+        :param generation_config: The generation config sent with the prompt, if any.
+        :return: A content-addressed cache key.
+        """
+        return make_cache_key("prompt", model_name, prompt, json.dumps(generation_config, sort_keys=True))
+
+    def get(self, key):
+        """
+        Return the stored response text for a request.
+
+        :param key: A key from PromptCache.key.
+        :return: The response text, or None if the model should be called.
+        :raises ReplayMissError: In replay mode, if nothing was recorded for the key.
+        """
+        if self.mode in ("off", "record"):
+            return None
+        text = self.store.get(key)
+        if text is None and self.mode == "replay":
+            raise ReplayMissError(f"No recorded response for prompt {key[:12]}")
+        return text
+
+    def set(self, key, text):
+        """
+        Store the response text for a request, unless the cache is off or replaying.
+
+        :param key: A key from PromptCache.key.
+        :param text: The response text.
+        """
+        if self.mode in ("cache", "record") and text:
+            self.store.set(key, text)
+
+
+def create_prompt_cache(mode, path, max_entries=None, ttl=3600):
+    """
+    Create a PromptCache backed by a SQLite file.
+
+    :param mode: One of PROMPT_CACHE_MODES.
+    :param path: The SQLite file path.
+    :param max_entries: An optional bound on the number of stored responses.
+    :param ttl: Seconds a stored response stays valid.
+    :return: A PromptCache, or None when mode is "off".
+    """
+    if mode == "off":
+        return None
+    return PromptCache(SQLiteCache(path, ttl=ttl, max_entries=max_entries), mode=mode)
@@ -0,0 +1,161 @@
+"""
+Rate-limit storage and request keys shared by every gunicorn worker on a host.
+
+Importing this module registers the "sqlite://" scheme with the limits package, so
+RATELIMIT_STORAGE_URI can point Flask-Limiter at a local SQLite file. URIs follow the SQLAlchemy
+convention: sqlite:///relative/path.sqlite3 or sqlite:////absolute/path.sqlite3. Any scheme the
+limits package supports (memory://, redis://, memcached://) still works.
+"""
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+# Expired counters are purged once every this many increments
+_PURGE_EVERY = 1000
+
+
+def rate_limit_key():
+    """
+    Identify the client a request counts against: the verified user when the request carries a
+    valid token, otherwise the remote address.
+
+    :return: The rate-limit key for the current request.
+    """
+    user_id = g.get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return get_remote_address()
+
+
+class SQLiteStorage(Storage):
+    """
+    Fixed-window rate-limit counters in a local SQLite file. Each hit is a single UPSERT, so
+    workers never read-modify-write a counter and the counts stay exact across processes.
+    """
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        """
+        :param uri: A sqlite:/// URI naming the database file.
+        :param wrap_exceptions: Whether to wrap sqlite3 errors in limits.errors.StorageError.
+        """
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len("sqlite:///"):]
+        self._local = threading.local()
+        # Writers queue on a thread lock and a file lock instead of in SQLite's busy handler, which
+        # polls for the write lock with sleeps of a millisecond or more
+        self._write_lock = threading.Lock()
+        self._lock_path = f"{self.path}.lock"
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """Return this thread's connection, opening a new one after a fork."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _lock_file(self):
+        """Return this process's lock file, reopening it after a fork so the lock is not shared."""
+        if getattr(self, "_lock_pid", None) != os.getpid():
+            self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._lock_pid = os.getpid()
+        return self._lock_fd
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        """
+        Increment the counter for a key, starting a new window if the old one has expired.
+
+        :param key: The rate-limit key.
+        :param expiry: The window length in seconds.
+        :param elastic_expiry: Whether each hit extends the window.
+        :param amount: The number to increment by.
+        :return: The counter value after the increment.
+        """
+        connection = self._connection()
+        with self._write_lock:
+            lock_fd = self._lock_file()
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                return self._incr(connection, key, expiry, elastic_expiry, amount)
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    def _incr(self, connection, key, expiry, elastic_expiry, amount):
+        now = time.time()
+        row = connection.execute(
+            """
+            INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :expires_at)
+            ON CONFLICT (key) DO UPDATE SET
+                count = CASE WHEN expires_at <= :now THEN :amount ELSE count + :amount END,
+                expires_at = CASE WHEN expires_at <= :now OR :elastic THEN :expires_at ELSE expires_at END
+            RETURNING count
+            """,
+            {"key": key, "amount": amount, "expires_at": now + expiry, "now": now, "elastic": elastic_expiry},
+        ).fetchone()
+
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            connection.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return row[0]
+
+    def get(self, key):
+        """
+        :param key: The rate-limit key.
+        :return: The counter value in the current window, or 0.
+        """
+        row = self._connection().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        """
+        :param key: The rate-limit key.
+        :return: The timestamp at which the key's window ends.
+        """
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return int(row[0] if row else time.time())
+
+    def check(self):
+        """Return whether the database file can be queried."""
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        """
+        Remove every counter.
+
+        :return: The number of counters removed.
+        """
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        """
+        Remove the counter for a key.
+
+        :param key: The rate-limit key.
+        """
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
@@ -0,0 +1,289 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import AI_CACHE_BACKEND, AI_CACHE_PATH, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL
+from config import AI_PROMPT_CACHE_MODE, AI_PROMPT_CACHE_PATH, AI_PROMPT_CACHE_MAX_ENTRIES, AI_PROMPT_CACHE_TTL
+from config import AI_SINGLE_FLIGHT_LOCK_DIR, AI_CALL_DEADLINE
+from config import SUBMISSION_WORKERS, JOB_STORE_BACKEND, JOB_STORE_PATH, JOB_TTL, JOB_STORE_MAX_ENTRIES, JOB_STALE_AFTER
+from config import RESPONSE_CACHE_MAX_ENTRIES
+from config import EXPLORE_MAX_LIMIT, EXPLORE_FIRST_PAGE_TTL, EXPLORE_PAGE_TTL, EXPLORE_CACHE_MAX_ENTRIES
+from config import EXPLORE_CACHE_BACKEND, EXPLORE_CACHE_PATH
+from config import SIMILARITY_THRESHOLD, SIMILARITY_REFRESH_INTERVAL, SIMILARITY_MAX_ENTRIES
+from config import SUPABASE_MAX_CONNECTIONS, SUPABASE_MAX_KEEPALIVE_CONNECTIONS, SUPABASE_KEEPALIVE_EXPIRY
+from services.ai_service import AIService
+from services.async_database import AsyncDatabaseService
+from services.cache import create_cache, MemoryCache
+from services.database import DatabaseService
+from services.explore import ExploreFeed
+from services.jobs import JobQueue
+from services.prompt_cache import create_prompt_cache
+from services.single_flight import SingleFlight
+
+
+class ServiceRegistry:
+    """
+    ServiceRegistry class that creates the Supabase client, services, and job queue once per
+    worker process and hands the same instances to every request, so HTTP connections are kept
+    alive and reused instead of being rebuilt on each call.
+    """
+    def __init__(self, app=None):
+        """
+        Initialize the ServiceRegistry, optionally binding it to a Flask app.
+
+        :param app: The Flask app whose config holds SUPABASE_URL and SUPABASE_KEY.
+        """
+        self.app = None
+        self._lock = threading.Lock()
+        self._reset()
+        # Clients inherited from a parent process (e.g. gunicorn --preload) share its sockets,
+        # so each forked worker starts with an empty registry and builds its own.
+        os.register_at_fork(after_in_child=self._reset)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the registry to a Flask app.
+
+        :param app: The Flask app whose config holds SUPABASE_URL and SUPABASE_KEY.
+        """
+        self.app = app
+        app.extensions["service_registry"] = self
+
+    def _reset(self):
+        """Forget every service created so far."""
+        self._supabase_client = None
+        self._async_supabase_client = None
+        self._async_lock = asyncio.Lock()
+        self._response_cache = None
+        self._database = None
+        self._async_database = None
+        self._ai = None
+        self._jobs = None
+        self._quiz_saves = None
+        self._explore = None
+        self._similar_careers = None
+
+    def supabase_client(self):
+        """
+        Return the process-wide Supabase client, creating it on first use.
+
+        :return: A Supabase client whose PostgREST session uses a pooled HTTP client.
+        :raises ValueError: If SUPABASE_URL or SUPABASE_KEY is not configured.
+        """
+        if self._supabase_client is None:
+            with self._lock:
+                if self._supabase_client is None:
+                    self._supabase_client = self._create_supabase_client()
+        return self._supabase_client
+
+    def database(self):
+        """
+        Return the process-wide DatabaseService.
+
+        :return: A DatabaseService bound to the shared Supabase client and response cache.
+        """
+        if self._database is None:
+            client = self.supabase_client()
+            with self._lock:
+                if self._database is None:
+                    self._database = DatabaseService(client, cache=self._shared_response_cache())
+        return self._database
+
+    async def async_database(self):
+        """
+        Return the process-wide AsyncDatabaseService, creating the async Supabase client on first use.
+        Its connections belong to the event loop that created it, i.e. the ASGI server's loop.
+
+        :return: An AsyncDatabaseService sharing its response cache with database().
+        :raises ValueError: If SUPABASE_URL or SUPABASE_KEY is not configured.
+        """
+        if self._async_database is None:
+            async with self._async_lock:
+                if self._async_database is None:
+                    self._async_supabase_client = await self._create_async_supabase_client()
+                    with self._lock:
+                        cache = self._shared_response_cache()
+                    self._async_database = AsyncDatabaseService(
+                        self._async_supabase_client, cache=cache, max_in_flight=SUPABASE_MAX_CONNECTIONS
+                    )
+        return self._async_database
+
+    async def aclose(self):
+        """Close the async Supabase client's connections, e.g. when the ASGI server shuts down."""
+        client, self._async_supabase_client, self._async_database = self._async_supabase_client, None, None
+        if client is not None:
+            await client.postgrest.aclose()
+
+    def _shared_response_cache(self):
+        """Return the learning sources cache shared by both database services; call with _lock held."""
+        if self._response_cache is None:
+            self._response_cache = MemoryCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+        return self._response_cache
+
+    def explore(self):
+        """
+        Return the process-wide ExploreFeed.
+
+        :return: An ExploreFeed bound to the shared Supabase client and the configured page cache.
+        """
+        if self._explore is None:
+            client = self.supabase_client()
+            with self._lock:
+                if self._explore is None:
+                    self._explore = ExploreFeed(
+                        client,
+                        cache=create_cache(EXPLORE_CACHE_BACKEND, path=EXPLORE_CACHE_PATH, max_entries=EXPLORE_CACHE_MAX_ENTRIES),
+                        max_limit=EXPLORE_MAX_LIMIT,
+                        first_page_ttl=EXPLORE_FIRST_PAGE_TTL,
+                        page_ttl=EXPLORE_PAGE_TTL,
+                    )
+        return self._explore
+
+    def similar_careers(self):
+        """
+        Return the process-wide SimilarCareers index.
+
+        :return: A SimilarCareers bound to the shared DatabaseService; it loads existing titles in the background.
+        """
+        if self._similar_careers is None:
+            # Imported here so that loading the app does not pay for numpy
+            from services.similarity import SimilarCareers
+
+            db_service = self.database()
+            with self._lock:
+                if self._similar_careers is None:
+                    self._similar_careers = SimilarCareers(
+                        db_service,
+                        threshold=SIMILARITY_THRESHOLD,
+                        refresh_interval=SIMILARITY_REFRESH_INTERVAL,
+                        max_entries=SIMILARITY_MAX_ENTRIES,
+                    )
+        return self._similar_careers
+
+    def ai(self):
+        """
+        Return the process-wide AIService.
+
+        :return: An AIService whose model and cache are shared across requests.
+        """
+        if self._ai is None:
+            with self._lock:
+                if self._ai is None:
+                    cache = create_cache(AI_CACHE_BACKEND, path=AI_CACHE_PATH, max_entries=AI_CACHE_MAX_ENTRIES, ttl=AI_CACHE_TTL)
+                    prompt_cache = create_prompt_cache(
+                        AI_PROMPT_CACHE_MODE,
+                        AI_PROMPT_CACHE_PATH,
+                        max_entries=AI_PROMPT_CACHE_MAX_ENTRIES,
+                        ttl=AI_PROMPT_CACHE_TTL,
+                    )
+                    # Imported here so that loading the app does not pay for the Gemini SDK
+                    import google.generativeai as genai
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+                    single_flight = SingleFlight(lock_dir=AI_SINGLE_FLIGHT_LOCK_DIR, lock_timeout=AI_CALL_DEADLINE)
+                    self._ai = AIService(cache=cache, prompt_cache=prompt_cache, single_flight=single_flight)
+        return self._ai
+
+    def jobs(self):
+        """
+        Return the process-wide JobQueue for background submissions.
+
+        :return: A JobQueue whose thread pool belongs to this worker process.
+        """
+        if self._jobs is None:
+            with self._lock:
+                if self._jobs is None:
+                    store = create_cache(JOB_STORE_BACKEND, path=JOB_STORE_PATH, max_entries=JOB_STORE_MAX_ENTRIES, ttl=JOB_TTL)
+                    self._jobs = JobQueue(store, max_workers=SUBMISSION_WORKERS, stale_after=JOB_STALE_AFTER)
+        return self._jobs
+
+    def quiz_saves(self):
+        """
+        Return the process-wide thread pool that saves quiz responses while submissions generate.
+
+        :return: A ThreadPoolExecutor belonging to this worker process.
+        """
+        if self._quiz_saves is None:
+            with self._lock:
+                if self._quiz_saves is None:
+                    self._quiz_saves = ThreadPoolExecutor(max_workers=SUBMISSION_WORKERS, thread_name_prefix="quiz-save")
+        return self._quiz_saves
+
+    def _supabase_settings(self):
+        """
+        :return: The (url, key) pair from the Flask app config.
+        :raises ValueError: If SUPABASE_URL or SUPABASE_KEY is not configured.
+        """
+        url = self.app.config.get("SUPABASE_URL")
+        key = self.app.config.get("SUPABASE_KEY")
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in the Flask app config.")
+        return url, key
+
+    @staticmethod
+    def _pool_limits():
+        """Return the connection pool limits used for PostgREST sessions."""
+        import httpx
+
+        return httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        )
+
+    async def _create_async_supabase_client(self):
+        """
+        Create an async Supabase client whose PostgREST session uses a tuned connection pool.
+
+        :return: The new async Supabase client.
+        :raises ValueError: If SUPABASE_URL or SUPABASE_KEY is not configured.
+        """
+        url, key = self._supabase_settings()
+
+        # Imported here so that loading the app does not pay for the Supabase SDK
+        from postgrest.utils import AsyncClient
+        from supabase import acreate_client
+
+        client = await acreate_client(url, key)
+        postgrest = client.postgrest
+        default_session = postgrest.session
+        postgrest.session = AsyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=default_session.timeout,
+            follow_redirects=True,
+            http2=True,
+            limits=self._pool_limits(),
+        )
+        await default_session.aclose()
+        return client
+
+    def _create_supabase_client(self):
+        """
+        Create a Supabase client and replace its PostgREST session with a tuned connection pool.
+
+        :return: The new Supabase client.
+        :raises ValueError: If SUPABASE_URL or SUPABASE_KEY is not configured.
+        """
+        url, key = self._supabase_settings()
+
+        # Imported here so that loading the app does not pay for the Supabase SDK
+        from postgrest.utils import SyncClient
+        from supabase import create_client
+
+        client = create_client(url, key)
+        postgrest = client.postgrest
+        default_session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=default_session.timeout,
+            follow_redirects=True,
+            http2=True,
+            limits=self._pool_limits(),
+        )
+        default_session.close()
+        return client
@@ -0,0 +1,286 @@
+"""
+Retries, deadlines, and circuit breaking for model calls.
+
+A ModelCaller tries each configured model in turn. Transient failures (timeouts, 429s and 5xx
+responses) are retried with jittered exponential backoff until the call's deadline, and a model
+whose circuit breaker is open is skipped without waiting, so a Gemini incident costs each request
+one fast failure or one fallback call instead of a worker blocked on retries.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from services.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying: request timeout, rate limited, and server-side failures
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+AI_RETRIES = METRICS.counter("ai_retries", "Model calls retried after a transient failure.", ["prompt_type"])
+AI_FALLBACKS = METRICS.counter("ai_fallbacks", "Model calls answered by a fallback model.", ["prompt_type", "model"])
+AI_CIRCUIT_REJECTIONS = METRICS.counter(
+    "ai_circuit_rejections", "Model calls skipped because the model's circuit breaker was open.", ["model"]
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when every model is unavailable because its circuit breaker is open."""
+
+
+def is_transient(error):
+    """
+    Tell whether a failed model call is worth retrying.
+
+    :param error: The exception raised by the call.
+    :return: True for timeouts, connection errors, rate limiting, and server errors.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # google.api_core exceptions carry the HTTP status as an int code
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng=random):
+    """
+    Pick the sleep before a retry using "full jitter" exponential backoff, so clients that failed
+    together do not retry together.
+
+    :param attempt: The number of attempts made so far, starting at 1.
+    :param base_delay: The delay cap after the first attempt, in seconds.
+    :param max_delay: The largest delay cap, in seconds.
+    :param rng: The random number generator.
+    :return: The delay in seconds.
+    """
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker class that opens after consecutive transient failures and lets a single trial
+    call through once reset_timeout has passed.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        """
+        :param failure_threshold: Consecutive failures that open the circuit.
+        :param reset_timeout: Seconds the circuit stays open before a trial call is allowed.
+        :param clock: The monotonic clock, replaceable in tests.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """"closed", "open", or "half_open"."""
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """
+        Tell whether a call may go ahead. While half open, only one trial call is let through.
+
+        :return: True if the call may be made.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """Count a transient failure, opening the circuit at the threshold or after a failed trial."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+
+class ModelCaller:
+    """
+    ModelCaller class that runs a model call with retries, a deadline, a circuit breaker per
+    model, and fallback to the next model when one is exhausted or unavailable.
+    """
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8, deadline=45, call_timeout=30,
+                 failure_threshold=5, reset_timeout=30, sleep=time.sleep, clock=time.monotonic, rng=None,
+                 async_sleep=asyncio.sleep):
+        """
+        :param max_attempts: Attempts per model, including the first.
+        :param base_delay: The backoff cap after the first failed attempt, in seconds.
+        :param max_delay: The largest backoff cap, in seconds.
+        :param deadline: Seconds a call may take across every attempt and model.
+        :param call_timeout: Seconds a single attempt may take.
+        :param failure_threshold: Consecutive transient failures that open a model's circuit.
+        :param reset_timeout: Seconds before an open circuit lets a trial call through.
+        :param sleep: The sleep function, replaceable in tests.
+        :param clock: The monotonic clock, replaceable in tests.
+        :param rng: An optional random.Random for the backoff jitter.
+        :param async_sleep: The coroutine sleep function used by call_async, replaceable in tests.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.call_timeout = call_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.async_sleep = async_sleep
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model_name):
+        """
+        :param model_name: The name of a model.
+        :return: The model's CircuitBreaker, shared by every call in this process.
+        """
+        with self._lock:
+            breaker = self._breakers.get(model_name)
+            if breaker is None:
+                breaker = self._breakers[model_name] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, clock=self.clock
+                )
+            return breaker
+
+    def call(self, func, models, label="", budget=None):
+        """
+        Call func(model, timeout) on the first model that answers.
+
+        :param func: Makes one attempt with a model and a per-attempt timeout in seconds.
+        :param models: A list of (name, model) pairs, primary first.
+        :param label: The prompt type, used in metrics and log messages.
+        :param budget: Optional seconds the caller can still wait, when that is less than the
+            deadline. Attempts are cut short to fit it, so the call ends once nobody is waiting.
+        :return: Whatever func returns.
+        :raises CircuitOpenError: If every model's circuit is open.
+        :raises Exception: The last error when no model answered, or the first non-transient one.
+        """
+        deadline = self.clock() + (self.deadline if budget is None else min(self.deadline, budget))
+        last_error = None
+        for position, (name, model) in enumerate(models):
+            breaker = self.breaker(name)
+            for attempt in range(1, self.max_attempts + 1):
+                timeout, error = self._next_timeout(breaker, name, deadline)
+                if timeout is None:
+                    last_error = last_error or error
+                    break
+                try:
+                    result = func(model, timeout)
+                except Exception as e:
+                    last_error = e
+                    delay = self._retry_delay(e, breaker, attempt, deadline, label, name)
+                    if delay is None:
+                        break
+                    self.sleep(delay)
+                else:
+                    self._succeeded(breaker, position, label, name)
+                    return result
+        raise self._exhausted(last_error, label)
+
+    async def call_async(self, func, models, label=""):
+        """
+        Await func(model, timeout) on the first model that answers, like call but sleeping
+        between retries without blocking the event loop.
+
+        :param func: A coroutine function making one attempt with a model and a timeout in seconds.
+        :param models: A list of (name, model) pairs, primary first.
+        :param label: The prompt type, used in metrics and log messages.
+        :return: Whatever func returns.
+        :raises CircuitOpenError: If every model's circuit is open.
+        :raises Exception: The last error when no model answered, or the first non-transient one.
+        """
+        deadline = self.clock() + self.deadline
+        last_error = None
+        for position, (name, model) in enumerate(models):
+            breaker = self.breaker(name)
+            for attempt in range(1, self.max_attempts + 1):
+                timeout, error = self._next_timeout(breaker, name, deadline)
+                if timeout is None:
+                    last_error = last_error or error
+                    break
+                try:
+                    result = await func(model, timeout)
+                except Exception as e:
+                    last_error = e
+                    delay = self._retry_delay(e, breaker, attempt, deadline, label, name)
+                    if delay is None:
+                        break
+                    await self.async_sleep(delay)
+                else:
+                    self._succeeded(breaker, position, label, name)
+                    return result
+        raise self._exhausted(last_error, label)
+
+    def _next_timeout(self, breaker, name, deadline):
+        """
+        Decide whether another attempt may be made with a model.
+
+        :return: A (timeout, error) tuple. The timeout is None when the deadline has passed or the
+            model's circuit is open, in which case error is a CircuitOpenError or None.
+        """
+        remaining = deadline - self.clock()
+        if remaining <= 0:
+            return None, None
+        if not breaker.allow():
+            AI_CIRCUIT_REJECTIONS.inc(model=name)
+            return None, CircuitOpenError(f"Circuit open for {name}")
+        return min(self.call_timeout, remaining), None
+
+    def _retry_delay(self, error, breaker, attempt, deadline, label, name):
+        """
+        Record a failed attempt and pick the sleep before retrying it.
+
+        :return: The delay in seconds, or None when the model should be given up on.
+        :raises Exception: The error itself when it is not transient.
+        """
+        if not is_transient(error):
+            # The model answered, so the circuit stays closed; the request itself is bad
+            breaker.record_success()
+            raise error
+        breaker.record_failure()
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay, self.rng)
+        if attempt == self.max_attempts or self.clock() + delay >= deadline:
+            logger.warning("%s call to %s failed after %d attempts: %s", label, name, attempt, error)
+            return None
+        AI_RETRIES.inc(prompt_type=label)
+        return delay
+
+    @staticmethod
+    def _succeeded(breaker, position, label, name):
+        """Record a successful attempt, counting it as a fallback when a later model answered."""
+        breaker.record_success()
+        if position > 0:
+            AI_FALLBACKS.inc(prompt_type=label, model=name)
+
+    def _exhausted(self, last_error, label):
+        """Return the error to raise once no model answered."""
+        if last_error is None:
+            return TimeoutError(f"{label} call exceeded its {self.deadline}s deadline")
+        return last_error
@@ -0,0 +1,300 @@
+"""
+Near-duplicate detection for career titles.
+
+Titles (and, with a lower weight, tags) are embedded as hashed character n-gram vectors, so
+"Data Scientist (Healthcare)" and "Healthcare Data Scientist" land close together without a model
+or vocabulary. The vectors are L2-normalized, which makes a nearest-neighbour query a single
+matrix-vector product.
+
+A high score alone does not make two careers the same: "Marine Biologist" scores close to
+"Biologist" because it contains it. Reuse therefore also requires both titles to have the same
+words, in any order and ignoring connectives, so only rewordings of one title are merged.
+"""
+import logging
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from utils import normalize_job_title
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words that do not change which career a title names, e.g. "Research and Development Engineer"
+_CONNECTIVES = {"and", "of", "for", "in", "the", "a", "an", "to"}
+
+# Recommendations loaded per request while refreshing the index
+_PAGE_SIZE = 1000
+
+
+def vectorize(text, dims, ngram=3, word_weight=3.0):
+    """
+    Embed text as a hashed bag of words and character n-grams.
+
+    :param text: The text to embed.
+    :param dims: The vector length.
+    :param ngram: The character n-gram length.
+    :param word_weight: The weight of whole words relative to n-grams, so that titles sharing a
+        prefix ("Product"/"Project") stay apart while word order and suffixes do not matter.
+    :return: An L2-normalized float32 vector, all zeros if the text has no words.
+    """
+    vector = np.zeros(dims, dtype=np.float32)
+    for word in _WORD.findall(normalize_job_title(text)):
+        vector[zlib.crc32(word.encode("utf-8")) % dims] += word_weight
+        padded = f" {word} "
+        for start in range(len(padded) - ngram + 1):
+            vector[zlib.crc32(padded[start:start + ngram].encode("utf-8")) % dims] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def title_words(job_title):
+    """
+    Return the words that name a career, ignoring case, punctuation, order, and connectives.
+
+    :param job_title: The job title.
+    :return: A frozenset of words.
+    """
+    return frozenset(_WORD.findall(normalize_job_title(job_title))) - _CONNECTIVES
+
+
+class SimilarityIndex:
+    """
+    SimilarityIndex class that keeps one vector per job recommendation and finds the closest
+    existing careers to a title.
+    """
+    def __init__(self, dims=2048, tags_weight=0.2):
+        """
+        :param dims: The length of the hashed vectors.
+        :param tags_weight: How much the tags count relative to the title.
+        """
+        self.dims = dims
+        self.tags_weight = tags_weight
+        self._vectors = np.zeros((0, dims), dtype=np.float32)
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def embed(self, job_title, tags=""):
+        """
+        Embed a career from its title and tags.
+
+        :param job_title: The job title.
+        :param tags: The recommendation's tags as a comma-separated string.
+        :return: An L2-normalized vector.
+        """
+        vector = vectorize(job_title, self.dims)
+        if tags:
+            vector = vector + self.tags_weight * vectorize(tags, self.dims)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, entries):
+        """
+        Add careers to the index.
+
+        :param entries: Dictionaries with at least "id", "job_title", and "tags".
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        vectors = np.stack([self.embed(entry["job_title"], entry.get("tags") or "") for entry in entries])
+        with self._lock:
+            self._vectors = np.vstack([self._vectors, vectors])
+            self._entries.extend(entries)
+
+    def trim(self, max_entries):
+        """
+        Drop the oldest careers beyond a maximum.
+
+        :param max_entries: The number of most recently added careers to keep.
+        """
+        with self._lock:
+            if len(self._entries) > max_entries:
+                self._vectors = self._vectors[-max_entries:]
+                self._entries = self._entries[-max_entries:]
+
+    def nearest(self, job_title, tags="", k=5, exclude_id=None):
+        """
+        Find the indexed careers closest to a title, one per distinct normalized title.
+
+        :param job_title: The job title to look up.
+        :param tags: Optional tags for the title.
+        :param k: The maximum number of results.
+        :param exclude_id: An optional recommendation ID to leave out.
+        :return: A list of (score, entry) tuples, best first.
+        """
+        with self._lock:
+            vectors, entries = self._vectors, self._entries
+        if not entries:
+            return []
+        scores = vectors @ self.embed(job_title, tags)
+
+        results, seen = [], set()
+        # Best first, and newest first among equal scores so reuse picks the latest rows
+        order = len(entries) - 1 - np.argsort(-scores[::-1], kind="stable")
+        for index in order:
+            entry = entries[index]
+            title = normalize_job_title(entry["job_title"])
+            if entry["id"] == exclude_id or title in seen:
+                continue
+            seen.add(title)
+            results.append((float(scores[index]), entry))
+            if len(results) == k:
+                break
+        return results
+
+
+class SimilarCareers:
+    """
+    SimilarCareers class that keeps a SimilarityIndex in step with the job_recommendations table,
+    to reuse milestones and sources for near-duplicate careers and to suggest similar careers.
+
+    Recommendations saved by other workers are loaded on a background thread, so lookups never
+    wait for the database; until the first load finishes they only see careers added in-process.
+    """
+    def __init__(self, db_service, index=None, threshold=0.72, refresh_interval=300, max_entries=50000):
+        """
+        :param db_service: The DatabaseService used to load titles and reusable rows.
+        :param index: An optional SimilarityIndex to fill.
+        :param threshold: The cosine similarity at or above which two careers with the same title
+            words count as the same.
+        :param refresh_interval: Seconds between loads of recommendations saved by other workers.
+        :param max_entries: The most recommendations kept in the index; the oldest are dropped first.
+        """
+        self.db_service = db_service
+        self.index = index or SimilarityIndex()
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.max_entries = max_entries
+        self._last_id = 0
+        self._indexed_ids = set()
+        self._refreshed_at = None
+        self._refresh_lock = threading.Lock()
+        self._refreshing = None
+        self._start_lock = threading.Lock()
+
+    def add(self, recommendations, college_year=None):
+        """
+        Index recommendations that were just saved.
+
+        :param recommendations: Dictionaries with "id", "job_title", and "tags".
+        :param college_year: The college year their milestones were generated for.
+        """
+        recommendations = [{**rec, "college_year": college_year} for rec in recommendations]
+        self._indexed_ids.update(rec["id"] for rec in recommendations)
+        self.index.add(recommendations)
+        self.index.trim(self.max_entries)
+
+    def match(self, job_title, tags=""):
+        """
+        Find an existing career that is a near-duplicate of a title: one scoring at least the
+        threshold whose title has the same words.
+
+        :param job_title: The job title to look up.
+        :param tags: Optional tags for the title.
+        :return: The matching entry, or None.
+        """
+        self._refresh()
+        words = title_words(job_title)
+        for score, entry in self.index.nearest(job_title, tags, k=5):
+            if score < self.threshold:
+                break
+            if title_words(entry["job_title"]) == words:
+                return entry
+        return None
+
+    def find_reusable(self, job_title, tags, college_year):
+        """
+        Look up milestones and sources already generated for a near-duplicate career.
+
+        Sources do not depend on the college year, so they are reused for any match. Milestones
+        are only reused when the match was generated for the same college year, which is only
+        known for careers added by this worker: job_recommendations does not store it, so careers
+        loaded from the database only ever reuse sources.
+
+        :param job_title: The job title of the new recommendation.
+        :param tags: The tags of the new recommendation.
+        :param college_year: The college year of the submitting user.
+        :return: A (milestones, sources) tuple; either is None when it must be generated.
+        """
+        try:
+            entry = self.match(job_title, tags)
+            if entry is None:
+                return None, None
+            sources = _copy_rows(self.db_service.get_sources(entry["id"]), ["icon", "title", "description"])
+            for source in sources:
+                source["status"] = "Not Started"
+            milestones = None
+            if entry.get("college_year") is not None and entry["college_year"] == college_year:
+                milestones = _copy_rows(self.db_service.get_milestones(entry["id"]), ["title", "description"])
+            return milestones or None, sources or None
+        except Exception:
+            logger.exception("Failed to look up reusable details for %s", job_title)
+            return None, None
+
+    def similar(self, job_title, tags="", k=5, exclude_id=None):
+        """
+        Suggest careers similar to a title.
+
+        :param job_title: The job title to look up.
+        :param tags: Optional tags for the title.
+        :param k: The maximum number of suggestions.
+        :param exclude_id: An optional recommendation ID to leave out.
+        :return: A list of dictionaries with "id", "job_title", "tags", and "score".
+        """
+        self._refresh()
+        # One extra result in case the title itself is indexed
+        return [
+            {"id": entry["id"], "job_title": entry["job_title"], "tags": entry.get("tags") or "", "score": round(score, 3)}
+            for score, entry in self.index.nearest(job_title, tags, k=k + 1, exclude_id=exclude_id)
+            if normalize_job_title(entry["job_title"]) != normalize_job_title(job_title)
+        ][:k]
+
+    def refresh(self):
+        """
+        Load recommendations saved since the last refresh, keeping the newest max_entries. Runs
+        in the caller's thread, e.g. during warm-up; lookups call it in the background instead.
+        """
+        with self._refresh_lock:
+            started_at = time.monotonic()
+            while True:
+                rows = self.db_service.get_recommendation_titles(after_id=self._last_id, limit=_PAGE_SIZE)
+                if rows:
+                    self.index.add(row for row in rows if row["id"] not in self._indexed_ids)
+                    self.index.trim(self.max_entries)
+                    self._last_id = rows[-1]["id"]
+                if len(rows) < _PAGE_SIZE:
+                    break
+            # Careers added in-process are only skipped until the load has passed their IDs
+            self._indexed_ids = {rec_id for rec_id in self._indexed_ids if rec_id > self._last_id}
+            self._refreshed_at = started_at
+
+    def _refresh(self):
+        """Start a background refresh if none has run in the last refresh_interval and none is running."""
+        if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        with self._start_lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self._refresh_in_background, name="similarity-refresh", daemon=True)
+            self._refreshing.start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Failed to refresh the similarity index")
+            # Wait a full interval before trying again rather than retrying on every lookup
+            self._refreshed_at = time.monotonic()
+
+
+def _copy_rows(rows, keys):
+    """Copy the content columns of saved rows so they can be saved again for a new recommendation."""
+    return [{key: row[key] for key in keys if key in row} for row in rows]
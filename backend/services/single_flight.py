@@ -0,0 +1,188 @@
+"""
+Request coalescing for identical generations.
+
+Concurrent callers asking for the same key share one call: the first caller runs it and the rest
+wait for its result. With a lock directory, the caller that runs the call also takes a file lock
+for the key, so another worker process generating the same key finishes first and its result can
+be picked up from a shared cache instead of being generated twice. do_async does the same for
+coroutines on one event loop.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+
+from services.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_SHARED = METRICS.counter(
+    "single_flight_shared", "Calls answered by a generation already in flight.", ["name", "scope"]
+)
+
+
+class SingleFlight:
+    """
+    SingleFlight class that collapses concurrent calls for the same key into one.
+    """
+    def __init__(self, lock_dir=None, stripes=256, lock_timeout=60, wait_timeout=None):
+        """
+        :param lock_dir: An optional directory for file locks shared by worker processes.
+        :param stripes: The number of lock files keys are spread over.
+        :param lock_timeout: Seconds to wait for another process's file lock before generating anyway.
+        :param wait_timeout: Seconds a caller waits for an in-flight call in this process, or None.
+        """
+        self.lock_dir = lock_dir
+        self.stripes = stripes
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        # Futures of calls in flight on the event loop; only touched from the loop's thread
+        self._async_calls = {}
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, func, recheck=None, name=""):
+        """
+        Return func(), sharing one call among concurrent callers with the same key.
+
+        :param key: Identifies the call, e.g. a cache key.
+        :param func: The call to make.
+        :param recheck: An optional callable returning a result stored by another process, or None.
+            It is called once the cross-process lock is held, before func.
+        :param name: A short name for metrics, e.g. the prompt type.
+        :return: The result of func, or of recheck.
+        :raises Exception: Whatever func raised, for the caller that ran it and every waiter.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            SINGLE_FLIGHT_SHARED.inc(name=name, scope="thread")
+            return future.result(timeout=self.wait_timeout)
+
+        try:
+            result = self._run(key, func, recheck, name)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key, func, recheck=None, name=""):
+        """
+        Await func(), sharing one call among concurrent coroutines with the same key, like do.
+
+        :param key: Identifies the call, e.g. a cache key.
+        :param func: A coroutine function making the call.
+        :param recheck: An optional callable returning a result stored by another process, or None.
+        :param name: A short name for metrics, e.g. the prompt type.
+        :return: The result of func, or of recheck.
+        :raises Exception: Whatever func raised, for the caller that ran it and every waiter.
+        """
+        future = self._async_calls.get(key)
+        if future is not None:
+            SINGLE_FLIGHT_SHARED.inc(name=name, scope="task")
+            # Shielded, so a waiter giving up does not cancel the call for everyone else
+            return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+
+        future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved, so a failure nobody waited for is not logged again
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        try:
+            result = await self._run_async(key, func, recheck, name)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_calls[key]
+
+    def _run(self, key, func, recheck, name):
+        """Run the call, holding the key's file lock when a lock directory is configured."""
+        if not self.lock_dir:
+            return func()
+        with self._file_lock(key):
+            if recheck is not None:
+                result = recheck()
+                if result is not None:
+                    SINGLE_FLIGHT_SHARED.inc(name=name, scope="process")
+                    return result
+            return func()
+
+    async def _run_async(self, key, func, recheck, name):
+        """Await the call, holding the key's file lock when a lock directory is configured."""
+        if not self.lock_dir:
+            return await func()
+        async with self._file_lock_async(key):
+            if recheck is not None:
+                result = recheck()
+                if result is not None:
+                    SINGLE_FLIGHT_SHARED.inc(name=name, scope="process")
+                    return result
+            return await func()
+
+    @contextmanager
+    def _file_lock(self, key):
+        """
+        Hold the lock file for a key's stripe. Waiting is bounded by lock_timeout, after which the
+        call goes ahead unlocked rather than stalling behind a stuck process.
+        """
+        fd = self._open_stripe(key)
+        try:
+            deadline = time.monotonic() + self.lock_timeout
+            while not self._try_lock(fd, key, deadline):
+                time.sleep(0.05)
+            yield
+        finally:
+            os.close(fd)
+
+    @asynccontextmanager
+    async def _file_lock_async(self, key):
+        """Hold the lock file for a key's stripe like _file_lock, polling without blocking the event loop."""
+        fd = self._open_stripe(key)
+        try:
+            deadline = time.monotonic() + self.lock_timeout
+            while not self._try_lock(fd, key, deadline):
+                await asyncio.sleep(0.05)
+            yield
+        finally:
+            os.close(fd)
+
+    def _open_stripe(self, key):
+        """Open the lock file of the stripe a key hashes to."""
+        stripe = zlib.crc32(key.encode("utf-8")) % self.stripes
+        return os.open(os.path.join(self.lock_dir, f"{stripe}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+
+    @staticmethod
+    def _try_lock(fd, key, deadline):
+        """
+        Try once to take the lock without waiting.
+
+        :return: True once the lock is held or the deadline has passed, False to poll again.
+        """
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                logger.warning("Timed out waiting for the generation lock of %s", key[:12])
+                return True
+            return False
@@ -0,0 +1,54 @@
+"""
+Backfill of the recommendation_snapshots table for users who submitted before it existed.
+
+Create the table with sql/recommendation_snapshots.sql first, then run from the backend directory:
+    python -m services.snapshots [--batch-size 200] [--after-user-id <uuid>]
+
+Users are read from quiz_responses in ID order, a batch at a time, and each batch costs one
+limited read of recommendations per user and one upsert. Snapshots that already exist, e.g. written by a
+submission while the backfill runs, are kept, so the script can be rerun or resumed safely.
+"""
+import argparse
+import logging
+
+from config import RECOMMENDATION_SNAPSHOT_BACKFILL_BATCH_SIZE
+from services.database import build_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+def backfill(db_service, batch_size=RECOMMENDATION_SNAPSHOT_BACKFILL_BATCH_SIZE, after_user_id=None):
+    """
+    Add a snapshot for every user with quiz responses who has none.
+
+    :param db_service: The DatabaseService to read and write through.
+    :param batch_size: The number of users handled per batch.
+    :param after_user_id: Start after this user ID, e.g. the last one logged by an interrupted run.
+    :return: The number of snapshots sent, including ones kept because they already existed.
+    """
+    written = 0
+    while True:
+        user_ids = db_service.get_quiz_user_ids(after_user_id=after_user_id, limit=batch_size)
+        if not user_ids:
+            return written
+        # Users without recommendations get an empty snapshot, so their reads are a single lookup too
+        snapshots = build_snapshots(db_service.get_recommendations_for_users(user_ids), user_ids)
+        if snapshots:
+            db_service.save_recommendation_snapshots(snapshots, overwrite=False)
+        written += len(snapshots)
+        after_user_id = user_ids[-1]
+        logger.info("Backfilled %d snapshots, through user %s", written, after_user_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=RECOMMENDATION_SNAPSHOT_BACKFILL_BATCH_SIZE)
+    parser.add_argument("--after-user-id", help="Resume after this user ID.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    # Loads .env and binds the registry to the configured Supabase project
+    from app import registry
+
+    total = backfill(registry.database(), batch_size=args.batch_size, after_user_id=args.after_user_id)
+    print(f"Backfilled {total} recommendation snapshots")
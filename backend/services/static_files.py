@@ -0,0 +1,209 @@
+"""
+Serving of the built frontend (frontend/dist) from an in-memory manifest.
+
+The dist directory is scanned once, during warm-up or on the first request. Each file's size,
+ETag, content type, and precompressed .br/.gz variants are recorded, so a request picks the best
+encoding the client accepts without probing the disk, and SPA routes resolve to index.html, which
+is held in memory.
+Fingerprinted Vite assets (assets/name-<hash>.ext) never change, so they are served as immutable.
+
+Variants are produced after a build with:
+    python -m services.static_files frontend/dist
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import sys
+import threading
+
+from flask import Response, send_file
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz variants are written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "no-cache"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Preferred first; each maps an Accept-Encoding token to the suffix of its precompressed file
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Vite writes hashed bundles to assets/, e.g. assets/index-BdX9a7_c.js
+_FINGERPRINTED = re.compile(r"^assets/.+[.-][A-Za-z0-9_-]{8,}\.\w+$")
+
+# Only text-like files are worth compressing
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".xml", ".map", ".webmanifest"}
+
+
+class StaticFile:
+    """
+    StaticFile class holding what is needed to serve one dist file without touching the disk
+    beyond reading the chosen variant.
+    """
+    def __init__(self, path, relative_path, variants):
+        """
+        :param path: The absolute path of the file.
+        :param relative_path: The path relative to the dist directory, with forward slashes.
+        :param variants: A dictionary mapping encodings ("br", "gzip") to precompressed file paths.
+        """
+        stat = os.stat(path)
+        self.path = path
+        self.relative_path = relative_path
+        self.variants = variants
+        self.size = stat.st_size
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = hashlib.sha1(f"{relative_path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:20]
+        if _FINGERPRINTED.match(relative_path):
+            self.cache_control = IMMUTABLE_CACHE_CONTROL
+        elif relative_path == "index.html":
+            self.cache_control = INDEX_CACHE_CONTROL
+        else:
+            self.cache_control = DEFAULT_CACHE_CONTROL
+
+
+class StaticFiles:
+    """
+    StaticFiles class that serves a dist directory from a manifest built once per process, falling
+    back to index.html for SPA routes.
+    """
+    def __init__(self, root):
+        """
+        :param root: The dist directory.
+        """
+        self.root = root
+        self.files = {}
+        self._index_bodies = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Scan the dist directory, once. A missing directory (e.g. in development before a build)
+        gives an empty manifest, and every request answers 404.
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            files = self._scan() if os.path.isdir(self.root) else {}
+            index = files.get("index.html")
+            if index is not None:
+                # SPA routes are the most common miss, so index.html and its variants stay in memory
+                for encoding, path in [(None, index.path), *index.variants.items()]:
+                    with open(path, "rb") as index_file:
+                        self._index_bodies[encoding] = index_file.read()
+            self.files = files
+            self._loaded = True
+
+    def _scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            names = set(names)
+            for name in names:
+                if name.endswith((".br", ".gz")) and name[:-3] in names:
+                    continue
+                path = os.path.join(directory, name)
+                relative_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                variants = {
+                    encoding: f"{path}{suffix}" for encoding, suffix in ENCODINGS if f"{name}{suffix}" in names
+                }
+                files[relative_path] = StaticFile(path, relative_path, variants)
+        logger.info("Indexed %d static files in %s", len(files), self.root)
+        return files
+
+    def resolve(self, path):
+        """
+        Find the file for a request path.
+
+        :param path: The URL path without its leading slash.
+        :return: A StaticFile, the index.html entry for SPA routes, or None if nothing matches.
+        """
+        self.load()
+        entry = self.files.get(path or "index.html")
+        if entry is not None:
+            return entry
+        # A missing file under assets/ or with an extension is a real 404, not a client-side route
+        if path.startswith("assets/") or "." in path.rsplit("/", 1)[-1]:
+            return None
+        return self.files.get("index.html")
+
+    def serve(self, path, request):
+        """
+        Build the response for a request path.
+
+        :param path: The URL path without its leading slash.
+        :param request: The current Flask request, for Accept-Encoding and conditional headers.
+        :return: A Flask Response, or None if the path is not found.
+        """
+        entry = self.resolve(path)
+        if entry is None:
+            return None
+        encoding = next(
+            (name for name, _ in ENCODINGS if name in entry.variants and request.accept_encodings[name]), None
+        )
+
+        if entry.relative_path == "index.html":
+            response = Response(self._index_bodies[encoding], content_type=f"{entry.content_type}; charset=utf-8")
+        else:
+            response = send_file(
+                entry.variants[encoding] if encoding else entry.path,
+                mimetype=entry.content_type,
+                etag=False,
+                conditional=False,
+                max_age=None,
+            )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if entry.variants:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = entry.cache_control
+        response.set_etag(f"{entry.etag}-{encoding}" if encoding else entry.etag)
+        return response.make_conditional(request)
+
+
+def precompress(root, min_size=1024):
+    """
+    Write .gz (and .br, when the brotli package is installed) variants next to each compressible
+    file in a dist directory, skipping files too small to benefit and variants that are up to date.
+
+    :param root: The dist directory.
+    :param min_size: The smallest file size, in bytes, worth compressing.
+    :return: The number of variants written.
+    """
+    compressors = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append((".br", lambda data: brotli.compress(data, quality=11)))
+
+    written = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS or os.path.getsize(path) < min_size:
+                continue
+            with open(path, "rb") as source:
+                data = source.read()
+            for suffix, compress in compressors:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                with open(f"{target}.tmp", "wb") as output:
+                    output.write(compressed)
+                os.replace(f"{target}.tmp", target)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    dist = sys.argv[1] if len(sys.argv) > 1 else os.path.join("frontend", "dist")
+    print(f"Wrote {precompress(dist)} compressed variants in {dist}")
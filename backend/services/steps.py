@@ -0,0 +1,74 @@
+"""
+Code shared by the threaded (Flask) and asyncio (ASGI) paths, written once as generators.
+
+A step generator yields every call whose result may have to be awaited, such as a Supabase request
+or another shared method, and is sent the result back:
+
+    response = yield self._execute("milestones", "select", query)
+
+On the threaded path the call has already run by the time it is yielded, so run() sends its value
+straight back. On the asyncio path the call returns an awaitable, which run_async() awaits, throwing
+any error back into the generator at the yield, so try/except blocks behave the same on both paths.
+"""
+import functools
+import inspect
+
+
+def run(steps):
+    """
+    Run a step generator on the current thread.
+
+    :param steps: A generator whose yielded values are already results.
+    :return: The generator's return value.
+    """
+    value = None
+    while True:
+        try:
+            value = steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+
+async def run_async(steps):
+    """
+    Run a step generator on the event loop, awaiting every awaitable it yields.
+
+    :param steps: A generator yielding awaitables or plain values.
+    :return: The generator's return value.
+    """
+    value, error = None, None
+    while True:
+        try:
+            value = steps.send(value) if error is None else steps.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        error = None
+        if inspect.isawaitable(value):
+            try:
+                value = await value
+            except Exception as e:
+                value, error = None, e
+
+
+class shared:
+    """
+    Decorator for a method written as a step generator. Calling the method runs the steps with the
+    instance's _run, so the same body is a plain method on a class whose _run is run, and a
+    coroutine method on one whose _run is run_async.
+    """
+    def __init__(self, func):
+        """
+        :param func: The generator function.
+        """
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        func = self.func
+
+        @functools.wraps(func)
+        def method(*args, **kwargs):
+            return instance._run(func(instance, *args, **kwargs))
+        return method
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import time
+from contextlib import closing
+from concurrent.futures import Future, as_completed, TimeoutError as FutureTimeoutError
+
+from config import AI_CALL_DEADLINE
+from services.metrics import span
+from services.parsing import InvalidResponseError
+from utils import clean_text
+
+logger = logging.getLogger(__name__)
+
+# Stages reported to the progress callback, in the order they run
+STAGES = ["recommendations", "milestones", "sources", "saving"]
+
+
+class SubmissionPipeline:
+    """
+    SubmissionPipeline class that turns a user's quiz answers into saved career recommendations,
+    milestones, and learning sources. run_async does the same as run on the event loop, given an
+    AsyncDatabaseService.
+
+    The quiz responses are saved while the model works from the submitted answers in memory, and
+    are only waited for before the results are saved.
+    """
+    def __init__(self, db_service, ai_service, explore_feed=None, similar_careers=None, combined=False,
+                 executor=None):
+        """
+        Initialize the SubmissionPipeline with the services it depends on.
+
+        :param db_service: The DatabaseService used to persist results.
+        :param ai_service: The AIService used to generate content.
+        :param explore_feed: An optional ExploreFeed to invalidate once new recommendations are saved.
+        :param similar_careers: An optional SimilarCareers used to reuse the milestones and sources
+            of near-duplicate careers instead of generating them.
+        :param combined: Whether run() first tries generating everything in one model call.
+        :param executor: An optional executor that saves the quiz responses while run() and stream()
+            generate; without one they are saved before generation starts.
+        """
+        self.db_service = db_service
+        self.ai_service = ai_service
+        self.explore_feed = explore_feed
+        self.similar_careers = similar_careers
+        self.combined = combined
+        self.executor = executor
+
+    def run(self, user_id, mapped_data, progress=None):
+        """
+        Save the quiz responses, generate recommendations with their milestones and sources, and
+        save everything as one bundle.
+
+        :param user_id: The ID of the submitting user.
+        :param mapped_data: The quiz responses returned by map_form_data.
+        :param progress: An optional callback called as progress(stage, state) for each stage in STAGES.
+        :return: A dictionary with the generated recommendations.
+        """
+        progress = progress or (lambda stage, state: None)
+        saving_quiz = self._save_quiz(mapped_data)
+
+        progress("recommendations", "running")
+        generated = self._generate_combined(mapped_data, mapped_data["college_year"]) if self.combined else None
+        if generated is not None:
+            recommendations, details = generated
+            progress("recommendations", "done")
+            progress("milestones", "done")
+            progress("sources", "done")
+        else:
+            with span("submission.recommendations"):
+                recommendations = self.ai_service.generate_recommendations(mapped_data)[:3]
+            progress("recommendations", "done")
+
+            # Milestones and sources are generated concurrently, so both stages run together
+            progress("milestones", "running")
+            progress("sources", "running")
+            with span("submission.reuse_lookup"):
+                reused = [self._find_reusable(rec, mapped_data["college_year"]) for rec in recommendations]
+            with span("submission.details"):
+                details = self.ai_service.generate_details(recommendations, mapped_data["college_year"], reused=reused)
+            progress("milestones", "done")
+            progress("sources", "done")
+
+        progress("saving", "running")
+        # Only the time the quiz save is still outstanding once generation is done
+        with span("submission.save_quiz"):
+            saving_quiz.result()
+        with span("submission.save_bundle"):
+            recommendation_ids = self.db_service.save_recommendation_bundle([
+                self._bundle_entry(user_id, rec, milestones, sources)
+                for rec, (milestones, sources) in zip(recommendations, details)
+            ], snapshot=True)
+            self._after_save(recommendations, recommendation_ids, mapped_data["college_year"])
+        progress("saving", "done")
+
+        return {"recommendations": recommendations}
+
+    async def run_async(self, user_id, mapped_data, progress=None):
+        """
+        Run the pipeline as a coroutine, awaiting the database and model calls.
+
+        :param user_id: The ID of the submitting user.
+        :param mapped_data: The quiz responses returned by map_form_data.
+        :param progress: An optional callback called as progress(stage, state) for each stage in STAGES.
+        :return: A dictionary with the generated recommendations.
+        """
+        progress = progress or (lambda stage, state: None)
+        saving_quiz = asyncio.ensure_future(self.db_service.save_quiz_responses(mapped_data))
+        # Marks a failed save as retrieved when generation fails first and it is never awaited
+        saving_quiz.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        progress("recommendations", "running")
+        generated = None
+        if self.combined:
+            try:
+                with span("submission.combined"):
+                    generated = await self.ai_service.generate_submission_async(mapped_data, mapped_data["college_year"])
+            except InvalidResponseError as e:
+                logger.warning("Combined generation failed validation, using separate calls: %s", e)
+        if generated is not None:
+            recommendations, details = generated
+            progress("recommendations", "done")
+            progress("milestones", "done")
+            progress("sources", "done")
+        else:
+            with span("submission.recommendations"):
+                recommendations = (await self.ai_service.generate_recommendations_async(mapped_data))[:3]
+            progress("recommendations", "done")
+
+            progress("milestones", "running")
+            progress("sources", "running")
+            with span("submission.reuse_lookup"):
+                # The similarity index reads through the synchronous DatabaseService
+                reused = await asyncio.to_thread(
+                    lambda: [self._find_reusable(rec, mapped_data["college_year"]) for rec in recommendations]
+                )
+            with span("submission.details"):
+                details = await self.ai_service.generate_details_async(
+                    recommendations, mapped_data["college_year"], reused=reused
+                )
+            progress("milestones", "done")
+            progress("sources", "done")
+
+        progress("saving", "running")
+        with span("submission.save_quiz"):
+            await saving_quiz
+        with span("submission.save_bundle"):
+            recommendation_ids = await self.db_service.save_recommendation_bundle([
+                self._bundle_entry(user_id, rec, milestones, sources)
+                for rec, (milestones, sources) in zip(recommendations, details)
+            ], snapshot=True)
+            # Indexing the careers is CPU work that should not stall the event loop
+            await asyncio.to_thread(self._after_save, recommendations, recommendation_ids, mapped_data["college_year"])
+        progress("saving", "done")
+
+        return {"recommendations": recommendations}
+
+    def stream(self, user_id, mapped_data, timeout=AI_CALL_DEADLINE):
+        """
+        Run the pipeline, yielding events as soon as each result is available.
+
+        Each recommendation is yielded as the model finishes writing it, and its milestones and
+        sources start generating straight away while later recommendations are still streaming.
+
+        :param user_id: The ID of the submitting user.
+        :param mapped_data: The quiz responses returned by map_form_data.
+        :param timeout: The number of seconds to wait for milestones and sources.
+        :return: An iterator of event dictionaries. "recommendation", "milestones", and "sources"
+            events carry an index into the recommendations; the last event is "done" or "error".
+        """
+        try:
+            saving_quiz = self._save_quiz(mapped_data)
+
+            recommendations = []
+            pending = {}
+            # Closing the iterator closes the model's stream when it is not read to the end
+            with closing(self.ai_service.stream_recommendations(mapped_data)) as streamed:
+                for rec in streamed:
+                    index = len(recommendations)
+                    recommendations.append(rec)
+                    yield {"event": "recommendation", "index": index, "recommendation": rec}
+
+                    reused_milestones, reused_sources = self._find_reusable(rec, mapped_data["college_year"])
+                    milestones, sources = self.ai_service.submit_details(
+                        rec["job_title"], mapped_data["college_year"], milestones=reused_milestones,
+                        sources=reused_sources, deadline=time.monotonic() + timeout,
+                    )
+                    pending[milestones] = ("milestones", index)
+                    pending[sources] = ("sources", index)
+                    if len(recommendations) == 3:
+                        break
+
+            details = [{"milestones": [], "sources": []} for _ in recommendations]
+            try:
+                for future in as_completed(pending, timeout=timeout):
+                    kind, index = pending[future]
+                    try:
+                        details[index][kind] = future.result()
+                    except Exception:
+                        logger.exception("Failed to generate %s", kind)
+                    yield {"event": kind, "index": index, kind: details[index][kind]}
+            except FutureTimeoutError:
+                logger.warning("Timed out generating milestones and sources")
+
+            with span("submission.save_quiz"):
+                saving_quiz.result()
+            with span("submission.save_bundle"):
+                recommendation_ids = self.db_service.save_recommendation_bundle([
+                    self._bundle_entry(user_id, rec, detail["milestones"], detail["sources"])
+                    for rec, detail in zip(recommendations, details)
+                ], snapshot=True)
+                self._after_save(recommendations, recommendation_ids, mapped_data["college_year"])
+            yield {"event": "done", "recommendation_ids": recommendation_ids}
+
+        except Exception as e:
+            logger.exception("Streaming submission failed")
+            yield {"event": "error", "error": f"Error processing request: {str(e)}"}
+
+    def _save_quiz(self, mapped_data):
+        """
+        Start saving the quiz responses.
+
+        :return: A future that finishes once they are saved.
+        """
+        if self.executor is not None:
+            return self.executor.submit(self.db_service.save_quiz_responses, mapped_data)
+        future = Future()
+        future.set_result(self.db_service.save_quiz_responses(mapped_data))
+        return future
+
+    def _generate_combined(self, quiz_data, college_year):
+        """
+        Generate everything with one model call.
+
+        :return: A (recommendations, details) tuple, or None if the response did not validate and
+            the separate calls should be used instead.
+        """
+        try:
+            with span("submission.combined"):
+                return self.ai_service.generate_submission(quiz_data, college_year)
+        except InvalidResponseError as e:
+            logger.warning("Combined generation failed validation, using separate calls: %s", e)
+            return None
+
+    def _find_reusable(self, rec, college_year):
+        """
+        Look up milestones and sources saved for a near-duplicate of a recommendation.
+
+        :return: A (milestones, sources) tuple; either is None when it must be generated.
+        """
+        if self.similar_careers is None:
+            return None, None
+        return self.similar_careers.find_reusable(rec["job_title"], rec.get("tags", ""), college_year)
+
+    def _after_save(self, recommendations, recommendation_ids, college_year):
+        """Index the saved recommendations for reuse and refresh the explore feed."""
+        if self.similar_careers is not None:
+            self.similar_careers.add(
+                [
+                    {"id": recommendation_id, "job_title": rec["job_title"], "tags": rec.get("tags", "")}
+                    for rec, recommendation_id in zip(recommendations, recommendation_ids)
+                ],
+                college_year=college_year,
+            )
+        if self.explore_feed is not None:
+            self.explore_feed.invalidate()
+
+    def _bundle_entry(self, user_id, rec, milestones, sources):
+        """
+        Build the rows to save for one recommendation.
+
+        :param user_id: The ID of the submitting user.
+        :param rec: A parsed recommendation.
+        :param milestones: The parsed milestones for the recommendation.
+        :param sources: The parsed learning sources for the recommendation.
+        :return: A (rec_data, milestones_data, sources_data) tuple for save_recommendation_bundle.
+        """
+        rec_data = {
+            "user_id": user_id,
+            "job_title": rec["job_title"],
+            "short_description": rec.get("short_description", ""),
+            "job_description": rec["job_description"],
+            "fit_percentage": rec["fit_percentage"],
+            "tags": rec["tags"],
+            "recommendation_reason": rec["recommendation_reason"],
+            "labels": rec["labels"],
+        }
+        milestones_data = [
+            {
+                "title": clean_text(milestone["title"]),
+                "description": clean_text(milestone["description"]),
+            }
+            for milestone in milestones
+        ]
+        sources_data = [
+            {
+                "icon": source["icon"],
+                "title": clean_text(source["title"]),
+                "description": clean_text(source["description"]),
+                "status": clean_text(source["status"]),
+            }
+            for source in sources
+        ]
+        return rec_data, milestones_data, sources_data
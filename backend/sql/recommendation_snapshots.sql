@@ -0,0 +1,22 @@
+-- Latest recommendations per user, read by /get_recommendations with one primary-key lookup.
+-- The backend replaces a user's row whenever a submission is saved; existing users are filled in
+-- with `python -m services.snapshots`. Run this in the Supabase SQL editor before deploying.
+
+create table if not exists public.recommendation_snapshots (
+    user_id uuid primary key,
+    -- Up to 3 job_recommendations rows, newest first, with the same columns as the table
+    recommendations jsonb not null,
+    updated_at timestamptz not null default now()
+);
+
+-- Only the backend reads and writes snapshots, so VITE_SUPABASE_KEY must be the service_role key,
+-- which bypasses row level security. No policies are created and the API roles get no grants, so
+-- the table is not exposed to browsers. With any other key every snapshot request fails with a
+-- permission error; the backend then reads job_recommendations directly for
+-- RECOMMENDATION_SNAPSHOT_RETRY_INTERVAL seconds at a time instead of retrying on every request.
+alter table public.recommendation_snapshots enable row level security;
+revoke all on table public.recommendation_snapshots from anon, authenticated;
+
+-- Serves the fallback for users without a snapshot and the backfill's per-user reads
+create index if not exists job_recommendations_user_id_created_at_idx
+    on public.job_recommendations (user_id, created_at desc);
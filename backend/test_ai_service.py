@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+from services.ai_service import AIService
+from services.cache import MemoryCache, SQLiteCache
+
+MILESTONES_TEXT = """Title: Join a Tech Club
+Description: Participate in a local tech club."""
+
+SOURCES_TEXT = """Icon: 🐍
+Title: Learn Python Basics
+Description: Enroll in a beginner Python course.
+Status: Not Started"""
+
+RECOMMENDATIONS_TEXT = """## Recommendation 1
+1. **Job Title:** Data Scientist
+2. **Short Description:** Turns data into decisions.
+3. **Full Job Description:** Builds statistical models and communicates findings.
+4. **Why it's recommended:** Combines your love of math and storytelling.
+5. **Fit Percentage:** 90%
+6. **Tags:** Data Science, Technology
+7. **Labels:** Analytical, Creative
+
+## Recommendation 2
+Job Title: UX Researcher
+Short Description: Studies how people use products.
+Full Job Description: Plans and runs user studies.
+Why it's recommended: You enjoy psychology and design.
+Fit Percentage: 85%
+Tags: Design, Psychology
+Labels: Empathetic, Curious
+"""
+
+
+class FakeModel:
+    """Stand-in for genai.GenerativeModel that answers by prompt type after a delay."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = 0
+        self.timeouts = []
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.timeouts.append(kwargs.get("request_options", {}).get("timeout"))
+        time.sleep(self.delay)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("upstream error")
+        text = SOURCES_TEXT if "learning resources" in prompt else MILESTONES_TEXT
+        return type("Response", (), {"text": text})()
+
+
+@pytest.fixture
+def ai_service():
+    """AIService wired to a fake model."""
+    service = AIService()
+    service.model = FakeModel(delay=0.2)
+    return service
+
+
+def test_generate_details_runs_calls_concurrently(ai_service):
+    """All six milestone/source calls should overlap instead of running back to back."""
+    recommendations = [{"job_title": f"Job {i}"} for i in range(3)]
+
+    start = time.monotonic()
+    details = ai_service.generate_details(recommendations, "Sophomore")
+    elapsed = time.monotonic() - start
+
+    assert ai_service.model.calls == 6
+    assert elapsed < 0.6
+    assert [m[0]["title"] for m, _ in details] == ["Join a Tech Club"] * 3
+    assert [s[0]["icon"] for _, s in details] == ["🐍"] * 3
+
+
+def test_generate_details_isolates_failures(ai_service):
+    """A failing call yields an empty list without affecting the other results."""
+    ai_service.model.fail_on = "Job 1"
+
+    details = ai_service.generate_details([{"job_title": "Job 0"}, {"job_title": "Job 1"}], "Senior")
+
+    assert details[0][0] and details[0][1]
+    assert details[1] == ([], [])
+
+
+def test_generate_details_times_out(ai_service):
+    """Calls that miss the deadline are abandoned rather than blocking the submission."""
+    ai_service.model.delay = 1.0
+
+    start = time.monotonic()
+    details = ai_service.generate_details([{"job_title": "Job 0"}], "Junior", timeout=0.1)
+
+    assert time.monotonic() - start < 0.5
+    assert details == [([], [])]
+
+
+def test_generate_details_passes_its_deadline_to_the_model_calls(ai_service):
+    """Each call's timeout fits the fan-out deadline, so abandoned calls stop instead of holding workers."""
+    ai_service.generate_details([{"job_title": "Job 0"}, {"job_title": "Job 1"}], "Junior", timeout=0.5)
+
+    assert len(ai_service.model.timeouts) == 4
+    assert all(0 < timeout <= 0.5 for timeout in ai_service.model.timeouts)
+
+
+def test_generate_milestones_uses_cache_for_equivalent_titles(ai_service):
+    """Titles that differ only in case, spacing, or markdown share one cached generation."""
+    ai_service.cache = MemoryCache()
+
+    first = ai_service.generate_milestones("Data Scientist", "Sophomore")
+    second = ai_service.generate_milestones("  **data   scientist** ", "sophomore")
+
+    assert first == second
+    assert ai_service.model.calls == 1
+    assert ai_service.cache.stats()["hits"] == 1
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    """Separate SQLiteCache instances on the same file see each other's entries."""
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCache(path).set("key", [{"title": "Cached"}])
+
+    assert SQLiteCache(path).get("key") == [{"title": "Cached"}]
+    assert SQLiteCache(path, ttl=0).get("missing") is None
+
+
+def test_streamed_recommendations_match_batch_parse(ai_service):
+    """Parsing a response in arbitrary chunks yields the same recommendations as parsing it whole."""
+    chunks = [RECOMMENDATIONS_TEXT[i:i + 7] for i in range(0, len(RECOMMENDATIONS_TEXT), 7)]
+
+    streamed = list(ai_service._iter_recommendations(ai_service._iter_lines(chunks), eager=True))
+
+    assert streamed == ai_service._parse_recommendations(RECOMMENDATIONS_TEXT)
+    assert [rec["job_title"] for rec in streamed] == ["Data Scientist", "UX Researcher"]
+    assert streamed[0]["labels"] == ["Analytical", "Creative"]
+
+
+class FakeStreamResponse:
+    """Stand-in for a streaming GenerateContentResponse that records whether its call was cancelled."""
+
+    def __init__(self, text):
+        self.chunks = [type("Chunk", (), {"text": line + "\n"})() for line in text.split("\n")]
+        self.cancelled = False
+        self._iterator = self
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def test_stream_is_closed_when_the_caller_stops_reading(ai_service):
+    """Closing the recommendation iterator early cancels the model's stream."""
+    response = FakeStreamResponse(RECOMMENDATIONS_TEXT)
+    ai_service.model.generate_content = lambda prompt, stream=False, **kwargs: response
+
+    streamed = ai_service.stream_recommendations({"field_of_study": "Statistics"})
+    assert next(streamed)["job_title"] == "Data Scientist"
+    assert not response.cancelled
+
+    streamed.close()
+    assert response.cancelled
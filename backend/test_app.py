@@ -1,6 +1,7 @@
 import pytest
 from app import app
-from unittest.mock import patch
+import time
+from unittest.mock import MagicMock, patch
 
 @pytest.fixture
 def client():
@@ -39,3 +40,106 @@ def test_get_action_items_missing_recommendation_id(client):
     response = client.get('/get_action_items')
     assert response.status_code == 400
     assert response.json["error"] == "recommendation_id is required"
+
+
+def test_registry_reuses_services():
+    """The registry hands out the same AIService on every call."""
+    from app import registry
+    assert registry.ai() is registry.ai()
+
+
+def test_submit_form_queues_job_and_reports_status(client):
+    """/submit_form returns 202 with a job id whose status can be polled to completion."""
+    from app import registry
+    from services.cache import MemoryCache
+    from services.jobs import JobQueue
+
+    ai_service = MagicMock()
+    ai_service.generate_recommendations.return_value = [{
+        "job_title": "Data Scientist", "job_description": "...", "fit_percentage": "90%",
+        "tags": "Data", "recommendation_reason": "...", "labels": ["Data"],
+    }]
+    ai_service.generate_details.return_value = [([], [])]
+    headers = {"Authorization": "Bearer fake_token"}
+
+    with patch("app.get_user_id_from_token", return_value="test_user_id"), \
+            patch.object(registry, "database", return_value=MagicMock()), \
+            patch.object(registry, "ai", return_value=ai_service), \
+            patch.object(registry, "jobs", return_value=JobQueue(MemoryCache())), \
+            patch.object(registry, "explore", return_value=MagicMock()), \
+            patch.object(registry, "similar_careers", return_value=None):
+        response = client.post('/submit_form', json={"collegeYear": "Junior"}, headers=headers)
+        assert response.status_code == 202
+        job_id = response.json["job_id"]
+
+        for _ in range(50):
+            status = client.get(f'/submission_status/{job_id}', headers=headers).json
+            if status["status"] == "succeeded":
+                break
+            time.sleep(0.05)
+
+    assert status["stages"] == {"recommendations": "done", "milestones": "done", "sources": "done", "saving": "done"}
+    assert status["result"]["recommendations"][0]["job_title"] == "Data Scientist"
+
+
+def test_submission_status_fails_jobs_left_running_by_a_restarted_worker(client):
+    """A job whose worker went away is reported as failed instead of running forever."""
+    from app import registry
+    from services.cache import MemoryCache
+    from services.jobs import JobQueue
+
+    jobs = JobQueue(MemoryCache(), stale_after=60)
+    job = {"id": "abc", "user_id": "test_user_id", "status": "running", "stages": {},
+           "result": None, "error": None, "created_at": time.time() - 120, "updated_at": time.time() - 120}
+    jobs.store.set("job:abc", job)
+
+    with patch("app.get_user_id_from_token", return_value="test_user_id"), \
+            patch.object(registry, "jobs", return_value=jobs):
+        status = client.get('/submission_status/abc', headers={"Authorization": "Bearer fake_token"}).json
+
+    assert status["status"] == "failed"
+    assert "submit" in status["error"]
+
+
+def test_get_action_items_supports_etag_revalidation(client):
+    """A repeat request with the returned ETag gets an empty 304."""
+    from app import registry
+    from services.cache import MemoryCache
+    from services.database import DatabaseService
+    from test_database import FakeClient, make_bundle
+
+    db_service = DatabaseService(FakeClient(), cache=MemoryCache())
+    recommendation_id = db_service.save_recommendation_bundle(make_bundle())[0]
+
+    with patch.object(registry, "database", return_value=db_service):
+        response = client.get(f'/get_action_items?recommendation_id={recommendation_id}')
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"].startswith("public")
+
+        revalidated = client.get(
+            f'/get_action_items?recommendation_id={recommendation_id}',
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.data == b""
+
+
+def test_rate_limit_response_sets_retry_after(client):
+    """A 429 reports how long until the window resets in both Retry-After and the message."""
+    from app import limiter
+
+    with patch("app.get_user_id_from_token", return_value="rate_limited_user"):
+        for _ in range(4):
+            response = client.post('/submit_form', json={}, headers={"Authorization": "Bearer fake_token"})
+    limiter.reset()
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 3601
+    assert "3 submissions per hour" in response.json["message"]
+
+
+def test_importing_the_app_defers_heavy_sdks():
+    """The Gemini and Supabase SDKs and numpy are loaded on first use, not at import."""
+    from benchmarks.bench_startup import IMPORT_SCRIPT, run_script
+
+    assert run_script(IMPORT_SCRIPT)["loaded"] == []
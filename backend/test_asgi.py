@@ -0,0 +1,93 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from app import app as flask_app
+from asgi import app
+from services.cache import MemoryCache
+from services.jobs import JobQueue
+from services.submission import SubmissionPipeline
+
+MILESTONES = [{"id": 1, "recommendation_id": 7, "title": "Join a Tech Club", "description": "..."}]
+
+
+def request(method, path, **kwargs):
+    """Send one request to the ASGI app and return the response."""
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def test_reads_are_awaited_and_match_the_flask_responses():
+    """The async route answers with the same body and ETag as the Flask view, and 304 on a match."""
+    async_db = MagicMock()
+    async_db.get_milestones = AsyncMock(return_value=MILESTONES)
+    sync_db = MagicMock()
+    sync_db.get_milestones.return_value = MILESTONES
+
+    with patch("app.registry.async_database", AsyncMock(return_value=async_db)), \
+            patch("app.registry.database", return_value=sync_db):
+        response = request("GET", "/get_career_milestones?recommendation_id=7", headers={"Origin": "http://localhost:5173"})
+        expected = flask_app.test_client().get("/get_career_milestones?recommendation_id=7")
+        cached = request("GET", "/get_career_milestones?recommendation_id=7", headers={"If-None-Match": response.headers["ETag"]})
+
+    assert response.status_code == 200
+    assert response.content == expected.data
+    assert response.headers["ETag"] == expected.headers["ETag"]
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost:5173"
+    async_db.get_milestones.assert_awaited_with("7")
+    assert cached.status_code == 304
+
+
+def test_submit_form_runs_the_pipeline_as_a_task():
+    """A submission is queued on the event loop and its status can be polled to completion."""
+    rec = {"job_title": "Data Scientist", "job_description": "...", "fit_percentage": "90%",
+           "tags": "Data", "recommendation_reason": "...", "labels": ["Data"]}
+    ai_service = MagicMock()
+    ai_service.generate_submission_async = AsyncMock(return_value=([rec], [([], [])]))
+    db_service = MagicMock()
+    db_service.save_quiz_responses = AsyncMock()
+    db_service.save_recommendation_bundle = AsyncMock(return_value=[1])
+    jobs = JobQueue(MemoryCache())
+    headers = {"Authorization": "Bearer fake_token"}
+
+    async def submit_and_poll():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+            response = await client.post("/submit_form", json={"collegeYear": "Junior"}, headers=headers)
+            for _ in range(100):
+                status = (await client.get(response.json()["status_url"], headers=headers)).json()
+                if status["status"] in ("succeeded", "failed"):
+                    return response, status
+                await asyncio.sleep(0.01)
+
+    with patch("app.get_user_id_from_token", return_value="asgi_user"), \
+            patch("app.registry.async_database", AsyncMock(return_value=db_service)), \
+            patch("app.registry.ai", return_value=ai_service), \
+            patch("app.registry.jobs", return_value=jobs), \
+            patch("app.submission_pipeline", lambda db, ai: SubmissionPipeline(db, ai, combined=True)):
+        response, status = asyncio.run(submit_and_poll())
+
+    assert response.status_code == 202
+    assert status["status"] == "succeeded"
+    assert status["result"] == {"recommendations": [rec]}
+    db_service.save_recommendation_bundle.assert_awaited_once()
+
+
+def test_submission_limit_is_shared_with_flask_and_other_routes_fall_back():
+    """Submissions through either entry point count against one allowance; /metrics is served by Flask."""
+    headers = {"Authorization": "Bearer fake_token"}
+
+    with patch("app.get_user_id_from_token", return_value="asgi_limited_user"):
+        for _ in range(2):
+            flask_app.test_client().post("/submit_form", json={}, headers=headers)
+        assert request("POST", "/submit_form", json={}, headers=headers).status_code != 429
+        limited = request("POST", "/submit_form", json={}, headers=headers)
+
+    assert limited.status_code == 429
+    assert "3 submissions per hour" in limited.json()["message"]
+    assert int(limited.headers["Retry-After"]) > 0
+
+    metrics = request("GET", "/metrics")
+    assert metrics.status_code == 200
+    assert "http_request_seconds" in metrics.text
@@ -0,0 +1,65 @@
+import json
+import time
+import urllib.parse
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from services.auth import create_token_verifier
+
+SECRET = "test-secret"
+
+
+def make_token(exp_in=3600, key=SECRET, algorithm="HS256", headers=None):
+    claims = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time() + exp_in)}
+    return jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+
+def count_decodes(verifier):
+    calls = []
+    decode = verifier._decode
+    verifier._decode = lambda token: calls.append(token) or decode(token)
+    return calls
+
+
+def test_verified_tokens_are_served_from_cache():
+    """A token is decoded once and later requests with it reuse the verified claims."""
+    verifier = create_token_verifier(SECRET)
+    calls = count_decodes(verifier)
+    header = f"Bearer {make_token()}"
+
+    assert [verifier.user_id_from_header(header) for _ in range(5)] == ["user-1"] * 5
+    assert len(calls) == 1
+
+
+def test_cached_tokens_expire_with_the_token():
+    """The cache entry lives only until the token's exp, after which the token is rejected."""
+    verifier = create_token_verifier(SECRET)
+    header = f"Bearer {make_token(exp_in=1)}"
+
+    assert verifier.user_id_from_header(header) == "user-1"
+    time.sleep(1.1)
+    with pytest.raises(ValueError, match="expired"):
+        verifier.user_id_from_header(header)
+
+
+def test_invalid_tokens_are_rejected():
+    verifier = create_token_verifier(SECRET)
+
+    with pytest.raises(ValueError, match="Invalid Authorization header"):
+        verifier.user_id_from_header("Token abc")
+    with pytest.raises(ValueError, match="Invalid token"):
+        verifier.user_id_from_header(f"Bearer {make_token(key='other-secret')}")
+
+
+def test_asymmetric_tokens_use_the_jwks():
+    """RS256 tokens are checked against the key set, which is fetched once and reused."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwks_url = "data:application/json," + urllib.parse.quote(json.dumps({"keys": [{**jwk, "kid": "k1", "use": "sig"}]}))
+    verifier = create_token_verifier(SECRET, jwks_url=jwks_url, max_entries=0)
+
+    token = make_token(key=private_key, algorithm="RS256", headers={"kid": "k1"})
+
+    assert verifier.user_id_from_header(f"Bearer {token}") == "user-1"
+    assert verifier.user_id_from_header(f"Bearer {make_token()}") == "user-1"
@@ -0,0 +1,390 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from services.async_database import AsyncDatabaseService
+from services.cache import MemoryCache
+from services.database import DatabaseService
+from services.snapshots import backfill
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST request builder."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.operation = None
+        self.payload = None
+        self.filters = []
+        self.upper_bounds = []
+        self.lower_bounds = []
+        self.ordering = None
+        self.row_limit = None
+
+    def insert(self, payload):
+        self.operation, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict, ignore_duplicates=False):
+        self.operation, self.payload = "upsert", payload
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    def select(self, columns):
+        self.operation, self.payload = "select", columns
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def lt(self, column, value):
+        self.upper_bounds.append((column, value))
+        return self
+
+    def gt(self, column, value):
+        self.lower_bounds.append((column, value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, list(values)))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, [value]))
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.operation, self.payload, self.filters))
+        if self.operation in ("insert", "upsert") and self.table in self.client.fail_tables:
+            raise RuntimeError(f"{self.operation} into {self.table} failed")
+        if self.operation == "select" and self.table in self.client.fail_reads:
+            raise RuntimeError(f"select from {self.table} failed")
+        if self.operation == "insert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            rows = [{**row, "id": self.client.next_id()} for row in rows]
+            self.client.rows.setdefault(self.table, []).extend(rows)
+        elif self.operation == "upsert":
+            existing = {row[self.on_conflict]: row for row in self.client.rows.get(self.table, [])}
+            rows = [row for row in self.payload if not (self.ignore_duplicates and row[self.on_conflict] in existing)]
+            existing.update({row[self.on_conflict]: row for row in rows})
+            self.client.rows[self.table] = list(existing.values())
+        elif self.operation == "delete":
+            kept = [
+                row for row in self.client.rows.get(self.table, [])
+                if not all(str(row.get(column)) in map(str, values) for column, values in self.filters)
+            ]
+            self.client.rows[self.table] = kept
+            rows = []
+        elif self.operation == "select":
+            rows = [
+                row for row in self.client.rows.get(self.table, [])
+                if all(str(row.get(column)) in map(str, values) for column, values in self.filters)
+                and all(row[column] < type(row[column])(value) for column, value in self.upper_bounds)
+                and all(row[column] > type(row[column])(value) for column, value in self.lower_bounds)
+            ]
+            if self.ordering:
+                column, desc = self.ordering
+                rows.sort(key=lambda row: row.get(column) or 0, reverse=desc)
+            rows = rows[:self.row_limit][:self.client.max_rows]
+        else:
+            rows = []
+        return type("Response", (), {"data": rows})()
+
+
+class FakeClient:
+    """Records every request made through from_(). max_rows caps selects like PostgREST's max-rows setting."""
+
+    def __init__(self, fail_tables=(), fail_reads=(), max_rows=None):
+        self.calls = []
+        self.rows = {}
+        self.fail_tables = set(fail_tables)
+        self.fail_reads = set(fail_reads)
+        self.max_rows = max_rows
+        self._id = 0
+
+    def next_id(self):
+        self._id += 1
+        return self._id
+
+    def from_(self, table):
+        return FakeQuery(self, table)
+
+
+class AsyncFakeQuery(FakeQuery):
+    """FakeQuery whose execute is a coroutine, like the async PostgREST client's."""
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        return super().execute()
+
+
+class AsyncFakeClient(FakeClient):
+    """FakeClient for AsyncDatabaseService."""
+
+    def from_(self, table):
+        return AsyncFakeQuery(self, table)
+
+
+def make_bundle():
+    return [
+        (
+            {"job_title": f"Job {i}"},
+            [{"title": f"Milestone {i}.{j}", "description": "..."} for j in range(5)],
+            [{"icon": "🐍", "title": f"Source {i}.{j}", "description": "...", "status": "Not Started"} for j in range(3)],
+        )
+        for i in range(3)
+    ]
+
+
+def test_save_recommendation_bundle_uses_three_requests():
+    """One insert per table, with children linked to the ids returned in input order."""
+    client = FakeClient()
+
+    ids = DatabaseService(client).save_recommendation_bundle(make_bundle())
+
+    assert ids == [1, 2, 3]
+    assert [(table, op) for table, op, _, _ in client.calls] == [
+        ("job_recommendations", "insert"),
+        ("milestones", "insert"),
+        ("sources", "insert"),
+    ]
+    milestones = client.calls[1][2]
+    assert len(milestones) == 15
+    assert [m["recommendation_id"] for m in milestones[::5]] == [1, 2, 3]
+
+
+def test_save_recommendation_bundle_cleans_up_on_failure():
+    """A failed child insert deletes the rows already written for the bundle."""
+    client = FakeClient(fail_tables={"sources"})
+
+    with pytest.raises(RuntimeError):
+        DatabaseService(client).save_recommendation_bundle(make_bundle())
+
+    deletes = [(table, filters) for table, op, _, filters in client.calls if op == "delete"]
+    assert ("job_recommendations", [("id", [1, 2, 3])]) in deletes
+    assert ("milestones", [("recommendation_id", [1, 2, 3])]) in deletes
+
+
+def test_failed_cleanup_still_raises_the_insert_error():
+    """An error while deleting the partial bundle is logged, not raised in place of the insert error."""
+    client = FakeClient(fail_tables={"sources"})
+    db_service = DatabaseService(client)
+    db_service.delete_recommendations = MagicMock(side_effect=ConnectionError("connection reset"))
+
+    with pytest.raises(RuntimeError, match="insert into sources failed"):
+        db_service.save_recommendation_bundle(make_bundle())
+    db_service.delete_recommendations.assert_called_once_with([1, 2, 3])
+
+
+def test_async_service_runs_the_same_operations():
+    """AsyncDatabaseService awaits DatabaseService's queries, including the cleanup of a failed bundle."""
+    client = AsyncFakeClient(fail_tables={"sources"})
+    db_service = AsyncDatabaseService(client, cache=MemoryCache(), max_in_flight=2)
+
+    with pytest.raises(RuntimeError, match="insert into sources failed"):
+        asyncio.run(db_service.save_recommendation_bundle(make_bundle()))
+    assert client.rows["job_recommendations"] == []
+
+    client.fail_tables.clear()
+    ids = asyncio.run(db_service.save_recommendation_bundle(make_user_bundle("user"), snapshot=True))
+    recommendations = asyncio.run(db_service.get_recommendations("user"))
+
+    assert [rec["id"] for rec in recommendations] == ids
+    assert len(asyncio.run(db_service.get_milestones(ids[0]))) == 5
+
+
+def test_sources_are_served_from_cache_after_write_through():
+    """Sources saved with a bundle are cached; milestones, which users edit, are always read."""
+    client = FakeClient()
+    db_service = DatabaseService(client, cache=MemoryCache())
+
+    ids = db_service.save_recommendation_bundle(make_bundle())
+    calls_after_save = len(client.calls)
+
+    assert len(db_service.get_sources(ids[2])) == 3
+    assert len(client.calls) == calls_after_save
+    assert len(db_service.get_milestones(ids[0])) == 5
+    assert len(db_service.get_milestones(ids[0])) == 5
+    assert [table for table, _, _, _ in client.calls[calls_after_save:]] == ["milestones", "milestones"]
+
+
+def test_child_reads_populate_cache_on_miss():
+    """A cache miss queries once and later reads are served from memory."""
+    client = FakeClient()
+    DatabaseService(client).save_recommendation_bundle(make_bundle())
+    db_service = DatabaseService(client, cache=MemoryCache())
+
+    first = db_service.get_sources("1")
+    second = db_service.get_sources("1")
+
+    assert first == second and len(first) == 3
+    assert [op for _, op, _, _ in client.calls].count("select") == 1
+
+
+def test_get_career_bundle_embeds_children_and_warms_cache():
+    """The bundle is one embedded select, and its sources then serve the per-career reads."""
+    client = FakeClient()
+    client.rows["job_recommendations"] = [{
+        "id": 7, "user_id": "user",
+        "milestones": [{"id": 1, "recommendation_id": 7, "title": "Apply"}],
+        "sources": [{"id": 2, "recommendation_id": 7, "title": "Read"}],
+    }]
+    db_service = DatabaseService(client, cache=MemoryCache())
+
+    bundle = db_service.get_career_bundle("user")
+
+    assert client.calls == [("job_recommendations", "select", "*, milestones(*), sources(*)", [("user_id", ["user"])])]
+    assert bundle[0]["milestones"][0]["title"] == "Apply"
+    assert db_service.get_sources(7) == bundle[0]["sources"]
+    assert len(client.calls) == 1
+
+
+def make_user_bundle(user_id):
+    return [({**rec_data, "user_id": user_id}, milestones, sources) for rec_data, milestones, sources in make_bundle()]
+
+
+def test_saved_bundle_becomes_the_users_snapshot():
+    """A submission writes the snapshot, so a worker with a cold cache reads it with one lookup."""
+    client = FakeClient()
+    DatabaseService(client, cache=MemoryCache()).save_recommendation_bundle(make_user_bundle("user"), snapshot=True)
+    assert [(table, op) for table, op, _, _ in client.calls][-1] == ("recommendation_snapshots", "upsert")
+
+    db_service = DatabaseService(client, cache=MemoryCache())
+    calls_before = len(client.calls)
+    recommendations = db_service.get_recommendations("user")
+    db_service.get_recommendations("user")
+
+    assert [rec["job_title"] for rec in recommendations] == ["Job 0", "Job 1", "Job 2"]
+    assert client.calls[calls_before:] == [("recommendation_snapshots", "select", "recommendations", [("user_id", ["user"])])]
+
+
+def test_missing_snapshot_is_written_on_first_read():
+    """Users without a snapshot are read from job_recommendations once, then from their snapshot."""
+    client = FakeClient()
+    client.rows["job_recommendations"] = [
+        {"id": i, "user_id": "user", "job_title": f"Job {i}", "created_at": f"2024-01-0{i}"} for i in range(1, 6)
+    ]
+
+    first = DatabaseService(client).get_recommendations("user")
+    second = DatabaseService(client).get_recommendations("user")
+
+    assert [rec["id"] for rec in first] == [5, 4, 3]
+    assert second == first
+    assert [(table, op) for table, op, _, _ in client.calls] == [
+        ("recommendation_snapshots", "select"),
+        ("job_recommendations", "select"),
+        ("recommendation_snapshots", "upsert"),
+        ("recommendation_snapshots", "select"),
+    ]
+
+
+def test_failed_snapshot_read_falls_back_to_job_recommendations():
+    """An unreadable snapshot table, e.g. before its migration is applied, does not fail the read."""
+    client = FakeClient(fail_reads={"recommendation_snapshots"})
+    client.rows["job_recommendations"] = [
+        {"id": i, "user_id": "user", "job_title": f"Job {i}", "created_at": f"2024-01-0{i}"} for i in range(1, 6)
+    ]
+
+    db_service = DatabaseService(client)
+    recommendations = db_service.get_recommendations("user", limit=2)
+    db_service.get_recommendations("user", limit=2)
+
+    assert [rec["id"] for rec in recommendations] == [5, 4]
+    assert [(table, op) for table, op, _, _ in client.calls] == [
+        ("recommendation_snapshots", "select"),
+        ("job_recommendations", "select"),
+        ("job_recommendations", "select"),
+    ]
+
+
+def test_unwritable_snapshot_table_is_skipped_after_the_first_failure():
+    """A key without access to the table, which reads nothing and cannot write, costs one failed upsert."""
+    client = FakeClient(fail_tables={"recommendation_snapshots"})
+    client.rows["job_recommendations"] = [
+        {"id": i, "user_id": "user", "job_title": f"Job {i}", "created_at": f"2024-01-0{i}"} for i in range(1, 6)
+    ]
+
+    db_service = DatabaseService(client)
+    first = db_service.get_recommendations("user")
+    second = db_service.get_recommendations("user")
+
+    assert [rec["id"] for rec in first] == [rec["id"] for rec in second] == [5, 4, 3]
+    assert [(table, op) for table, op, _, _ in client.calls] == [
+        ("recommendation_snapshots", "select"),
+        ("job_recommendations", "select"),
+        ("recommendation_snapshots", "upsert"),
+        ("job_recommendations", "select"),
+    ]
+
+
+def test_user_without_recommendations_gets_an_empty_snapshot():
+    """Users who never submitted are read from their snapshot too, rather than missing on every request."""
+    client = FakeClient()
+    assert DatabaseService(client).get_recommendations("user") == []
+
+    db_service = DatabaseService(client, cache=MemoryCache())
+    calls_before = len(client.calls)
+    assert db_service.get_recommendations("user") == []
+    assert db_service.get_recommendations("user") == []
+
+    assert client.rows["recommendation_snapshots"][0]["recommendations"] == []
+    assert client.calls[calls_before:] == [("recommendation_snapshots", "select", "recommendations", [("user_id", ["user"])])]
+
+
+def test_failed_snapshot_save_deletes_the_stale_snapshot():
+    """If the new snapshot cannot be saved, the old one is removed rather than served."""
+    client = FakeClient()
+    client.rows["recommendation_snapshots"] = [{"user_id": "user", "recommendations": [{"id": 99}]}]
+    client.fail_tables.add("recommendation_snapshots")
+
+    ids = DatabaseService(client).save_recommendation_bundle(make_user_bundle("user"), snapshot=True)
+
+    assert ids == [1, 2, 3]
+    assert client.rows["recommendation_snapshots"] == []
+
+
+def test_backfill_adds_missing_snapshots_in_batches():
+    client = FakeClient()
+    client.rows["quiz_responses"] = [{"user_id": f"user-{i}"} for i in range(6)]
+    client.rows["job_recommendations"] = [
+        {"id": i, "user_id": f"user-{i % 5}", "job_title": f"Job {i}", "created_at": f"2024-01-{i + 1:02d}"}
+        for i in range(20)
+    ]
+    client.rows["recommendation_snapshots"] = [{"user_id": "user-0", "recommendations": [{"id": 99}]}]
+
+    assert backfill(DatabaseService(client), batch_size=2) == 6
+
+    snapshots = {row["user_id"]: row["recommendations"] for row in client.rows["recommendation_snapshots"]}
+    assert snapshots["user-0"] == [{"id": 99}]
+    assert [rec["id"] for rec in snapshots["user-3"]] == [18, 13, 8]
+    assert snapshots["user-5"] == []
+    assert [op for table, op, _, _ in client.calls if table == "recommendation_snapshots"] == ["upsert"] * 3
+
+
+def test_backfill_is_not_truncated_by_the_servers_row_cap():
+    """Users with a long history still get full snapshots when a select returns at most a few rows."""
+    client = FakeClient(max_rows=4)
+    client.rows["quiz_responses"] = [{"user_id": f"user-{i}"} for i in range(3)]
+    client.rows["job_recommendations"] = [
+        {"id": i, "user_id": f"user-{i % 3}", "job_title": f"Job {i}", "created_at": f"2024-01-{i + 1:02d}"}
+        for i in range(30)
+    ]
+
+    backfill(DatabaseService(client), batch_size=3)
+
+    snapshots = {row["user_id"]: row["recommendations"] for row in client.rows["recommendation_snapshots"]}
+    assert {user_id: [rec["id"] for rec in rows] for user_id, rows in snapshots.items()} == {
+        "user-0": [27, 24, 21],
+        "user-1": [28, 25, 22],
+        "user-2": [29, 26, 23],
+    }
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from services.cache import MemoryCache, SQLiteCache
+from services.explore import ExploreFeed
+from test_database import FakeClient
+
+
+@pytest.fixture
+def client():
+    client = FakeClient()
+    client.rows["job_recommendations"] = [
+        {"id": i, "job_title": f"Job {i}", "tags": "tag"} for i in range(1, 26)
+    ]
+    return client
+
+
+def selects(client):
+    return [call for call in client.calls if call[1] == "select"]
+
+
+def wait_for_prefetch(feed):
+    deadline = time.time() + 2
+    while feed._prefetching and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_pages_follow_the_cursor_newest_first(client):
+    """Each page starts below the previous cursor, and the last page returns no cursor."""
+    feed = ExploreFeed(client)
+
+    pages = [feed.get_page(limit=10)]
+    while pages[-1]["cursor"] is not None:
+        pages.append(feed.get_page(cursor=pages[-1]["cursor"], limit=10))
+
+    ids = [rec["id"] for page in pages for rec in page["data"]]
+    assert ids == list(range(25, 0, -1))
+
+
+def test_next_page_is_prefetched_and_served_from_cache(client):
+    """Serving a full page loads the next one in the background, so following the cursor needs no request."""
+    feed = ExploreFeed(client, cache=MemoryCache())
+
+    first = feed.get_page(limit=10)
+    wait_for_prefetch(feed)
+    requests_before = len(selects(client))
+    second = feed.get_page(cursor=first["cursor"], limit=10)
+
+    assert [rec["id"] for rec in second["data"]] == list(range(15, 5, -1))
+    assert len(selects(client)) == requests_before
+
+
+def test_invalidate_refreshes_only_the_first_page(client):
+    """New recommendations show up on the first page straight away, while cursor pages stay cached."""
+    feed = ExploreFeed(client, cache=MemoryCache())
+    first = feed.get_page(limit=10)
+    wait_for_prefetch(feed)
+
+    client.rows["job_recommendations"].append({"id": 26, "job_title": "Job 26", "tags": "tag"})
+    assert feed.get_page(limit=10) == first
+    feed.invalidate()
+
+    assert feed.get_page(limit=10)["data"][0]["id"] == 26
+    wait_for_prefetch(feed)
+    requests_before = len(selects(client))
+    feed.get_page(cursor=first["cursor"], limit=10)
+    assert len(selects(client)) == requests_before
+
+
+def test_invalidate_reaches_feeds_sharing_the_cache(client, tmp_path):
+    """A submission saved by one worker refreshes the first page served by another."""
+    cache_path = str(tmp_path / "explore.sqlite3")
+    saving_worker = ExploreFeed(client, cache=SQLiteCache(cache_path))
+    serving_worker = ExploreFeed(client, cache=SQLiteCache(cache_path))
+    serving_worker.get_page(limit=10)
+
+    client.rows["job_recommendations"].append({"id": 26, "job_title": "Job 26", "tags": "tag"})
+    saving_worker.invalidate()
+
+    assert serving_worker.get_page(limit=10)["data"][0]["id"] == 26
+
+
+def test_summary_fields_and_limits(client):
+    """The summary projection drops long text columns, the limit is clamped, and unknown fields are rejected."""
+    feed = ExploreFeed(client, max_limit=5)
+
+    page = feed.get_page(limit=100, fields="summary")
+
+    assert len(page["data"]) == 5
+    assert "job_description" not in selects(client)[-1][2]
+    with pytest.raises(ValueError):
+        feed.get_page(fields="everything")
@@ -0,0 +1,24 @@
+from benchmarks.load_test import LoadTest
+
+
+def test_submission_request_budget():
+    """Guards against extra per-row round trips creeping into the submission pipeline."""
+    with LoadTest(users=5) as load_test:
+        report = load_test.run("submit_form", requests=4, concurrency=2)
+
+    assert report["errors"] == 0 and report["job_failures"] == 0
+    # Quiz upsert, three bundle inserts, the snapshot upsert, and at most one similarity index load
+    assert report["db_calls_per_request"] <= 6
+    # One recommendations call, then milestones and sources for each of the three careers
+    assert report["llm_calls_per_request"] <= 7
+
+
+def test_read_endpoint_request_budgets():
+    # The explore feed may also prefetch the page after each one it fetches. It runs last, since a
+    # prefetch still in flight when its scenario ends would be counted against the next one.
+    budgets = {"get_recommendations": 1, "get_career_milestones": 1, "get_action_items": 1, "explore_recommendations": 2}
+    with LoadTest(users=5) as load_test:
+        for scenario, budget in budgets.items():
+            report = load_test.run(scenario, requests=10, concurrency=2)
+            assert report["errors"] == 0, scenario
+            assert report["db_calls_per_request"] <= budget, scenario
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from services import metrics
+from services.ai_service import AIService, AI_REQUEST_SECONDS, AI_TOKENS
+from services.database import DatabaseService, DB_REQUEST_SECONDS, DB_ROWS
+from test_database import FakeClient, make_bundle
+
+
+def test_render_uses_prometheus_text_format():
+    """Counters get a _total suffix and histograms cumulative buckets, a sum and a count."""
+    registry = metrics.MetricsRegistry()
+    registry.counter("widgets", "Widgets made.", ["color"]).inc(2, color='bl"ue')
+    histogram = registry.histogram("work_seconds", "Work time.", ["stage"], buckets=(0.1, 1))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE widgets_total counter" in lines
+    assert 'widgets_total{color="bl\\"ue"} 2' in lines
+    assert "# TYPE work_seconds histogram" in lines
+    assert 'work_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'work_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'work_seconds_bucket{stage="a",le="+Inf"} 2' in lines
+    assert 'work_seconds_count{stage="a"} 2' in lines
+
+
+def test_spans_are_collected_by_the_current_trace():
+    """Spans recorded inside a trace are listed in order, and outside one only feed the histogram."""
+    with metrics.trace() as current:
+        with metrics.span("outer"):
+            with metrics.span("inner", rows=3):
+                pass
+    with metrics.span("untraced"):
+        pass
+
+    assert [span["name"] for span in current.to_dict()] == ["inner", "outer"]
+    assert current.to_dict()[0]["rows"] == 3
+    assert metrics.SPAN_SECONDS.count(name="untraced") >= 1
+
+
+def test_database_requests_are_timed_per_table_and_operation():
+    """Every Supabase request is observed with its table, operation and row count."""
+    before = DB_REQUEST_SECONDS.count(table="milestones", operation="insert", outcome="ok")
+    rows_before = DB_ROWS.value(table="milestones", operation="insert")
+
+    DatabaseService(FakeClient()).save_recommendation_bundle(make_bundle())
+
+    assert DB_REQUEST_SECONDS.count(table="milestones", operation="insert", outcome="ok") == before + 1
+    assert DB_ROWS.value(table="milestones", operation="insert") == rows_before + 15
+
+
+def test_model_calls_record_latency_and_tokens():
+    """Model calls are timed by prompt type and outcome, and reported token usage is counted."""
+    usage = type("Usage", (), {"prompt_token_count": 120, "candidates_token_count": 80})()
+    response = type("Response", (), {"text": "Icon: 🐍\nTitle: T\nDescription: D\nStatus: Not Started", "usage_metadata": usage})()
+
+    class Model:
+        def generate_content(self, prompt, **kwargs):
+            if "Broken" in prompt:
+                raise RuntimeError("upstream error")
+            return response
+
+    service = AIService()
+    service.model = Model()
+    before = AI_REQUEST_SECONDS.count(prompt_type="sources", outcome="ok")
+    errors_before = AI_REQUEST_SECONDS.count(prompt_type="sources", outcome="error")
+    tokens_before = AI_TOKENS.value(prompt_type="sources", kind="output")
+
+    service.generate_sources("Metrics Engineer")
+    try:
+        service.generate_sources("Broken Engineer")
+    except RuntimeError:
+        pass
+
+    assert AI_REQUEST_SECONDS.count(prompt_type="sources", outcome="ok") == before + 1
+    assert AI_REQUEST_SECONDS.count(prompt_type="sources", outcome="error") == errors_before + 1
+    assert AI_TOKENS.value(prompt_type="sources", kind="output") == tokens_before + 80
+
+
+def test_metrics_endpoint_exposes_request_latency():
+    """/metrics serves the text format, including the latency of earlier requests."""
+    from app import app
+
+    client = app.test_client()
+    client.get('/get_action_items')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert 'http_request_seconds_count{endpoint="/get_action_items",method="GET",status="400"}' in response.get_data(as_text=True)
+
+
+def test_metrics_endpoint_requires_token_when_configured():
+    from app import app
+
+    with patch("app.METRICS_TOKEN", "scrape-secret"):
+        client = app.test_client()
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+from services import parsing
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "recorded_responses.json")
+with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+    CORPUS = json.load(corpus_file)
+
+PARSERS = {
+    "recommendations": parsing.parse_recommendations,
+    "milestones": parsing.parse_milestones,
+    "sources": parsing.parse_sources,
+}
+
+
+@pytest.mark.parametrize("entry", CORPUS, ids=[f"{entry['type']}-{i}" for i, entry in enumerate(CORPUS)])
+def test_parser_matches_recorded_output(entry):
+    """The compiled parsers reproduce the output recorded from the original regex parsers."""
+    assert PARSERS[entry["type"]](entry["text"]) == entry["expected"]
+
+
+def test_structured_response_takes_fast_path():
+    """A JSON-mode response is parsed directly into the same shape as the text parser's output."""
+    text = json.dumps([{
+        "job_title": " Data Scientist ", "short_description": "Turns data into decisions.",
+        "job_description": "Builds models.", "recommendation_reason": "Math and storytelling.",
+        "fit_percentage": 90, "tags": "Data Science, Technology", "labels": [" Analytical", "Creative "],
+    }])
+
+    assert parsing.parse_recommendations(text) == [{
+        "job_title": "Data Scientist", "short_description": "Turns data into decisions.",
+        "job_description": "Builds models.", "recommendation_reason": "Math and storytelling.",
+        "fit_percentage": "90", "tags": "Data Science, Technology", "labels": ["Analytical", "Creative"],
+    }]
+
+
+def test_invalid_json_falls_back_to_text_parser():
+    """Text that merely looks like JSON is handed to the line parser."""
+    assert parsing.parse_milestones("[Step 1]\nTitle: Apply\nDescription: Send it.") == [
+        {"title": "Apply", "description": "Send it."}
+    ]
+
+
+def combined_document(milestone_count=5):
+    recommendation = {
+        "job_title": "Data Scientist", "short_description": "Models data.", "job_description": "...",
+        "recommendation_reason": "...", "fit_percentage": "90%", "tags": "Data", "labels": "Analytical, Curious",
+        "milestones": [{"title": f"Step {i}", "description": "..."} for i in range(milestone_count)],
+        "sources": [{"icon": "📘", "title": f"Source {i}", "description": "...", "status": "Not Started"} for i in range(3)],
+    }
+    return json.dumps({"recommendations": [recommendation] * 3})
+
+
+def test_combined_response_is_split_into_recommendations_and_details():
+    recommendations, details = parsing.parse_combined(combined_document())
+
+    assert len(recommendations) == 3 and "milestones" not in recommendations[0]
+    assert recommendations[0]["labels"] == ["Analytical", "Curious"]
+    assert [(len(milestones), len(sources)) for milestones, sources in details] == [(5, 3)] * 3
+
+
+def test_combined_response_with_wrong_counts_is_rejected():
+    with pytest.raises(parsing.InvalidResponseError):
+        parsing.parse_combined(combined_document(milestone_count=4))
+    with pytest.raises(parsing.InvalidResponseError):
+        parsing.parse_combined("## Recommendation 1\nJob Title: Data Scientist")
@@ -0,0 +1,31 @@
+from services.prompt_budget import estimate_tokens, format_quiz_data
+from utils import map_form_data
+
+
+def test_only_filled_in_quiz_answers_are_sent():
+    row = {
+        **map_form_data({"collegeYear": "Junior", "fieldOfStudy": "  Computer\n Science ", "topHobbies": ""}, "user"),
+        "id": 12,
+        "created_at": "2024-11-30T12:00:00+00:00",
+    }
+
+    assert format_quiz_data(row, budget=800, field_budget=200) == "college_year: Junior\nfield_of_study: Computer Science"
+
+
+def test_long_answers_are_cut_to_fit_the_budget():
+    quiz_data = {
+        "college_year": "Junior",
+        "career_priorities": "Impact and growth",
+        "unconventional_aspect": "I like puzzles " * 100,
+        "final_thoughts": "I want to work somewhere I can keep learning " * 100,
+    }
+
+    text = format_quiz_data(quiz_data, budget=100, field_budget=60)
+    lines = dict(line.split(": ", 1) for line in text.split("\n"))
+
+    assert estimate_tokens(text) <= 100
+    # Short answers are kept whole; the long ones share what is left
+    assert lines["college_year"] == "Junior"
+    assert lines["career_priorities"] == "Impact and growth"
+    assert lines["final_thoughts"].startswith("I want to work somewhere") and lines["final_thoughts"].endswith("…")
+    assert abs(len(lines["final_thoughts"]) - len(lines["unconventional_aspect"])) <= 10
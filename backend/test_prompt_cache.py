@@ -0,0 +1,77 @@
+import sqlite3
+import pytest
+from services.ai_service import AIService
+from services.cache import SQLiteCache
+from services.prompt_cache import create_prompt_cache, ReplayMissError
+from test_ai_service import FakeModel, RECOMMENDATIONS_TEXT
+
+QUIZ = {"user_id": "user", "college_year": "Junior", "top_hobbies": "Math"}
+
+
+class RecommendationsModel(FakeModel):
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self.lock:
+            self.calls += 1
+        if stream:
+            return [type("Chunk", (), {"text": line + "\n"})() for line in RECOMMENDATIONS_TEXT.split("\n")]
+        return type("Response", (), {"text": RECOMMENDATIONS_TEXT})()
+
+
+class OfflineModel:
+    def generate_content(self, *args, **kwargs):
+        raise AssertionError("replay mode must not call the model")
+
+
+def make_service(mode, path, model):
+    service = AIService(prompt_cache=create_prompt_cache(mode, str(path)))
+    service.model = model
+    return service
+
+
+def test_identical_prompts_call_the_model_once(tmp_path):
+    service = make_service("cache", tmp_path / "prompts.sqlite3", RecommendationsModel())
+
+    first = service.generate_recommendations(QUIZ)
+    second = service.generate_recommendations(dict(QUIZ))
+
+    assert first == second and len(first) == 2
+    assert service.model.calls == 1
+
+
+def test_replay_serves_recorded_responses_offline(tmp_path):
+    """Responses recorded by one process, streamed or not, are replayed by another without the model."""
+    path = tmp_path / "prompts.sqlite3"
+    recorder = make_service("record", path, RecommendationsModel())
+    expected = recorder.generate_recommendations(QUIZ)
+    list(recorder.stream_recommendations({**QUIZ, "top_hobbies": "Art"}))
+
+    replayer = make_service("replay", path, OfflineModel())
+
+    assert replayer.generate_recommendations(QUIZ) == expected
+    assert [rec["job_title"] for rec in replayer.stream_recommendations({**QUIZ, "top_hobbies": "Art"})] == [
+        "Data Scientist", "UX Researcher",
+    ]
+    with pytest.raises(ReplayMissError):
+        replayer.generate_recommendations({**QUIZ, "top_hobbies": "Music"})
+
+
+def test_sqlite_cache_evicts_beyond_max_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    for i in range(5):
+        cache.set(f"key{i}", i, ttl=100 + i)
+
+    cache.evict()
+
+    assert [cache.get(f"key{i}") for i in range(5)] == [None, None, 2, 3, 4]
+
+
+def test_sqlite_cache_deletes_expired_rows_without_max_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path)
+    cache.set("old", 1, ttl=-1)
+    for i in range(SQLiteCache.EVICT_EVERY):
+        cache.set(f"key{i}", i)
+
+    with sqlite3.connect(path) as conn:
+        (rows,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+    assert rows == SQLiteCache.EVICT_EVERY
@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from services.rate_limit import SQLiteStorage
+
+
+def test_sqlite_storage_is_shared_between_instances(tmp_path):
+    """Counters written through one storage instance are seen by another on the same file."""
+    uri = f"sqlite:///{tmp_path / 'limits.sqlite3'}"
+    first, second = storage_from_string(uri), storage_from_string(uri)
+    limit = parse("3 per hour")
+
+    assert isinstance(first, SQLiteStorage)
+    assert FixedWindowRateLimiter(first).hit(limit, "user:1")
+    assert FixedWindowRateLimiter(second).hit(limit, "user:1")
+    assert FixedWindowRateLimiter(first).hit(limit, "user:1")
+    assert not FixedWindowRateLimiter(second).hit(limit, "user:1")
+    assert FixedWindowRateLimiter(second).hit(limit, "user:2")
+
+
+def test_sqlite_storage_counts_concurrent_hits_exactly(tmp_path):
+    storage = storage_from_string(f"sqlite:///{tmp_path / 'limits.sqlite3'}")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: storage.incr("key", 60), range(200)))
+
+    assert storage.get("key") == 200
+
+
+def test_sqlite_storage_starts_a_new_window_after_expiry(tmp_path):
+    storage = storage_from_string(f"sqlite:///{tmp_path / 'limits.sqlite3'}")
+
+    storage.incr("key", 1, amount=5)
+    assert storage.get_expiry("key") >= int(time.time())
+    time.sleep(1.1)
+
+    assert storage.get("key") == 0
+    assert storage.incr("key", 60) == 1
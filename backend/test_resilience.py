@@ -0,0 +1,137 @@
+import pytest
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
+
+from benchmarks.fake_genai import FakeGenerativeModel
+from services.ai_service import AIService
+from services.resilience import CircuitBreaker, CircuitOpenError, ModelCaller, backoff_delay, is_transient
+
+SOURCES_TEXT = """Icon: 🐍
+Title: Learn Python Basics
+Description: Enroll in a beginner Python course.
+Status: Not Started"""
+
+
+class FlakyModel:
+    """Fails its first `failures` calls with the given error, then answers."""
+
+    def __init__(self, failures=0, error=ServiceUnavailable("unavailable")):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.timeouts = []
+
+    def generate_content(self, prompt, request_options=None, **kwargs):
+        self.calls += 1
+        self.timeouts.append(request_options["timeout"])
+        if self.calls <= self.failures:
+            raise self.error
+        return type("Response", (), {"text": SOURCES_TEXT})()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_service(primary, fallback=None, **caller_options):
+    clock = FakeClock()
+    caller = ModelCaller(sleep=clock.sleep, clock=clock, **caller_options)
+    service = AIService(fallback_model_name=None, caller=caller)
+    service.model = primary
+    if fallback is not None:
+        service.fallback_model_name, service.fallback_model = "fallback", fallback
+    return service, clock
+
+
+def test_transient_errors_are_classified_by_status():
+    assert is_transient(ServiceUnavailable("x"))
+    assert is_transient(TimeoutError())
+    assert not is_transient(InvalidArgument("x"))
+    assert not is_transient(ValueError("blocked"))
+
+
+def test_backoff_is_capped_and_jittered():
+    delays = [backoff_delay(attempt, 0.5, 4) for attempt in range(1, 8) for _ in range(20)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_transient_failures_are_retried():
+    """A 503 followed by a success costs one retry, not a failed submission."""
+    service, _ = make_service(FlakyModel(failures=2))
+
+    assert service.generate_sources("Retry Engineer")[0]["icon"] == "🐍"
+    assert service.model.calls == 3
+
+
+def test_invalid_requests_are_not_retried():
+    service, _ = make_service(FlakyModel(failures=5, error=InvalidArgument("bad prompt")))
+
+    with pytest.raises(InvalidArgument):
+        service.generate_sources("Invalid Engineer")
+    assert service.model.calls == 1
+
+
+def test_fallback_model_answers_when_primary_is_exhausted():
+    fallback = FlakyModel()
+    service, _ = make_service(FlakyModel(failures=10), fallback=fallback, max_attempts=2)
+
+    assert service.generate_sources("Fallback Engineer")[0]["title"] == "Learn Python Basics"
+    assert service.model.calls == 2
+    assert fallback.calls == 1
+
+
+def test_attempts_share_the_call_deadline():
+    """Each attempt's timeout shrinks to what is left of the deadline, and no attempt starts after it."""
+    service, clock = make_service(FlakyModel(failures=10), max_attempts=10, deadline=5, call_timeout=4, base_delay=1)
+
+    with pytest.raises(ServiceUnavailable):
+        service.generate_sources("Deadline Engineer")
+    assert service.model.timeouts[0] == 4
+    assert all(timeout <= 5 for timeout in service.model.timeouts)
+    assert clock.now < 5
+
+
+def test_open_circuit_fails_fast_until_reset():
+    primary = FlakyModel(failures=3)
+    service, clock = make_service(primary, max_attempts=1, failure_threshold=3, reset_timeout=30)
+
+    for index in range(3):
+        with pytest.raises(ServiceUnavailable):
+            service.generate_sources(f"Circuit Engineer {index}")
+    with pytest.raises(CircuitOpenError):
+        service.generate_sources("Circuit Engineer 3")
+    assert primary.calls == 3
+
+    clock.now += 30
+    assert service.generate_sources("Circuit Engineer 4")
+    assert service.caller.breaker(service.model_name).state == "closed"
+
+
+def test_half_open_circuit_allows_one_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_streamed_recommendations_retry_before_the_first_chunk():
+    """A stream that fails before its first chunk is retried on the fake Gemini model."""
+    model = FakeGenerativeModel(error_rate=1.0, seed=1)
+    service, _ = make_service(model, fallback=FakeGenerativeModel(seed=1))
+
+    recommendations = list(service.stream_recommendations({"field_of_study": "Biology"}))
+
+    assert recommendations
+    assert model.errors == 3
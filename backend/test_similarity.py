@@ -0,0 +1,100 @@
+from services.ai_service import AIService
+from services.cache import MemoryCache
+from services.database import DatabaseService
+from services.similarity import SimilarCareers, SimilarityIndex
+from test_ai_service import FakeModel
+from test_database import FakeClient
+
+
+def make_careers():
+    client = FakeClient()
+    client.rows["job_recommendations"] = [
+        {"id": 1, "job_title": "Healthcare Data Scientist", "tags": "Data, Technology"},
+        {"id": 2, "job_title": "Product Manager", "tags": "Business"},
+        {"id": 3, "job_title": "Biologist", "tags": "Science"},
+        {"id": 4, "job_title": "Data Analyst", "tags": "Data"},
+    ]
+    client.rows["sources"] = [
+        {"id": 10, "recommendation_id": 1, "icon": "🐍", "title": "Learn Python", "description": "...", "status": "Completed"},
+    ]
+    client.rows["milestones"] = [
+        {"id": 20, "recommendation_id": 1, "title": "Build a model", "description": "...", "updates": "done"},
+    ]
+    db_service = DatabaseService(client, cache=MemoryCache())
+    careers = SimilarCareers(db_service)
+    careers.refresh()
+    return client, db_service, careers
+
+
+def test_near_duplicate_titles_match_and_distinct_ones_do_not():
+    _, _, careers = make_careers()
+
+    assert careers.match("Healthcare Data Scientist", "Data, Healthcare")["id"] == 1
+    assert careers.match("Data Scientist (Healthcare)")["id"] == 1
+    assert careers.match("Project Manager") is None
+
+
+def test_titles_that_add_a_qualifier_are_different_careers():
+    """These score above the threshold but name another career, so their sources must not be reused."""
+    _, _, careers = make_careers()
+
+    for title, existing in [("Product Marketing Manager", "Product Manager"), ("Marine Biologist", "Biologist"),
+                            ("Sports Data Analyst", "Data Analyst"), ("Data Scientist", "Healthcare Data Scientist")]:
+        assert careers.index.nearest(title, k=1)[0][0] >= careers.threshold
+        assert careers.index.nearest(title, k=1)[0][1]["job_title"] == existing
+        assert careers.match(title) is None, title
+
+
+def test_index_keeps_the_newest_entries_and_loads_in_the_background():
+    client, db_service, _ = make_careers()
+    careers = SimilarCareers(db_service, max_entries=3)
+
+    careers.similar("Data Analyst")
+    careers._refreshing.join(timeout=5)
+    careers.add([{"id": 5, "job_title": "Pastry Chef", "tags": ""}])
+
+    assert [entry["id"] for entry in careers.index._entries] == [3, 4, 5]
+
+
+def test_reused_rows_are_copied_without_per_user_state():
+    """Sources are reused for any match; milestones only when generated for the same college year."""
+    _, _, careers = make_careers()
+
+    milestones, sources = careers.find_reusable("Healthcare Data Scientist", "Data", "Junior")
+    assert milestones is None
+    assert sources == [{"icon": "🐍", "title": "Learn Python", "description": "...", "status": "Not Started"}]
+
+    careers.add([{"id": 1, "job_title": "Healthcare Data Scientist", "tags": "Data, Technology"}], college_year="Junior")
+    milestones, _ = careers.find_reusable("Healthcare Data Scientist", "Data", "Junior")
+    assert milestones == [{"title": "Build a model", "description": "..."}]
+    assert careers.find_reusable("Healthcare Data Scientist", "Data", "Senior")[0] is None
+
+
+def test_reused_details_skip_the_model():
+    ai_service = AIService()
+    ai_service.model = FakeModel()
+    reused_sources = [{"icon": "🐍", "title": "Learn Python", "description": "...", "status": "Not Started"}]
+
+    details = ai_service.generate_details(
+        [{"job_title": "Healthcare Data Scientist"}, {"job_title": "UX Researcher"}],
+        "Junior",
+        reused=[(None, reused_sources), (None, None)],
+    )
+
+    assert details[0][1] == reused_sources
+    assert ai_service.model.calls == 3
+
+
+def test_similar_careers_skip_the_same_title():
+    index = SimilarityIndex()
+    index.add([
+        {"id": 1, "job_title": "Data Scientist", "tags": ""},
+        {"id": 2, "job_title": "Healthcare Data Scientist", "tags": ""},
+        {"id": 3, "job_title": "Data Engineer", "tags": ""},
+        {"id": 4, "job_title": "Pastry Chef", "tags": ""},
+    ])
+    careers = SimilarCareers(DatabaseService(FakeClient()), index=index)
+
+    titles = [career["job_title"] for career in careers.similar("Data Scientist", k=2)]
+
+    assert titles == ["Healthcare Data Scientist", "Data Engineer"]
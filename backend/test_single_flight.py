@@ -0,0 +1,58 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from services.ai_service import AIService
+from services.cache import SQLiteCache
+from services.single_flight import SingleFlight
+from test_ai_service import FakeModel
+
+
+def test_concurrent_identical_generations_share_one_model_call():
+    """Eight users whose recommendations share a title cost one milestones call, not eight."""
+    service = AIService()
+    service.model = FakeModel(delay=0.2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: service.generate_milestones("Data Scientist", "Junior"), range(8)))
+
+    assert service.model.calls == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("upstream error")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait()
+        waiter = pool.submit(flight.do, "key", lambda: "unused")
+        for future in (leader, waiter):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+
+def test_file_lock_lets_other_workers_reuse_the_shared_result(tmp_path):
+    """Two workers with separate SingleFlights but one lock directory and cache generate once."""
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    workers = [SingleFlight(lock_dir=str(tmp_path / "locks")) for _ in range(2)]
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.1)
+        cache.set("key", ["result"])
+        return ["result"]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda flight: flight.do("key", generate, recheck=lambda: cache.get("key")), workers))
+
+    assert results == [["result"], ["result"]]
+    assert len(calls) == 1
@@ -0,0 +1,64 @@
+import gzip
+import os
+from unittest.mock import patch
+
+import pytest
+from app import app
+from services.static_files import StaticFiles, precompress, IMMUTABLE_CACHE_CONTROL
+
+BUNDLE = "console.log('pathweiz');\n" * 200
+
+
+@pytest.fixture
+def dist(tmp_path):
+    """A small Vite-style dist directory with precompressed variants."""
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<!doctype html><div id=root></div>" + " " * 2000)
+    (tmp_path / "assets" / "index-BdX9a7_c.js").write_text(BUNDLE)
+    (tmp_path / "favicon.ico").write_bytes(b"\x00" * 64)
+    precompress(str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def client(dist):
+    static_files = StaticFiles(str(dist))
+    static_files.load()
+    with patch("app.static_files", static_files):
+        yield app.test_client()
+
+
+def test_precompress_writes_gzip_variants_for_text_files(dist):
+    assert gzip.decompress((dist / "assets" / "index-BdX9a7_c.js.gz").read_bytes()).decode() == BUNDLE
+    assert not (dist / "favicon.ico.gz").exists()
+    assert precompress(str(dist)) == 0
+
+
+def test_fingerprinted_assets_are_compressed_and_immutable(client):
+    response = client.get("/assets/index-BdX9a7_c.js", headers={"Accept-Encoding": "gzip, deflate"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).decode() == BUNDLE
+
+    plain = client.get("/assets/index-BdX9a7_c.js")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data(as_text=True) == BUNDLE
+
+
+def test_spa_routes_serve_index_from_memory(client, dist):
+    os.remove(dist / "index.html")
+
+    response = client.get("/dashboard/careers/42")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "<div id=root>" in response.get_data(as_text=True)
+    assert client.get("/", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_missing_assets_are_not_found(client):
+    assert client.get("/assets/index-missing0.js").status_code == 404
+    assert client.get("/robots.txt").status_code == 404
@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from services.submission import SubmissionPipeline
+from test_ai_service import FakeModel, RECOMMENDATIONS_TEXT
+
+
+def test_stream_yields_recommendations_before_details():
+    """Each recommendation is emitted before its milestones and sources, and the run ends with done."""
+    from services.ai_service import AIService
+
+    ai_service = AIService()
+    ai_service.model = FakeModel()
+    ai_service.model.generate_content = lambda prompt, stream=False, **kwargs: (
+        [type("Chunk", (), {"text": line + "\n"})() for line in RECOMMENDATIONS_TEXT.split("\n")]
+        if stream else FakeModel.generate_content(ai_service.model, prompt)
+    )
+    db_service = MagicMock()
+    db_service.save_recommendation_bundle.return_value = [1, 2]
+
+    events = list(SubmissionPipeline(db_service, ai_service).stream("user", {"college_year": "Junior"}))
+
+    kinds = [(event["event"], event.get("index")) for event in events]
+    for index in (0, 1):
+        assert kinds.index(("recommendation", index)) < kinds.index(("milestones", index))
+        assert kinds.index(("recommendation", index)) < kinds.index(("sources", index))
+    assert events[-1] == {"event": "done", "recommendation_ids": [1, 2]}
+    bundle = db_service.save_recommendation_bundle.call_args.args[0]
+    assert [len(milestones) for _, milestones, _ in bundle] == [1, 1]
+
+
+def test_run_uses_one_combined_call_and_falls_back_when_it_does_not_validate():
+    """A valid combined response skips the separate calls; an invalid one falls back to them."""
+    from services.parsing import InvalidResponseError
+
+    rec = {"job_title": "Data Scientist", "job_description": "...", "fit_percentage": "90%",
+           "tags": "Data", "recommendation_reason": "...", "labels": ["Data"]}
+    ai_service = MagicMock()
+    ai_service.generate_submission.return_value = ([rec], [([{"title": "T", "description": "D"}], [])])
+    db_service = MagicMock()
+    db_service.save_recommendation_bundle.return_value = [1]
+    pipeline = SubmissionPipeline(db_service, ai_service, combined=True)
+
+    pipeline.run("user", {"college_year": "Junior"})
+    assert ai_service.generate_recommendations.call_count == 0
+
+    ai_service.generate_submission.side_effect = InvalidResponseError("Expected 3 recommendations")
+    ai_service.generate_recommendations.return_value = [rec]
+    ai_service.generate_details.return_value = [([], [])]
+    assert pipeline.run("user", {"college_year": "Junior"})["recommendations"] == [rec]
+    assert ai_service.generate_details.call_count == 1
+
+
+def test_quiz_save_runs_alongside_the_first_model_call():
+    """The model works from the submitted answers while they are saved, without reading them back."""
+    rec = {"job_title": "Data Scientist", "job_description": "...", "fit_percentage": "90%",
+           "tags": "Data", "recommendation_reason": "...", "labels": ["Data"]}
+    model_called = threading.Event()
+    ai_service = MagicMock()
+
+    def generate_submission(quiz_data, college_year):
+        model_called.set()
+        return [rec], [([], [])]
+
+    ai_service.generate_submission.side_effect = generate_submission
+    db_service = MagicMock()
+
+    def save_quiz_responses(mapped_data):
+        # The save only finishes once the model call has started, so the two must overlap
+        assert model_called.wait(timeout=2)
+
+    db_service.save_quiz_responses.side_effect = save_quiz_responses
+    db_service.save_recommendation_bundle.return_value = [1]
+    mapped_data = {"user_id": "user", "college_year": "Junior", "field_of_study": "Statistics"}
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        SubmissionPipeline(db_service, ai_service, combined=True, executor=executor).run("user", mapped_data)
+
+    ai_service.generate_submission.assert_called_once_with(mapped_data, "Junior")
+    db_service.save_quiz_responses.assert_called_once_with(mapped_data)
+    db_service.get_user_quiz_responses.assert_not_called()
@@ -4,24 +4,33 @@ def clean_text(text):
     """Remove markdown-like formatting from text."""
     return re.sub(r"[\*\#]", "", text).strip()
 
+def normalize_job_title(job_title):
+    """Normalize a job title so equivalent titles share a cache key."""
+    return " ".join(clean_text(job_title).lower().split())
+
+# quiz_responses columns and the form fields they are read from, in the order the quiz asks them
+FORM_FIELDS = [
+    ("college_year", "collegeYear"),
+    ("field_of_study", "fieldOfStudy"),
+    ("favorite_course", "favoriteCourse"),
+    ("surprising_course", "surprisingCourse"),
+    ("top_hobbies", "topHobbies"),
+    ("jobs_internships", "jobsInternships"),
+    ("liked_aspects", "likedAspects"),
+    ("disliked_aspects", "dislikedAspects"),
+    ("career_priorities", "careerPriorities"),
+    ("work_environment", "idealWorkEnvironment"),
+    ("industries_of_interest", "industriesOfInterest"),
+    ("unconventional_aspect", "unconventionalAspect"),
+    ("admired_person", "admiredPerson"),
+    ("admired_friends", "admiredFriends"),
+    ("preferred_locations", "preferredLocations"),
+    ("final_thoughts", "finalThoughts"),
+]
+
+# The quiz answers, i.e. every column map_form_data fills in except user_id
+QUIZ_FIELDS = [column for column, _ in FORM_FIELDS]
+
 def map_form_data(data, user_id):
     """Map form data from camelCase to snake_case."""
-    return {
-        "user_id": user_id,
-        "college_year": data.get("collegeYear"),
-        "field_of_study": data.get("fieldOfStudy"),
-        "favorite_course": data.get("favoriteCourse"),
-        "surprising_course": data.get("surprisingCourse"),
-        "top_hobbies": data.get("topHobbies"),
-        "jobs_internships": data.get("jobsInternships"),
-        "liked_aspects": data.get("likedAspects"),
-        "disliked_aspects": data.get("dislikedAspects"),
-        "career_priorities": data.get("careerPriorities"),
-        "work_environment": data.get("idealWorkEnvironment"),
-        "industries_of_interest": data.get("industriesOfInterest"),
-        "unconventional_aspect": data.get("unconventionalAspect"),
-        "admired_person": data.get("admiredPerson"),
-        "admired_friends": data.get("admiredFriends"),
-        "preferred_locations": data.get("preferredLocations"),
-        "final_thoughts": data.get("finalThoughts"),
-    }
\ No newline at end of file
+    return {"user_id": user_id, **{column: data.get(field) for column, field in FORM_FIELDS}}
\ No newline at end of file
@@ -1,6 +1,39 @@
 import { supabase } from '../services/supabaseClient';
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || 'http://127.0.0.1:5000';
+const POLL_INTERVAL_MS = 2000;
+// Give up on a submission after this long; the server marks jobs whose worker stopped as failed
+const SUBMISSION_TIMEOUT_MS = 5 * 60 * 1000;
+
+/**
+ * Polls a queued submission until it finishes.
+ * @param {string} jobId - The ID returned by /submit_form.
+ * @param {string} token - The user's access token.
+ * @returns {Promise<Object>} The submission result containing the recommendations.
+ * @throws {Error} If the submission fails or does not finish within SUBMISSION_TIMEOUT_MS.
+ */
+const waitForSubmission = async (jobId, token) => {
+  const deadline = Date.now() + SUBMISSION_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+
+    const response = await fetch(`${BACKEND_URL}/submission_status/${jobId}`, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+    const status = await response.json();
+
+    if (!response.ok || status.status === 'failed') {
+      throw new Error(status.error || 'Failed to process your responses.');
+    }
+    if (status.status === 'succeeded') {
+      return status.result;
+    }
+  }
+  throw new Error('Your responses are taking longer than expected to process. Please try again later.');
+};
 
 export const submitForm = async (formData) => {
   try {
@@ -21,7 +54,12 @@ export const submitForm = async (formData) => {
       mode: 'cors',
       credentials: 'include'
     });
-    
+
+    // Generation runs in the background; wait for it to finish before returning
+    if (response.status === 202) {
+      const { job_id } = await response.json();
+      return await waitForSubmission(job_id, token);
+    }
 
     return await response.json();
   } catch (err) {
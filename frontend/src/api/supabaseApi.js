@@ -34,6 +34,38 @@ const fetchCareerRecs = async () => {
   }
 };
 
+/**
+ * Fetches career recommendations with their milestones and action items embedded, in one request.
+ * @returns {Promise<{status: number, recommendations: Array}>} An object containing the status and recommendations.
+ */
+const fetchCareerBundle = async () => {
+  try {
+    const { data: { session }, error: sessionError } = await supabase.auth.getSession();
+    if (sessionError || !session) {
+      throw new Error('Unable to fetch session. Please log in again.');
+    }
+
+    const token = session.access_token;
+
+    const response = await fetch(`${BACKEND_URL}/get_career_bundle`, {
+      method: 'GET',
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+
+    if (!response.ok) {
+      return { status: response.status, recommendations: [] };
+    }
+
+    const { recommendations } = await response.json();
+    return { recommendations, status: response.status };
+  } catch (err) {
+    console.error('Error fetching career bundle:', err);
+    return { status: 500, recommendations: [] };
+  }
+};
+
 /**
  * Fetches career milestones for a given recommendation ID.
  * @param {string} recommendationId - The ID of the recommendation.
@@ -144,5 +176,5 @@ const deleteMilestoneUpdate = async (milestoneId) => {
 };
 
 
-export { fetchCareerRecs, fetchCareerMilestones, fetchActionItems, fetchExploreRecommendations, upsertMilestoneUpdate, deleteMilestoneUpdate};
+export { fetchCareerRecs, fetchCareerBundle, fetchCareerMilestones, fetchActionItems, fetchExploreRecommendations, upsertMilestoneUpdate, deleteMilestoneUpdate};
 
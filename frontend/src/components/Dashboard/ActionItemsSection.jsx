@@ -22,7 +22,8 @@ const ActionItemsSection = ({ careerRecs, careerAvatars }) => {
         const allActionItems = []
   
         for (let i = 0; i < careerRecs.length; i++) {
-          const items = await fetchActionItems(careerRecs[i].id);
+          // Recommendations from the career bundle already include their action items
+          const items = careerRecs[i].sources ?? await fetchActionItems(careerRecs[i].id);
           const itemsWithAvatars = items.map(item => ({
             ...item,
             avatar: careerAvatars[careerRecs[i].id] || null,
@@ -3,7 +3,7 @@ import { AuthContext } from '../context/auth/AuthContext';
 import CareerCard from '../components/Dashboard/CareerCard';
 import ActionItemsSection from '../components/Dashboard/ActionItemsSection';
 import FeatureExplainer from '../components/Dashboard/FeatureExplainer';
-import { fetchCareerRecs } from '../api/supabaseApi';
+import { fetchCareerBundle } from '../api/supabaseApi';
 import getTagColors from '../utils/utils';
 
 /**
@@ -42,7 +42,7 @@ const CareerDashboard = () => {
   useEffect(() => {
     const fetchAndLogRecommendations = async () => {
       try {
-        const { recommendations } = await fetchCareerRecs();
+        const { recommendations } = await fetchCareerBundle();
         setRecommendations(recommendations); 
 
         // Generate custom colors for each tag in each job 